@@ -0,0 +1,151 @@
+"""
+Benchmark analizy blobów dla klatek z wieloma obiektami: porównuje dawną pętlę po konturach (cv2.contourArea,
+cv2.boundingRect i warunki dla każdego konturu) z contour_stats + classify_blobs (jedna tablica statystyk
+i maski NumPy). Dla porównania mierzona jest też ekstrakcja statystyk przez cv2.connectedComponentsWithStats.
+Sprawdza, czy obie klasyfikacje dają te same obiekty. Osobno mierzone jest odczytanie etykiet śledzonych obiektów
+przy zliczaniu: dawne wyszukiwanie obiektu po centroidzie wśród wykryć klatki i odczyt po indeksie wykrycia.
+
+Uruchomienie z katalogu głównego projektu:
+    python -m extra_testing_utils.benchmark_blobs
+    python -m extra_testing_utils.benchmark_blobs --blobs 100 1000 5000 --repeat 50
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from processing.objects_detection import CLASSES, DEFAULT_PARAMS, classify_blobs, contour_stats
+
+
+def blob_mask(count, seed=0, width=1920, height=1080):
+    """
+    Maska pierwszoplanowa z `count` rozłącznymi prostokątami losowych rozmiarów (od szumu po pojazdy), każdy
+    we własnej komórce siatki pokrywającej klatkę
+    """
+    rng = np.random.default_rng(seed)
+    columns = int(np.ceil(np.sqrt(count * width / height)))
+    rows = int(np.ceil(count / columns))
+    cell_w, cell_h = width // columns, height // rows
+    mask = np.zeros((height, width), dtype=np.uint8)
+    for cell in range(count):
+        w, h = rng.integers(1, cell_w - 1), rng.integers(1, cell_h - 1)
+        x = (cell % columns) * cell_w + rng.integers(0, cell_w - w)
+        y = (cell // columns) * cell_h + rng.integers(0, cell_h - h)
+        mask[y:y + h, x:x + w] = 255
+    return mask
+
+
+def zone_coverage(bbox, zone):
+    x, y, w, h = bbox
+    (tx1, ty1), (tx2, ty2) = zone
+    inter = max(0, min(x + w, tx2) - max(x, tx1)) * max(0, min(y + h, ty2) - max(y, ty1))
+    return inter / float((tx2 - tx1) * (ty2 - ty1))
+
+
+def classify_loop(contours, frame_height, params=DEFAULT_PARAMS):
+    """
+    Dawna klasyfikacja - pętla po konturach (punkt odniesienia)
+    """
+    labels = dict(CLASSES)
+    frame_objects = []
+    for contour in contours:
+        area = cv2.contourArea(contour)
+        if area < params.min_area:
+            continue
+        x, y, w, h = cv2.boundingRect(contour)
+        cx, cy, bottom_y = x + w // 2, y + h // 2, y + h
+        if h < params.min_height:
+            continue
+
+        label = None
+        if cy < frame_height * params.horizon:
+            if (zone_coverage((x, y, w, h), params.strefa_tramwaju1) > params.tram_overlap
+                    or zone_coverage((x, y, w, h), params.strefa_tramwaju2) > params.tram_overlap):
+                if h > params.tram_min_height and w > params.tram_min_width:
+                    label = "tramwaj"
+            elif any(low < bottom_y < high for low, high in params.road_bands):
+                truck = area > params.truck_min_area and w > params.truck_min_width
+                label = "ciezarowy/autobus" if truck else "osobowy"
+        elif w > params.pedestrian_min_width and h > params.pedestrian_min_height:
+            label = "pieszy"
+
+        if label is not None:
+            frame_objects.append({"label": label, "bbox": (x, y, w, h), "area": area, "centroid": (cx, cy),
+                                  "color": labels[label]})
+    return frame_objects
+
+
+def label_lookup(count):
+    """
+    Czas (ms) odczytania etykiet `count` śledzonych obiektów: wyszukiwanie po centroidzie i odczyt po indeksie
+    """
+    frame_objects = [{"label": "osobowy", "centroid": (index % 1920, index // 1920)} for index in range(count)]
+    tracked = [(index, index) for index in range(count)]
+
+    def scan():
+        for _, index in tracked:
+            centroid = frame_objects[index]["centroid"]
+            next(obj["label"] for obj in frame_objects if obj["centroid"] == centroid)
+
+    def by_index():
+        for _, index in tracked:
+            frame_objects[index]["label"]
+
+    return scan, by_index
+
+
+def measure(function, repeat):
+    """
+    Mediana czasu wykonania (ms)
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return 1000 * float(np.median(times))
+
+
+def run(blob_counts, repeat=20):
+    cv2.setNumThreads(1)
+    rows = []
+    for count in blob_counts:
+        mask = blob_mask(count)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        vectorized = [{key: value for key, value in obj.items() if key != "zones"}
+                      for obj in classify_blobs(contour_stats(contours), mask.shape)]
+        if classify_loop(contours, mask.shape[0]) != vectorized:
+            raise AssertionError(f"Różne wyniki klasyfikacji dla {count} blobów")
+
+        rows.append({
+            "blobs": len(contours),
+            "find_contours": measure(lambda: cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE), repeat),
+            "connected_components": measure(lambda: cv2.connectedComponentsWithStats(mask, connectivity=8), repeat),
+            "loop": measure(lambda: classify_loop(contours, mask.shape[0]), repeat),
+            "vectorized": measure(lambda: classify_blobs(contour_stats(contours), mask.shape), repeat),
+        })
+
+        scan, by_index = label_lookup(count)
+        rows[-1]["scan"] = measure(scan, max(1, repeat // 10))
+        rows[-1]["index"] = measure(by_index, repeat)
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--blobs', type=int, nargs='+', default=[10, 50, 200, 1000, 5000])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    rows = run(args.blobs, args.repeat)
+    print("Ekstrakcja i klasyfikacja blobów (ms, mediana)")
+    print(f"{'bloby':>6} {'findContours':>13} {'connectedComp.':>15} {'pętla':>9} {'wektorowo':>10}")
+    for row in rows:
+        print(f"{row['blobs']:>6} {row['find_contours']:>13.2f} {row['connected_components']:>15.2f} "
+              f"{row['loop']:>9.2f} {row['vectorized']:>10.2f}   x{row['loop'] / row['vectorized']:.1f}")
+
+    print("\nEtykiety śledzonych obiektów przy zliczaniu (ms, mediana)")
+    print(f"{'obiekty':>7} {'po centroidzie':>15} {'po indeksie':>12}")
+    for count, row in zip(args.blobs, rows):
+        print(f"{count:>7} {row['scan']:>15.2f} {row['index']:>12.3f}")
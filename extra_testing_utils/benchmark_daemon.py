@@ -0,0 +1,101 @@
+"""
+Benchmark kosztu startu: dla każdego nagrania z katalogu mierzy czas od uruchomienia do wyniku
+    zimny start  - osobny proces `python main.py <katalog z nagraniem> <wynik>` (importy, tło, strefy za każdym razem)
+    demon        - ten sam proces klienta z --daemon, zlecenie przetwarza uruchomiony wcześniej demon (--serve)
+    zlecenie     - samo zlecenie do demona z tego procesu (processing.daemon.submit), bez startu interpretera
+oraz czas przetwarzania zmierzony w demonie. Różnica zimny start - zlecenie to koszt startu płacony przez każde
+uruchomienie; sprawdza też, czy wyniki demona są identyczne z wynikami zimnego startu.
+
+Uruchomienie z katalogu głównego projektu (krótkie nagrania pokazują różnicę najwyraźniej):
+    python -m extra_testing_utils.benchmark_daemon ./videos
+    python -m extra_testing_utils.benchmark_daemon ./synthetic --repeat 3
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from processing.daemon import ping, submit
+
+
+def run_main(arguments) -> float:
+    """
+    Czas (s) procesu `python main.py ...` od uruchomienia do zakończenia
+    """
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "main.py", *arguments], check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def start_daemon(socket_path, timeout=60):
+    """
+    Uruchamia demona (main.py --serve) i czeka, aż zacznie odpowiadać
+    """
+    process = subprocess.Popen([sys.executable, "main.py", "--serve", str(socket_path)], stdout=subprocess.DEVNULL)
+    deadline = time.perf_counter() + timeout
+    while ping(socket_path) is None:
+        if process.poll() is not None or time.perf_counter() > deadline:
+            process.kill()
+            raise RuntimeError("Demon przetwarzania nie wystartował")
+        time.sleep(0.1)
+    return process
+
+
+def run(videos_dir, repeat=1):
+    videos = sorted(Path(videos_dir).glob("*.mp4"))
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        socket_path = tmp / "daemon.sock"
+
+        start = time.perf_counter()
+        daemon = start_daemon(socket_path)
+        daemon_start = time.perf_counter() - start
+        try:
+            for video in videos:
+                clip_dir = tmp / video.stem
+                clip_dir.mkdir()
+                (clip_dir / video.name).symlink_to(video.resolve())
+                cold_file, warm_file = tmp / f"{video.stem}_cold.json", tmp / f"{video.stem}_warm.json"
+
+                cold, warm, direct, processing = [], [], [], []
+                for _ in range(repeat):
+                    cold.append(run_main([str(clip_dir), str(cold_file)]))
+                    warm.append(run_main([str(clip_dir), str(warm_file), "--daemon", str(socket_path)]))
+
+                    start = time.perf_counter()
+                    (response,) = submit(socket_path, [video], {})
+                    direct.append(time.perf_counter() - start)
+                    processing.append(response["seconds"])
+
+                rows.append({
+                    "video": video.name,
+                    "cold": statistics.median(cold),
+                    "daemon": statistics.median(warm),
+                    "request": statistics.median(direct),
+                    "processing": statistics.median(processing),
+                    "identical": json.loads(cold_file.read_text()) == json.loads(warm_file.read_text()),
+                })
+        finally:
+            daemon.terminate()
+            daemon.wait()
+    return rows, daemon_start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('videos_dir', type=str)
+    parser.add_argument('--repeat', type=int, default=1, help='liczba pomiarów każdego nagrania (mediana)')
+    args = parser.parse_args()
+
+    rows, daemon_start = run(args.videos_dir, args.repeat)
+    print(f"Start demona (jednorazowo): {daemon_start:.2f} s")
+    print(f"{'nagranie':<24} {'zimny start':>12} {'demon':>8} {'zlecenie':>9} {'przetw.':>8} {'koszt startu':>13}")
+    for row in rows:
+        print(f"{row['video']:<24} {row['cold']:>11.2f}s {row['daemon']:>7.2f}s {row['request']:>8.2f}s "
+              f"{row['processing']:>7.2f}s {row['cold'] - row['request']:>12.2f}s"
+              + ("" if row["identical"] else "   RÓŻNE WYNIKI"))
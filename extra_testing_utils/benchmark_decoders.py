@@ -0,0 +1,99 @@
+"""
+Benchmark dekodowania: przepustowość (klatki/s) odczytu wszystkich klatek nagrań przez kolejne źródła klatek -
+cv2.VideoCapture (klatka BGR, oraz z przygotowaniem do segmentacji: konwersją do skali szarości i skalowaniem),
+cap.grab() bez dekodowania do obrazu, dekoder ffmpeg (processing.frame_sources: BGR, skala szarości,
+skala szarości w rozdzielczości analizy) i pamięć podręczna klatek (--frame-cache). Warianty ffmpeg są pomijane,
+jeśli programu ffmpeg nie ma w PATH.
+
+Uruchomienie z katalogu głównego projektu:
+    python -m extra_testing_utils.benchmark_decoders ./videos
+    python -m extra_testing_utils.benchmark_decoders ./videos --analysis-scale 0.5 --frame-cache .frame_cache
+"""
+import argparse
+import shutil
+import time
+from pathlib import Path
+
+import cv2
+
+from processing.frame_cache import FrameCache
+from processing.frame_sources import FFmpegDecoder, open_video
+from processing.objects_detection import resize_for_analysis
+
+
+def decode_all(cap, prepare=None, grab_only=False) -> int:
+    """
+    Odczytuje wszystkie klatki źródła (opcjonalnie przygotowując każdą funkcją `prepare`) - zwraca ich liczbę
+    """
+    frames = 0
+    while True:
+        if grab_only:
+            if not cap.grab():
+                break
+        else:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if prepare is not None:
+                prepare(frame)
+        frames += 1
+    cap.release()
+    return frames
+
+
+def backends(analysis_scale=1.0, frame_cache=None) -> dict:
+    """
+    Warianty źródeł klatek: nazwa -> (fabryka źródeł dla open_video, przygotowanie klatki, tylko grab)
+    """
+    def gray(frame):
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+
+    variants = {
+        "opencv BGR": (None, None, False),
+        "opencv + szarość": (None, gray, False),
+        f"opencv + szarość x{analysis_scale:g}": (None, lambda frame: resize_for_analysis(gray(frame), analysis_scale), False),
+        "opencv grab": (None, None, True),
+    }
+    if shutil.which("ffmpeg") is not None:
+        variants["ffmpeg BGR"] = (FFmpegDecoder(), None, False)
+        variants["ffmpeg szarość"] = (FFmpegDecoder(gray=True), None, False)
+        variants[f"ffmpeg szarość x{analysis_scale:g}"] = (FFmpegDecoder(gray=True, scale=analysis_scale), None, False)
+    if frame_cache is not None:
+        variants["pamięć podręczna"] = (frame_cache, gray, False)
+    return variants
+
+
+def run(videos, analysis_scale=1.0, frame_cache=None) -> dict:
+    cv2.setNumThreads(1)
+    if frame_cache is not None:
+        for video in videos:            # Dekodowanie do pamięci podręcznej poza pomiarem
+            frame_cache.open(video).release()
+
+    results = {}
+    for name, (source, prepare, grab_only) in backends(analysis_scale, frame_cache).items():
+        frames, seconds = 0, 0.0
+        for video in videos:
+            start = time.perf_counter()
+            frames += decode_all(open_video(video, source), prepare, grab_only)
+            seconds += time.perf_counter() - start
+        results[name] = {"frames": frames, "seconds": seconds, "fps": frames / seconds if seconds else 0.0}
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('videos_dir', type=str)
+    parser.add_argument('--analysis-scale', type=float, default=0.5)
+    parser.add_argument('--frame-cache', type=str, default=None, metavar='DIR',
+                        help='porównaj także z pamięcią podręczną klatek w DIR (w rozdzielczości analizy)')
+    args = parser.parse_args()
+
+    videos = sorted(Path(args.videos_dir).glob('*.mp4'))
+    frame_cache = FrameCache(args.frame_cache, scale=args.analysis_scale) if args.frame_cache else None
+    results = run(videos, args.analysis_scale, frame_cache)
+
+    if shutil.which('ffmpeg') is None:
+        print('Brak programu ffmpeg w PATH - warianty ffmpeg pominięte')
+    print(f"{'źródło':<28} {'klatki':>7} {'czas [s]':>9} {'klatki/s':>9}")
+    for name, row in results.items():
+        print(f"{name:<28} {row['frames']:>7} {row['seconds']:>9.2f} {row['fps']:>9.1f}")
@@ -0,0 +1,72 @@
+"""
+Mikro-benchmark deskryptorów wyglądu trackera: liczba deskryptorów na sekundę przy różnej liczbie obiektów w klatce.
+
+"per_object_hog" odtwarza pierwotne zachowanie (nowy cv2.HOGDescriptor i osobne wywołanie dla każdego obiektu),
+pozostałe wiersze to silniki z processing/descriptors.py liczące całą klatkę naraz.
+
+Uruchomienie z katalogu głównego projektu:
+    python -m extra_testing_utils.benchmark_descriptors --objects 1 10 40
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from processing.descriptors import DESCRIPTORS, create_descriptor_engine
+
+
+class PerObjectHog:
+    """
+    Pierwotny sposób liczenia deskryptora - punkt odniesienia
+    """
+
+    def compute(self, frame, bboxes):
+        descriptors = []
+        for x, y, w, h in bboxes:
+            hog = cv2.HOGDescriptor((64, 64), (8, 8), (4, 4), (4, 4), 9)
+            descriptors.append(hog.compute(cv2.resize(frame[y:y+h, x:x+w], (64, 64))))
+        return np.array(descriptors)
+
+
+def random_bboxes(count, width, height, seed=0):
+    rng = np.random.default_rng(seed)
+    bboxes = []
+    for _ in range(count):
+        w, h = int(rng.integers(60, 600)), int(rng.integers(60, 300))
+        bboxes.append((int(rng.integers(0, width - w)), int(rng.integers(0, height - h)), w, h))
+    return bboxes
+
+
+def benchmark(frame, objects, repeats):
+    engines = {"per_object_hog": PerObjectHog()}
+    engines.update({kind: create_descriptor_engine(kind) for kind in DESCRIPTORS})
+
+    report = {}
+    for count in objects:
+        bboxes = random_bboxes(count, frame.shape[1], frame.shape[0])
+        for name, engine in engines.items():
+            engine.compute(frame, bboxes)       # Rozgrzewka (alokacja buforów)
+            start = time.perf_counter()
+            for _ in range(repeats):
+                engine.compute(frame, bboxes)
+            seconds = time.perf_counter() - start
+            report[(name, count)] = count * repeats / seconds
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--image', type=str, default='background.jpg')
+    parser.add_argument('--objects', type=int, nargs='+', default=[1, 10, 40])
+    parser.add_argument('--repeats', type=int, default=50)
+    args = parser.parse_args()
+
+    frame = cv2.imread(args.image)
+    if frame is None:
+        raise FileNotFoundError(f"Nie znaleziono {args.image}")
+
+    report = benchmark(frame, args.objects, args.repeats)
+    print(f"{'deskryptor':<16}" + "".join(f"{f'{count} obiektów':>16}" for count in args.objects))
+    for name in dict.fromkeys(name for name, _ in report):
+        print(f"{name:<16}" + "".join(f"{report[(name, count)]:>14.0f}/s" for count in args.objects))
@@ -0,0 +1,53 @@
+"""
+Porównanie szybkości (FPS) detekcji w trybach wyjścia:
+    headless  - bez rysowania (jak perform_processing)
+    preview   - podgląd na żywo w oknie cv2.imshow (wymaga OpenCV z obsługą GUI)
+    annotated - nagranie z adnotacjami zapisywane w tle (AnnotatedVideoWriter)
+
+Uruchomienie z katalogu głównego projektu:
+    python -m extra_testing_utils.benchmark_output_modes ./videos/00000.mp4
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+
+from processing.objects_detection import detection
+
+MODES = ("headless", "preview", "annotated")
+
+
+def run_mode(video_path, mode, output_dir):
+    cap = cv2.VideoCapture(str(video_path))
+    frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    options = {"show": mode == "preview"}
+    if mode == "annotated":
+        options["output_path"] = str(Path(output_dir) / f"{Path(video_path).stem}_annotated.mp4")
+
+    start = time.perf_counter()
+    detection(cap, **options)
+    seconds = time.perf_counter() - start
+    return frames / seconds
+
+
+def benchmark(video_path, modes=MODES):
+    report = {}
+    with tempfile.TemporaryDirectory() as output_dir:
+        for mode in modes:
+            try:
+                report[mode] = run_mode(video_path, mode, output_dir)
+            except cv2.error as error:      # np. opencv-python-headless bez okien podglądu
+                print(f"{mode}: niedostępny ({error.err})")
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('video', type=str)
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    args = parser.parse_args()
+
+    for mode, fps in benchmark(args.video, args.modes).items():
+        print(f"{mode:<10} {fps:8.1f} FPS")
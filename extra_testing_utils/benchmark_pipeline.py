@@ -0,0 +1,68 @@
+"""
+Porównanie szybkości (FPS) detekcji sekwencyjnej (detection) i potokowej (pipelined_detection, --pipeline-workers)
+dla różnej liczby wątków segmentacji. Wynik zależy od liczby dostępnych rdzeni - na jednym rdzeniu wątki nie
+mają gdzie działać równolegle i potok jest wolniejszy o koszt kolejek i przełączania wątków.
+
+Uruchomienie z katalogu głównego projektu:
+    python -m extra_testing_utils.benchmark_pipeline ./videos/00000.mp4 --workers 1 2 4
+"""
+import argparse
+import os
+import time
+
+import cv2
+
+from processing.objects_detection import detection
+from processing.pipeline import PipelineStats, pipelined_detection
+
+
+def available_cores() -> int:
+    """
+    Liczba rdzeni, na których może działać proces (z uwzględnieniem ograniczeń, np. taskset lub kontenera)
+    """
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:                  # macOS i Windows
+        return os.cpu_count() or 1
+
+
+def run_serial(video_path, options):
+    cap = cv2.VideoCapture(str(video_path))
+    frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    start = time.perf_counter()
+    counts = detection(cap, show=False, **options)
+    return frames / (time.perf_counter() - start), counts
+
+
+def run_pipelined(video_path, workers, options):
+    stats = PipelineStats()
+    counts = pipelined_detection(cv2.VideoCapture(str(video_path)), workers=workers, stats=stats, **options)
+    return stats.report(), counts
+
+
+def benchmark(video_path, workers=(1, 2, 4), options=None):
+    options = options or {}
+    fps, serial_counts = run_serial(video_path, options)
+    report = {"cores": available_cores(), "serial_fps": fps, "pipelined": {}}
+    for count in workers:
+        stats, counts = run_pipelined(video_path, count, options)
+        report["pipelined"][count] = dict(stats, speedup=stats["fps"] / fps, counts_match=counts == serial_counts)
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('video', type=str)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--analysis-scale', type=float, default=1.0)
+    parser.add_argument('--roi', type=float, default=None, metavar='MARGIN')
+    args = parser.parse_args()
+
+    report = benchmark(args.video, args.workers, {"analysis_scale": args.analysis_scale, "roi_margin": args.roi})
+    print(f"Dostępne rdzenie: {report['cores']}")
+    print(f"{'sekwencyjnie':<14} {report['serial_fps']:8.1f} FPS")
+    for count, stats in report["pipelined"].items():
+        stages = ", ".join(f"{stage} {ms:.1f}" for stage, ms in stats["stage_ms_per_frame"].items())
+        print(f"{f'potok ({count})':<14} {stats['fps']:8.1f} FPS  x{stats['speedup']:.2f}  "
+              f"[ms/klatkę: {stages}; czekanie {stats['track_wait_ms_per_frame']:.1f}]"
+              f"{'' if stats['counts_match'] else '  ZLICZENIA RÓŻNE'}")
@@ -0,0 +1,90 @@
+"""
+Benchmark trybu ROI (--roi): czas segmentacji (segment_frame) każdej klatki nagrań na całej klatce i w wycinkach
+stref z marginesem, część pominiętych pikseli, odsetek klatek z obiektem na krawędzi wycinka (segmentowanym
+dodatkowo w wycinku przy krawędzi, zob. segment_frame) oraz zgodność konturów obu trybów. Dekodowanie jest poza
+pomiarem.
+
+Uruchomienie z katalogu głównego projektu:
+    python -m extra_testing_utils.benchmark_roi ./videos
+    python -m extra_testing_utils.benchmark_roi ./videos --margin 50 --analysis-scale 0.5
+"""
+import argparse
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from processing.background import StaticBackground
+from processing.objects_detection import (DEFAULT_PARAMS, clip_band, grow_clipped_roi, grow_step, load_background,
+                                          resize_for_analysis, segment_frame, zone_rois)
+
+
+def clipped(gray, background, rois, params) -> bool:
+    """
+    Czy segment_frame segmentuje w tej klatce wycinek przy krawędzi (maska po otwarciu dochodzi do krawędzi wycinka)
+    """
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3,3))
+    for x0, y0, x1, y1 in rois:
+        mask = background.foreground(gray[y0:y1, x0:x1], (x0, y0, x1, y1), params.threshold)
+        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel, iterations=params.open_iterations)
+        if grow_clipped_roi(mask, (x0, y0, x1, y1), gray.shape, clip_band(params), grow_step(params)) is not None:
+            return True
+    return False
+
+
+def run(videos, background_path="background.jpg", margin=150, analysis_scale=1.0) -> dict:
+    cv2.setNumThreads(1)
+    params = DEFAULT_PARAMS.scaled(analysis_scale)
+    background = StaticBackground(resize_for_analysis(load_background(background_path), analysis_scale))
+    rois = zone_rois(background.image.shape, margin * analysis_scale, params)
+
+    frames, clipped_frames, identical = 0, 0, 0
+    seconds = {"full": 0.0, "roi": 0.0}
+    for video in videos:
+        cap = cv2.VideoCapture(str(video))
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            gray = resize_for_analysis(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), analysis_scale)
+
+            start = time.perf_counter()
+            full = segment_frame(gray, background, None, params)
+            seconds["full"] += time.perf_counter() - start
+            start = time.perf_counter()
+            roi = segment_frame(gray, background, rois, params)
+            seconds["roi"] += time.perf_counter() - start
+
+            frames += 1
+            clipped_frames += clipped(gray, background, rois, params)
+            # Kontury w wycinkach to kontury pełnej klatki leżące w wycinkach (w dowolnej kolejności)
+            identical += set(map(tuple, roi.tolist())) <= set(map(tuple, full.tolist()))
+        cap.release()
+
+    pixels = background.image.size
+    return {
+        "frames": frames,
+        "skipped_pixels": 1 - sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in rois) / pixels,
+        "clipped_frames": clipped_frames / frames if frames else 0.0,
+        "full_ms": seconds["full"] * 1000,
+        "roi_ms": seconds["roi"] * 1000,
+        "cpu_saving": 1 - seconds["roi"] / seconds["full"] if seconds["full"] else 0.0,
+        "identical_frames": identical,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('videos_dir', type=str)
+    parser.add_argument('--margin', type=int, default=150)
+    parser.add_argument('--analysis-scale', type=float, default=1.0)
+    parser.add_argument('--background', type=str, default='background.jpg')
+    args = parser.parse_args()
+
+    result = run(sorted(Path(args.videos_dir).glob('*.mp4')), args.background, args.margin, args.analysis_scale)
+    print(f"Klatki: {result['frames']}, pominięte piksele: {result['skipped_pixels']:.0%}, "
+          f"klatki z obiektem na krawędzi wycinka: {result['clipped_frames']:.0%}")
+    print(f"Segmentacja: pełna klatka {result['full_ms']:.0f} ms, ROI {result['roi_ms']:.0f} ms "
+          f"(oszczędność {result['cpu_saving']:.0%}); klatki ze zgodnymi konturami: "
+          f"{result['identical_frames']}/{result['frames']}")
@@ -0,0 +1,162 @@
+"""
+Benchmark szybkości i dokładności: przetwarza nagrania z katalogu, porównuje zliczenia z ground truth i zapisuje
+raport JSON (FPS, sekundy przetwarzania na minutę nagrania, błąd zliczeń każdej klasy). Z --baseline porównuje
+wynik z wcześniejszym raportem i kończy się kodem 1, gdy szybkość lub dokładność pogorszyły się ponad progi.
+
+Uruchomienie z katalogu głównego projektu:
+    python -m extra_testing_utils.benchmark_suite ./videos --ground-truth results/Grand_Truth.txt --output bench.json
+    python -m extra_testing_utils.benchmark_suite ./synthetic --synthetic --baseline bench.json
+    python -m extra_testing_utils.benchmark_suite ./videos --options '{"analysis_scale": 0.5}'
+"""
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+import cv2
+
+from main import video_processor
+
+
+def load_ground_truth(path) -> dict:
+    """
+    Wczytuje plik ground truth. Oprócz poprawnego JSON akceptuje format results/Grand_Truth.txt, w którym
+    zliczenia nagrania zapisane są w nawiasach kwadratowych jako pary "klucz" : wartość (oraz przecinki na końcu list).
+    """
+    text = Path(path).read_text(encoding="utf-8")
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+
+    text = text.replace("[", "{").replace("]", "}")
+    text = re.sub(r",(\s*})", r"\1", text)          # Przecinek przed zamknięciem obiektu
+    return json.loads(text)
+
+
+def count_errors(counts: dict, truth: dict) -> dict:
+    """
+    Błąd zliczeń każdej klasy: wynik - ground truth (dodatni - za dużo, ujemny - za mało)
+    """
+    return {key: counts.get(key, 0) - value for key, value in truth.items()}
+
+
+def run_suite(videos_dir, ground_truth: dict, options=None) -> dict:
+    """
+    Przetwarza nagrania z `videos_dir`, dla których istnieje ground truth (pozostałe tylko mierzy).
+    `options` - opcje zlecenia jak z main.job_options (np. analysis_scale, roi_margin, descriptor, zones, decoder)
+    """
+    options = options or {}
+    process = video_processor({**options, "profile": False})     # Wynikiem mają być same zliczenia
+    videos_paths = sorted(path for path in Path(videos_dir).iterdir() if path.name.endswith('.mp4'))
+    report = {"options": options, "videos": {}}
+
+    for video_path in videos_paths:
+        cap = cv2.VideoCapture(str(video_path))
+        frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30
+        cap.release()
+
+        start = time.perf_counter()
+        counts = process(str(video_path))
+        seconds = time.perf_counter() - start
+
+        entry = {
+            "frames": frames,
+            "seconds": seconds,
+            "fps": frames / seconds if seconds > 0 else 0.0,
+            "seconds_per_video_minute": seconds / (frames / fps / 60) if frames else 0.0,
+            "counts": counts,
+        }
+        truth = ground_truth.get(video_path.name)
+        if truth is not None:
+            entry["errors"] = count_errors(counts, truth)
+            entry["abs_error"] = sum(abs(error) for error in entry["errors"].values())
+        report["videos"][video_path.name] = entry
+        print(f"{video_path.name}: {entry['fps']:.1f} FPS, błąd: {entry.get('abs_error', 'brak ground truth')}")
+
+    report["summary"] = summarize(report["videos"])
+    return report
+
+
+def summarize(videos: dict) -> dict:
+    frames = sum(entry["frames"] for entry in videos.values())
+    seconds = sum(entry["seconds"] for entry in videos.values())
+    minutes = sum(entry["seconds"] / entry["seconds_per_video_minute"]
+                  for entry in videos.values() if entry["seconds_per_video_minute"] > 0)
+
+    class_errors = {}
+    for entry in videos.values():
+        for key, error in entry.get("errors", {}).items():
+            class_errors[key] = class_errors.get(key, 0) + abs(error)
+
+    return {
+        "videos": len(videos),
+        "frames": frames,
+        "fps": frames / seconds if seconds > 0 else 0.0,
+        "seconds_per_video_minute": seconds / minutes if minutes > 0 else 0.0,
+        "abs_error_per_class": class_errors,
+        "abs_error": sum(class_errors.values()),
+    }
+
+
+def check_regressions(report: dict, baseline: dict, max_slowdown=0.2, max_error_increase=0) -> list[str]:
+    """
+    Porównuje podsumowanie raportu z raportem odniesienia. Zwraca listę opisów regresji (pusta - brak):
+    spadek FPS o więcej niż `max_slowdown` (ułamek) albo wzrost sumarycznego błędu zliczeń (ogółem lub dla
+    dowolnej klasy) o więcej niż `max_error_increase`.
+    """
+    failures = []
+    current, reference = report["summary"], baseline["summary"]
+
+    if reference["fps"] > 0 and current["fps"] < reference["fps"] * (1 - max_slowdown):
+        failures.append(f"FPS: {current['fps']:.1f} < {reference['fps']:.1f} (dopuszczalny spadek {max_slowdown:.0%})")
+
+    if current["abs_error"] > reference["abs_error"] + max_error_increase:
+        failures.append(f"błąd zliczeń: {current['abs_error']} > {reference['abs_error']}")
+    for key, error in current["abs_error_per_class"].items():
+        previous = reference["abs_error_per_class"].get(key, 0)
+        if error > previous + max_error_increase:
+            failures.append(f"błąd zliczeń {key}: {error} > {previous}")
+
+    return failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('videos_dir', type=str)
+    parser.add_argument('--ground-truth', type=str, default='results/Grand_Truth.txt')
+    parser.add_argument('--synthetic', action='store_true',
+                        help='wygeneruj syntetyczne nagrania do videos_dir i użyj ich ground_truth.json')
+    parser.add_argument('--options', type=json.loads, default={},
+                        help='opcje przetwarzania (jak main.job_options) w JSON, np. \'{"analysis_scale": 0.5, "descriptor": "histogram"}\'')
+    parser.add_argument('--output', type=str, default=None)
+    parser.add_argument('--baseline', type=str, default=None, help='raport odniesienia do wykrywania regresji')
+    parser.add_argument('--max-slowdown', type=float, default=0.2)
+    parser.add_argument('--max-error-increase', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        from extra_testing_utils.synthetic_video import generate
+
+        ground_truth = generate(args.videos_dir)
+    else:
+        ground_truth = load_ground_truth(args.ground_truth)
+
+    report = run_suite(args.videos_dir, ground_truth, args.options)
+    summary = report["summary"]
+    print(f"\nRazem: {summary['fps']:.1f} FPS, {summary['seconds_per_video_minute']:.1f} s na minutę nagrania, "
+          f"błąd zliczeń: {summary['abs_error']} {summary['abs_error_per_class']}")
+
+    if args.output is not None:
+        with open(args.output, 'w') as output_file:
+            json.dump(report, output_file, indent=4)
+
+    if args.baseline is not None:
+        with open(args.baseline) as baseline_file:
+            failures = check_regressions(report, json.load(baseline_file), args.max_slowdown, args.max_error_increase)
+        for failure in failures:
+            print(f"REGRESJA: {failure}")
+        sys.exit(1 if failures else 0)
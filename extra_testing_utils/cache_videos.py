@@ -0,0 +1,32 @@
+"""
+Dekoduje nagrania raz do pamięci podręcznej klatek (processing/frame_cache.py), z której korzystają
+main.py --frame-cache i przeszukiwanie parametrów - kolejne przebiegi nie dekodują już wideo.
+
+Uruchomienie z katalogu głównego projektu:
+    python -m extra_testing_utils.cache_videos ./videos --cache-dir .frame_cache --analysis-scale 0.5 --max-size 20GB
+"""
+import argparse
+import time
+from pathlib import Path
+
+from processing.choices import parse_size
+from processing.frame_cache import FrameCache
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('videos_dir', type=str)
+    parser.add_argument('--cache-dir', type=str, default='.frame_cache')
+    parser.add_argument('--analysis-scale', type=float, default=1.0, help='skala zapisywanych klatek (jak w main.py)')
+    parser.add_argument('--gray', action='store_true', help='tylko skala szarości')
+    parser.add_argument('--max-size', type=parse_size, default=None, help='np. 20GB - najdawniej używane wpisy są usuwane')
+    args = parser.parse_args()
+
+    cache = FrameCache(args.cache_dir, args.max_size, color=not args.gray, scale=args.analysis_scale)
+    for video_path in sorted(path for path in Path(args.videos_dir).iterdir() if path.name.endswith('.mp4')):
+        start = time.perf_counter()
+        cap = cache.open(video_path)
+        print(f"{video_path.name}: {cap.count} klatek, {cap.metadata['bytes'] / 1024 ** 2:.0f} MB "
+              f"({time.perf_counter() - start:.1f} s)")
+        cap.release()
+
+    print(f"Rozmiar pamięci podręcznej: {cache.size() / 1024 ** 3:.2f} GB")
@@ -0,0 +1,57 @@
+"""
+Porównanie zliczeń i czasu przetwarzania dla różnych skal analizy (analysis_scale) względem pełnej rozdzielczości.
+
+Uruchomienie z katalogu głównego projektu:
+    python -m extra_testing_utils.compare_scales ./videos --scales 1 0.5 0.33 --output results/scale_comparison.json
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+import cv2
+
+from processing.utils import perform_processing
+
+
+def compare_scales(videos_dir: str, scales: list[float]) -> dict:
+    videos_paths = sorted(path for path in Path(videos_dir).iterdir() if path.name.endswith('.mp4'))
+    report = {}
+
+    for video_path in videos_paths:
+        report[video_path.name] = {}
+        for scale in scales:
+            cap = cv2.VideoCapture(str(video_path))
+            frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            start = time.perf_counter()
+            counts = perform_processing(cap, analysis_scale=scale)
+            seconds = time.perf_counter() - start
+            report[video_path.name][str(scale)] = {"counts": counts, "seconds": seconds,
+                                                   "fps": frames / seconds if seconds > 0 else 0.0}
+    return report
+
+
+def print_report(report: dict, scales: list[float]):
+    reference = str(scales[0])
+    for video_name, runs in report.items():
+        print(f"\n{video_name}")
+        for scale, run in runs.items():
+            diff = {key.removeprefix("liczba_"): value - runs[reference]["counts"][key]
+                    for key, value in run["counts"].items() if value != runs[reference]["counts"][key]}
+            print(f"  scale={scale:<5} {run['fps']:7.1f} FPS  "
+                  f"różnice względem scale={reference}: {diff if diff else 'brak'}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('videos_dir', type=str)
+    parser.add_argument('--scales', type=float, nargs='+', default=[1.0, 0.5, 0.33])
+    parser.add_argument('--output', type=str, default=None)
+    args = parser.parse_args()
+
+    report = compare_scales(args.videos_dir, args.scales)
+    print_report(report, args.scales)
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(report, output_file, indent=4)
@@ -1,37 +1,99 @@
+"""
+Interaktywne wyznaczanie stref kamery na obrazie tła i zapis pliku konfiguracji stref (opcja --zones w main.py).
+Strefy wyznaczane są kolejno (strefa_lewo, strefa_prawo, strefa_tramwaju1, strefa_tramwaju2, strefa_piesi):
+
+    lewy przycisk myszy - dodaj wierzchołek (dwa wierzchołki - prostokąt o tych rogach, więcej - wielokąt)
+    Backspace           - usuń ostatni wierzchołek
+    Enter / spacja      - zatwierdź strefę i przejdź do następnej (bez wierzchołków - strefa pozostaje bez zmian)
+    h                   - następne kliknięcie wyznacza linię horizon (oddzielającą jezdnię od chodnika)
+    ESC                 - zakończ bez zapisu
+
+Strefy niewyznaczone, horizon i road_bands pochodzą z pliku --base (domyślnie strefy wbudowane).
+
+Uruchomienie z katalogu głównego projektu:
+    python -m extra_testing_utils.create_zone --output zones/kamera1.json
+    python -m extra_testing_utils.create_zone --background tlo_kamery2.jpg --base zones/kamera1.json --output zones/kamera2.json
+"""
+import argparse
+from dataclasses import replace
+
 import cv2
+import numpy as np
+
+from processing.objects_detection import DEFAULT_PARAMS, draw_zones
+from processing.zones import POLYGON_FIELDS, load_zones, save_zones
+
+WINDOW = "Wyznacz strefy"
+
 
-points = []
-rectangles = []
+def edit_zones(background, params):
+    """
+    Pętla edycji stref - zwraca parametry z nowymi strefami albo None po przerwaniu (ESC)
+    """
+    state = {"points": [], "horizon_pending": False, "horizon": params.horizon}
 
-def draw_rectangle(event, x, y, flags, param):
-    global points, rectangles
+    def on_click(event, x, y, flags, param):
+        if event != cv2.EVENT_LBUTTONDOWN:
+            return
+        if state["horizon_pending"]:
+            state["horizon"] = round(y / background.shape[0], 3)
+            state["horizon_pending"] = False
+            print(f"horizon: {state['horizon']}")
+        else:
+            state["points"].append((x, y))
 
-    if event == cv2.EVENT_LBUTTONDOWN:
-        points.append((x, y))
+    cv2.namedWindow(WINDOW)
+    cv2.setMouseCallback(WINDOW, on_click)
 
+    field_index = 0
+    while field_index < len(POLYGON_FIELDS):
+        field = POLYGON_FIELDS[field_index]
+        params = replace(params, horizon=state["horizon"])
+
+        preview = background.copy()
+        draw_zones(preview, params)
+        points = state["points"]
+        for point in points:
+            cv2.circle(preview, point, 5, (0, 0, 255), -1)
         if len(points) == 2:
-            pt1, pt2 = points
-            rectangles.append((pt1, pt2))
-            print(f"Strefa: Lewy górny {pt1}, Prawy dolny {pt2}")
-            points = []  # Reset for next rectangle
-
-background = cv2.imread("background.jpg")
-if background is None:
-    raise FileNotFoundError("Nie znaleziono background.jpg")
-
-clone = background.copy()
-cv2.namedWindow("Wyznacz strefy")
-cv2.setMouseCallback("Wyznacz strefy", draw_rectangle)
-
-while True:
-    temp = clone.copy()
-    for pt1, pt2 in rectangles:
-        cv2.rectangle(temp, pt1, pt2, (0, 255, 255), 2)
-    if len(points) == 1:
-        cv2.circle(temp, points[0], 5, (0, 0, 255), -1)
-    cv2.imshow("Wyznacz strefy", temp)
-    key = cv2.waitKey(1) & 0xFF
-    if key == 27:  # ESC to exit
-        break
-
-cv2.destroyAllWindows()
+            cv2.rectangle(preview, points[0], points[1], (0, 255, 255), 2)
+        elif len(points) > 2:
+            cv2.polylines(preview, [np.array(points)], True, (0, 255, 255), 2)
+        cv2.putText(preview, f"{field} ({len(points)} pkt)", (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 2)
+        cv2.imshow(WINDOW, preview)
+
+        key = cv2.waitKey(20) & 0xFF
+        if key == 27:               # ESC
+            cv2.destroyAllWindows()
+            return None
+        if key == 8 and points:     # Backspace
+            points.pop()
+        elif key == ord("h"):
+            state["horizon_pending"] = True
+        elif key in (13, 32):       # Enter, spacja
+            if len(points) >= 2:
+                params = replace(params, **{field: tuple(points)})
+                print(f"{field}: {list(points)}")
+            state["points"] = []
+            field_index += 1
+
+    cv2.destroyAllWindows()
+    return params
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--background', type=str, default='background.jpg')
+    parser.add_argument('--base', type=str, default=None, help='plik stref, od którego zacząć (domyślnie strefy wbudowane)')
+    parser.add_argument('--output', type=str, default='zones/camera.json')
+    args = parser.parse_args()
+
+    background = cv2.imread(args.background)
+    if background is None:
+        raise FileNotFoundError(f"Nie znaleziono {args.background}")
+
+    params = DEFAULT_PARAMS if args.base is None else replace(DEFAULT_PARAMS, **load_zones(args.base))
+    params = edit_zones(background, params)
+    if params is not None:
+        save_zones(args.output, params)
+        print(f"Zapisano {args.output}")
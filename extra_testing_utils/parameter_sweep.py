@@ -0,0 +1,280 @@
+"""
+Przeszukiwanie parametrów detekcji (DetectionParams) - siatka lub losowy wybór konfiguracji, oceniany błędem zliczeń
+względem ground truth i szybkością (FPS). Wynikiem jest raport JSON ze wszystkimi konfiguracjami i front Pareto
+(konfiguracje, których żadna inna nie przewyższa jednocześnie dokładnością i szybkością).
+
+Konfiguracje różniące się tylko klasyfikacją i śledzeniem (pola, wymiary klas, bramka trackera) dzielą pracę:
+dla każdego nagrania i każdego zestawu parametrów segmentacji (próg, iteracje morfologii, deskryptor) klatki są
+dekodowane (lub czytane z pamięci podręcznej --frame-cache) i segmentowane raz, a deskryptory wyglądu tego samego
+bboxa liczone raz na klatkę. Jednostki pracy (nagranie x zestaw segmentacji) wykonywane są w procesach roboczych.
+
+FPS konfiguracji to szacunek przebiegu samodzielnego: pełny czas odczytu i segmentacji jej grupy plus czas
+jej własnej klasyfikacji, śledzenia i zliczania (z kosztem deskryptorów jej obiektów, nawet jeśli policzyła je
+wcześniej inna konfiguracja).
+
+Uruchomienie z katalogu głównego projektu:
+    python -m extra_testing_utils.parameter_sweep ./videos --ground-truth results/Grand_Truth.txt --frame-cache .frame_cache
+    python -m extra_testing_utils.parameter_sweep ./synthetic --random 500 --workers 8 --analysis-scale 0.5
+    python -m extra_testing_utils.parameter_sweep ./videos --space '{"threshold": [25, 30, 35], "min_area": [2000, 3000]}'
+"""
+import argparse
+import itertools
+import json
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import replace
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from extra_testing_utils.benchmark_suite import count_errors, load_ground_truth
+from processing.descriptors import create_descriptor_engine
+from processing.frame_cache import FrameCache
+from processing.frame_sources import open_video
+from processing.objects_detection import (DEFAULT_PARAMS, ObjectCounter, classify_blobs, prepare_background,
+                                         resize_for_analysis, segment_frame, source_scale)
+from processing.utils import to_results
+
+# Domyślna przestrzeń przeszukiwania (wartości w pikselach klatki 1920x1080)
+DEFAULT_SPACE = {
+    "threshold": [20, 30, 40],
+    "open_iterations": [1, 2, 3],
+    "close_iterations": [5, 7, 9],
+    "min_area": [2000, 3000, 4000],
+    "min_height": [40, 50, 60],
+    "truck_min_area": [50000, 60000],
+    "pedestrian_min_height": [90, 110],
+    "tram_overlap": [0.95, 0.99],
+    "tracker_max_distance": [40, 60, 80],
+}
+
+# Opis w raporcie - FPS konfiguracji nie jest zmierzony w przebiegu samodzielnym (zob. opis modułu)
+FPS_NOTE = ("FPS konfiguracji to szacunek przebiegu samodzielnego (wspólny odczyt i segmentacja grupy + własna "
+            "klasyfikacja, śledzenie i koszt deskryptorów), a nie zmierzony FPS; porównania między grupami "
+            "segmentacji (front Pareto) należy potwierdzić pomiarem, np. extra_testing_utils.benchmark_suite")
+
+# Pola wpływające na segmentację i deskryptory - konfiguracje o tych samych wartościach dzielą te etapy
+SHARED_FIELDS = ("threshold", "open_iterations", "close_iterations", "descriptor")
+
+
+class SharedDescriptors:
+    """
+    Silnik deskryptorów współdzielony przez trackery wielu konfiguracji w obrębie jednej klatki: deskryptor
+    danego bboxa liczony jest raz. `cost` - czas, jaki zajęłoby policzenie deskryptorów zwróconych dotąd
+    (także tych wziętych z pamięci), `spent` - czas faktycznie poświęcony na liczenie.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.size = engine.size
+        self.memo = {}              # bbox -> (deskryptor, koszt) w bieżącej klatce
+        self.cost = 0.0
+        self.spent = 0.0
+
+    def new_frame(self):
+        self.memo = {}
+
+    def compute(self, frame, bboxes):
+        if not bboxes:
+            return np.empty((0, self.size), dtype=np.float32)
+        missing = list(dict.fromkeys(bbox for bbox in bboxes if bbox not in self.memo))
+        if missing:
+            start = time.perf_counter()
+            descriptors = self.engine.compute(frame, missing)
+            seconds = time.perf_counter() - start
+            self.spent += seconds
+            for bbox, descriptor in zip(missing, descriptors):
+                self.memo[bbox] = (descriptor, seconds / len(missing))
+
+        self.cost += sum(self.memo[bbox][1] for bbox in bboxes)
+        return np.stack([self.memo[bbox][0] for bbox in bboxes])
+
+
+def evaluate_group(video_path, configs, analysis_scale=1.0, background_path="background.jpg", frame_cache=None):
+    """
+    Przetwarza nagranie dla listy konfiguracji o wspólnych polach SHARED_FIELDS. Zwraca zliczenia i szacowany
+    czas przetwarzania każdej konfiguracji oraz liczbę klatek.
+    """
+    cv2.setNumThreads(1)
+    cap = open_video(video_path, frame_cache)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+
+    all_params = [replace(DEFAULT_PARAMS, **config).scaled(analysis_scale) for config in configs]
+    shared_params = all_params[0]
+    background = prepare_background(cap, background_path, analysis_scale)
+    if background is None:
+        raise FileNotFoundError(background_path)
+    frame_scale = source_scale(cap, analysis_scale)
+
+    descriptors = SharedDescriptors(create_descriptor_engine(shared_params.descriptor))
+    counters = []
+    for params in all_params:
+        counter = ObjectCounter(fps, params=params)
+        counter.tracker.descriptor_engine = descriptors
+        counters.append(counter)
+
+    shared_seconds = 0.0
+    own_seconds = [0.0] * len(configs)
+    frame_number = 0
+    while True:
+        start = time.perf_counter()
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frame_number += 1
+        frame = resize_for_analysis(frame, frame_scale)
+        blobs = segment_frame(frame, background, None, shared_params)
+        descriptors.new_frame()
+        shared_seconds += time.perf_counter() - start
+
+        for i, (counter, params) in enumerate(zip(counters, all_params)):
+            start = time.perf_counter()
+            cost, spent = descriptors.cost, descriptors.spent
+            frame_objects = classify_blobs(blobs, frame.shape, params)
+            counter.update(frame_objects, frame, frame_number)
+            elapsed = time.perf_counter() - start
+            own_seconds[i] += elapsed - (descriptors.spent - spent) + (descriptors.cost - cost)
+
+    cap.release()
+    return {
+        "frames": frame_number,
+        "results": [to_results(counter.counts) for counter in counters],
+        "seconds": [shared_seconds + seconds for seconds in own_seconds],
+    }
+
+
+def grid_configs(space: dict) -> list[dict]:
+    keys = list(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*(space[key] for key in keys))]
+
+
+def random_configs(space: dict, count: int, seed=0, shared_groups=None) -> list[dict]:
+    """
+    `count` różnych konfiguracji wylosowanych z siatki (bez losowania całej siatki do pamięci).
+    shared_groups - jeśli podane, pola SHARED_FIELDS przyjmują tylko tyle wcześniej wylosowanych kombinacji,
+                    co ogranicza liczbę segmentacji każdego nagrania (pozostałe pola losowane są swobodnie)
+    """
+    total = 1
+    for values in space.values():
+        total *= len(values)
+    if count >= total:
+        return grid_configs(space)
+
+    rng = random.Random(seed)
+    shared_space = {key: values for key, values in space.items() if key in SHARED_FIELDS}
+    combinations = None
+    if shared_groups is not None and shared_space:
+        combinations = random_configs(shared_space, shared_groups, seed)
+
+    chosen = {}
+    while len(chosen) < count:
+        config = {key: rng.choice(values) for key, values in space.items()}
+        if combinations is not None:
+            config.update(rng.choice(combinations))
+        chosen.setdefault(tuple(config[key] for key in space), config)
+    return list(chosen.values())
+
+
+def group_configs(configs: list[dict]) -> dict:
+    """
+    Grupuje konfiguracje po polach SHARED_FIELDS -> {klucz grupy: [(indeks konfiguracji, konfiguracja), ...]}
+    """
+    groups = {}
+    for index, config in enumerate(configs):
+        params = replace(DEFAULT_PARAMS, **config)
+        key = tuple(getattr(params, field) for field in SHARED_FIELDS)
+        groups.setdefault(key, []).append((index, config))
+    return groups
+
+
+def pareto_front(entries: list[dict]) -> list[dict]:
+    """
+    Konfiguracje niezdominowane: nie istnieje inna o mniejszym lub równym błędzie i większym FPS
+    """
+    front = []
+    for entry in sorted(entries, key=lambda entry: (entry["abs_error"], -entry["fps"])):
+        if not front or entry["fps"] > front[-1]["fps"]:
+            front.append(entry)
+    return front
+
+
+def sweep(videos_dir, ground_truth: dict, configs: list[dict], workers=None, analysis_scale=1.0,
+          frame_cache=None, background_path="background.jpg") -> dict:
+    videos_paths = sorted(path for path in Path(videos_dir).iterdir()
+                          if path.name.endswith('.mp4') and path.name in ground_truth)
+    if frame_cache is not None:
+        for video_path in videos_paths:         # Dekodowanie do pamięci podręcznej raz, przed startem procesów
+            frame_cache.open(video_path).release()
+
+    groups = group_configs(configs)
+    entries = [{"config": config, "errors": {}, "abs_error": 0, "frames": 0, "seconds": 0.0} for config in configs]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for video_path in videos_paths:
+            for members in groups.values():
+                future = executor.submit(evaluate_group, str(video_path), [config for _, config in members],
+                                         analysis_scale, background_path, frame_cache)
+                futures[future] = (video_path.name, members)
+
+        for done, future in enumerate(as_completed(futures), 1):
+            video_name, members = futures[future]
+            outcome = future.result()
+            for (index, _), results, seconds in zip(members, outcome["results"], outcome["seconds"]):
+                entry = entries[index]
+                errors = count_errors(results, ground_truth[video_name])
+                for key, error in errors.items():
+                    entry["errors"][key] = entry["errors"].get(key, 0) + abs(error)
+                entry["abs_error"] += sum(abs(error) for error in errors.values())
+                entry["frames"] += outcome["frames"]
+                entry["seconds"] += seconds
+            print(f"[{done}/{len(futures)}] {video_name}: {len(members)} konfiguracji")
+
+    for entry in entries:
+        entry["fps"] = entry["frames"] / entry["seconds"] if entry["seconds"] > 0 else 0.0
+
+    return {
+        "videos": [path.name for path in videos_paths],
+        "analysis_scale": analysis_scale,
+        "fps_estimated": True,
+        "fps_note": FPS_NOTE,
+        "configurations": entries,
+        "pareto_front": pareto_front(entries),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('videos_dir', type=str)
+    parser.add_argument('--ground-truth', type=str, default='results/Grand_Truth.txt')
+    parser.add_argument('--space', type=json.loads, default=DEFAULT_SPACE,
+                        help='przestrzeń przeszukiwania w JSON: {"pole DetectionParams": [wartości], ...}')
+    parser.add_argument('--random', type=int, default=None, metavar='N', help='N losowych konfiguracji zamiast siatki')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--shared-groups', type=int, default=None, metavar='K',
+                        help='z --random: tylko K kombinacji progu/morfologii (mniej segmentacji, szybsze przeszukiwanie)')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--analysis-scale', type=float, default=1.0)
+    parser.add_argument('--frame-cache', type=str, default=None, metavar='DIR')
+    parser.add_argument('--output', type=str, default='results/parameter_sweep.json')
+    args = parser.parse_args()
+
+    if args.random:
+        configs = random_configs(args.space, args.random, args.seed, args.shared_groups)
+    else:
+        configs = grid_configs(args.space)
+    frame_cache = FrameCache(args.frame_cache, scale=args.analysis_scale) if args.frame_cache else None
+    print(f"Konfiguracji: {len(configs)}, grup segmentacji: {len(group_configs(configs))}")
+
+    start = time.perf_counter()
+    report = sweep(args.videos_dir, load_ground_truth(args.ground_truth), configs, args.workers,
+                   args.analysis_scale, frame_cache)
+    print(f"Czas: {time.perf_counter() - start:.1f} s\n\nFront Pareto (błąd zliczeń / szacowany FPS):")
+    for entry in report["pareto_front"]:
+        print(f"  błąd {entry['abs_error']:>4}  ~{entry['fps']:6.1f} FPS  {entry['config']}")
+    print(f"\n{FPS_NOTE}")
+
+    with open(args.output, 'w') as output_file:
+        json.dump(report, output_file, indent=4)
@@ -0,0 +1,146 @@
+"""
+Generator syntetycznych nagrań o znanych zliczeniach: prostokąty z fakturą poruszające się po background.jpg
+po jezdni (w obu kierunkach), torach i chodniku. Razem z nagraniami zapisywany jest plik ground_truth.json
+(w formacie pliku wynikowego), używany przez extra_testing_utils.benchmark_suite.
+
+Uruchomienie z katalogu głównego projektu:
+    python -m extra_testing_utils.synthetic_video ./synthetic
+"""
+import argparse
+import json
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from processing.utils import to_results
+
+# Tory ruchu w klatce 1920x1080: (y, wysokość, szerokość, prędkość w px/klatkę) dla każdego rodzaju obiektu.
+# Wymiary dobrane tak, aby obiekty trafiały do stref i klas zdefiniowanych w processing/objects_detection.py.
+LANES = {
+    "osobowy_prawo_lewo": (150, 120, 200, -16),         # Górny pas jezdni, z prawej na lewą
+    "ciezarowy_prawo_lewo": (150, 160, 700, -16),
+    "osobowy_lewo_prawo": (440, 140, 220, 16),          # Dolny pas jezdni, z lewej na prawą
+    "ciezarowy_lewo_prawo": (440, 170, 650, 16),
+    "tramwaj": (205, 210, 1000, 20),                    # Tory - tramwaj zasłania górny pas, więc jedzie, gdy pas jest pusty
+    "pieszy": (800, 160, 80, 3),                        # Chodnik - przejście przez strefę pieszych
+}
+
+# Zestaw nagrań: nazwa -> liczba obiektów każdej klasy
+CLIPS = {
+    "synthetic_mixed.mp4": {"osobowy_prawo_lewo": 1, "osobowy_lewo_prawo": 1, "ciezarowy_prawo_lewo": 1,
+                            "ciezarowy_lewo_prawo": 1, "tramwaj": 1, "pieszy": 1},
+    "synthetic_busy.mp4": {"osobowy_prawo_lewo": 4, "osobowy_lewo_prawo": 3, "ciezarowy_lewo_prawo": 1,
+                           "tramwaj": 2, "pieszy": 2},
+    "synthetic_quiet.mp4": {"osobowy_lewo_prawo": 1},
+}
+
+
+def build_scenario(counts: dict, fps=30, gap=400, idle_frames=60) -> tuple[list, int]:
+    """
+    Rozkłada obiekty w czasie tak, aby nie nachodziły na siebie: kolejne obiekty na tym samym pasie startują
+    co najmniej `gap` pikseli za poprzednim, tramwaje jadą po opuszczeniu górnego pasa przez samochody
+    (co najmniej 5 s + przejazd od siebie - blokada zliczania tramwajów), piesi idą jeden po drugim.
+    Nagranie kończy się `idle_frames` pustymi klatkami. Zwraca listę obiektów (start, x0, y, vx, w, h, seed)
+    i liczbę klatek.
+    """
+    objects = []
+    ends = {"upper": 0, "lower": 0, "pedestrian": idle_frames}
+    lane_of = {"osobowy_prawo_lewo": "upper", "ciezarowy_prawo_lewo": "upper",
+               "osobowy_lewo_prawo": "lower", "ciezarowy_lewo_prawo": "lower"}
+    starts = {"upper": idle_frames, "lower": idle_frames}
+
+    for kind in ("osobowy_prawo_lewo", "ciezarowy_prawo_lewo", "osobowy_lewo_prawo", "ciezarowy_lewo_prawo"):
+        y, h, w, vx = LANES[kind]
+        lane = lane_of[kind]
+        for _ in range(counts.get(kind, 0)):
+            start = starts[lane]
+            x0 = 1920 if vx < 0 else -w
+            objects.append((start, x0, y, vx, w, h, len(objects)))
+            starts[lane] = start + (w + gap) // abs(vx)
+            ends[lane] = max(ends[lane], start + (1920 + w) // abs(vx) + 1)
+
+    y, h, w, vx = LANES["tramwaj"]
+    start = ends["upper"] + 15
+    for _ in range(counts.get("tramwaj", 0)):
+        objects.append((start, -w, y, vx, w, h, len(objects)))
+        end = start + (1920 + w) // vx + 1
+        start = max(end + 15, start + 5 * fps + 60)
+    ends["tram"] = end if counts.get("tramwaj", 0) else 0
+
+    y, h, w, vx = LANES["pieszy"]
+    start = idle_frames
+    for _ in range(counts.get("pieszy", 0)):
+        objects.append((start, 820, y, vx, w, h, len(objects)))
+        start += 360 // vx + 30                     # Przejście przez strefę pieszych (x 900-1100) i powrót kadru do tła
+    ends["pedestrian"] = start
+
+    return objects, max(ends.values()) + idle_frames
+
+
+def texture(h, w, seed):
+    """
+    Faktura obiektu - szachownica z losowych pól 16x16 (deskryptory wyglądu muszą odróżniać obiekty)
+    """
+    cells = np.random.default_rng(seed).integers(0, 255, (h // 16 + 1, w // 16 + 1, 1), dtype=np.uint8)
+    return np.repeat(np.repeat(cells, 16, 0), 16, 1)[:h, :w].repeat(3, 2)
+
+
+def render_video(path, objects, frames, background, fps=30):
+    """
+    Zapis nagrania: obiekt różni się od tła o ok. 80 poziomów jasności (jaśniejszy na ciemnym tle i odwrotnie)
+    """
+    height, width = background.shape[:2]
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    textures = {seed: texture(h, w, seed).astype(np.int16) // 6 for _, _, _, _, w, h, seed in objects}
+
+    for frame_number in range(frames):
+        frame = background.copy()
+        for start, x0, y, vx, w, h, seed in objects:
+            if frame_number < start:
+                continue
+            x = x0 + vx * (frame_number - start)
+            xa, xb = max(x, 0), min(x + w, width)
+            if xb <= xa:
+                continue
+            region = background[y:y + h, xa:xb].astype(np.int16)
+            offset = 80 + textures[seed][:, xa - x:xb - x]
+            frame[y:y + h, xa:xb] = np.where(region < 128, region + offset, region - offset).clip(0, 255)
+        writer.write(frame)
+    writer.release()
+
+
+def generate(output_dir, clips=CLIPS, background_path="background.jpg", fps=30) -> dict:
+    """
+    Generuje nagrania `clips` do `output_dir` i zapisuje ground_truth.json. Zwraca oczekiwane wyniki.
+    """
+    background = cv2.imread(background_path)
+    if background is None:
+        raise FileNotFoundError(f"Nie znaleziono {background_path}")
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    ground_truth = {}
+    for name, counts in clips.items():
+        objects, frames = build_scenario(counts, fps)
+        render_video(output_dir / name, objects, frames, background, fps)
+
+        expected = dict.fromkeys(("osobowy_lewo_prawo", "osobowy_prawo_lewo", "ciezarowy_lewo_prawo",
+                                  "ciezarowy_prawo_lewo", "tramwaj", "pieszy", "rowerzysta"), 0)
+        expected.update(counts)
+        ground_truth[name] = to_results(expected)
+
+    with (output_dir / "ground_truth.json").open("w") as output_file:
+        json.dump(ground_truth, output_file, indent=4)
+    return ground_truth
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('output_dir', type=str)
+    parser.add_argument('--background', type=str, default='background.jpg')
+    args = parser.parse_args()
+
+    for name in generate(args.output_dir, background_path=args.background):
+        print(f"Zapisano {Path(args.output_dir) / name}")
@@ -1,36 +1,382 @@
 import argparse
 import json
+import os
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
 from pathlib import Path
 
-import cv2
+# Moduły detekcji (OpenCV, NumPy, scipy) importowane są dopiero w funkcjach, które ich potrzebują - parser
+# argumentów i klient demona przetwarzania (--daemon) startują bez kosztownych importów
+from processing.choices import BACKGROUND_MODELS, DECODERS, DESCRIPTORS, ROI_MARGIN, parse_size
 
-from processing.utils import perform_processing
+
+def process_video(video_path: str, shards: int = 1, pipeline_workers: int = 0, annotate_dir: str = None,
+                  frame_source=None, checkpoint_dir: str = None, **options) -> dict[str, int]:
+    """
+    Przetwarza pojedyncze nagranie - każde wywołanie (również w procesie roboczym) otwiera własny VideoCapture.
+    Dla shards > 1 nagranie jest dzielone na fragmenty czasowe przetwarzane równolegle, a dla pipeline_workers > 0
+    dekodowanie, segmentacja i śledzenie działają w osobnych wątkach. annotate_dir - katalog na nagrania
+    z adnotacjami (<nazwa>_annotated.mp4). frame_source - fabryka źródeł klatek (processing.frame_sources): pamięć
+    podręczna zdekodowanych nagrań (przy pierwszym użyciu nagranie jest do niej dekodowane) albo dekoder ffmpeg
+    (klatki w skali szarości lub w rozdzielczości analizy). checkpoint_dir - katalog punktów kontrolnych
+    (<nazwa>.checkpoint.npz), od których wznawiane jest przerwane przetwarzanie. options - dodatkowe parametry detection().
+    """
+    from processing.frame_sources import open_video
+    from processing.sharding import sharded_detection
+    from processing.utils import perform_processing, to_results
+
+    if annotate_dir is not None:
+        options['output_path'] = str(Path(annotate_dir) / f'{Path(video_path).stem}_annotated.mp4')
+    if checkpoint_dir is not None:
+        options['checkpoint_path'] = str(Path(checkpoint_dir) / f'{Path(video_path).stem}.checkpoint.npz')
+
+    if shards > 1:
+        return to_results(sharded_detection(video_path, shards, frame_source=frame_source, **options))
+
+    cap = open_video(video_path, frame_source)
+    if not options.get('motion_gate'):
+        return perform_processing(cap, pipeline_workers=pipeline_workers, **options)
+
+    gate_stats = {}
+    results = perform_processing(cap, pipeline_workers=pipeline_workers, gate_stats=gate_stats, **options)
+    if gate_stats:
+        print(f'Motion gate {video_path}: skipped {gate_stats["skipped"] + gate_stats["strided"]} of '
+              f'{gate_stats["frames"]} frames ({gate_stats["strided"]} not decoded, {100 * gate_stats["skipped_ratio"]:.1f}%)')
+    return results
+
+
+def profile_video(video_path: str, **kwargs) -> tuple[dict[str, int], dict]:
+    """
+    Jak process_video, ale z pomiarem czasu etapów - zwraca wyniki i raport profilera (processing.profiling)
+    """
+    from processing.profiling import StageProfiler
+
+    profiler = StageProfiler()
+    results = process_video(video_path, profiler=profiler, **kwargs)
+    return results, profiler.report()
+
+
+def save_profile(profiles: dict, results_file: Path):
+    """
+    Zapisuje raporty profilera obok pliku wynikowego (<nazwa>_profile.json)
+    """
+    profile_file = results_file.with_name(f'{results_file.stem}_profile.json')
+    with profile_file.open('w') as output_file:
+        json.dump(dict(sorted(profiles.items())), output_file, indent=4)
+    print(f'Profile report saved to {profile_file}')
+
+
+def run_live(source: str, results_file: Path = None, events: str = '-', events_port: int = None, **options):
+    """
+    Tryb na żywo: zdarzenia zliczeń wysyłane na bieżąco jako JSON lines (plik lub stdout) i do gniazda TCP,
+    raport opóźnień na stderr oraz - jeśli podano plik wynikowy - wyniki i raport (<nazwa>_latency.json) obok niego
+    """
+    from processing.streaming import JsonLinesSink, SocketSink, live_detection
+    from processing.utils import to_results
+
+    events_file = sys.stdout if events == '-' else open(events, 'a', encoding='utf-8')
+    sinks = [JsonLinesSink(events_file)]
+    if events_port is not None:
+        sinks.append(SocketSink(events_port))
+    try:
+        counts, report = live_detection(source, sinks, **options)
+    finally:
+        for sink in sinks:
+            sink.close()
+        if events_file is not sys.stdout:
+            events_file.close()
+
+    print(json.dumps(report, indent=4), file=sys.stderr)
+    if results_file is not None:
+        with results_file.open('w') as output_file:
+            json.dump({Path(source).name: to_results(counts)}, output_file, indent=4)
+        with results_file.with_name(f'{results_file.stem}_latency.json').open('w') as output_file:
+            json.dump(report, output_file, indent=4)
+
+
+def init_worker():
+    """
+    Inicjalizacja procesu roboczego - jeden wątek OpenCV na proces, aby procesy nie konkurowały o rdzenie
+    """
+    import cv2
+
+    cv2.setNumThreads(1)
+
+
+def job_options(args) -> dict:
+    """
+    Opcje przetwarzania nagrań z argumentów wiersza poleceń jako słownik JSON (ścieżki bezwzględne) - ten sam
+    dla przetwarzania lokalnego i zlecenia wysyłanego do demona (--daemon)
+    """
+    options = {'shards': args.shards, 'pipeline_workers': args.pipeline_workers}
+    if args.roi is not None:
+        options['roi_margin'] = args.roi
+    if args.analysis_scale != 1.0:
+        options['analysis_scale'] = args.analysis_scale
+    if args.background != 'static':
+        options['background_model'] = args.background
+    if args.bootstrap_frames > 0:
+        options['bootstrap_frames'] = args.bootstrap_frames
+    if args.descriptor != 'hog':
+        options['descriptor'] = args.descriptor
+    if args.zones is not None:
+        options['zones'] = str(Path(args.zones).resolve())
+    if args.motion_gate:
+        options['motion_gate'] = True
+        if args.idle_stride > 1:
+            options['idle_stride'] = args.idle_stride
+    if args.annotate is not None:
+        options['annotate_dir'] = str(Path(args.annotate).resolve())
+    if args.frame_cache is not None:
+        options['frame_cache'] = str(Path(args.frame_cache).resolve())
+        options['cache_size'] = args.cache_size
+        options['cache_gray'] = args.cache_gray
+    if args.decoder != 'opencv':
+        options['decoder'] = args.decoder
+        options['decode_gray'] = args.decode_gray
+    if args.checkpoint is not None:
+        options['checkpoint_dir'] = str(Path(args.checkpoint).resolve())
+        options['checkpoint_interval'] = args.checkpoint_every
+    if args.profile:
+        options['profile'] = True
+    return options
+
+
+def detection_params(descriptor: str = 'hog', zones: str = None):
+    """
+    DetectionParams z deskryptorem wyglądu i strefami z pliku konfiguracji kamery (domyślnie strefy wbudowane)
+    """
+    from dataclasses import replace
+
+    from processing.objects_detection import DEFAULT_PARAMS
+    from processing.zones import load_zones
+
+    params = DEFAULT_PARAMS
+    if descriptor != 'hog':
+        params = replace(params, descriptor=descriptor)
+    if zones is not None:
+        params = replace(params, **load_zones(zones))
+    return params
+
+
+def video_processor(options: dict):
+    """
+    Funkcja ścieżka nagrania -> wynik dla opcji z job_options: process_video albo, z 'profile', profile_video
+    (wynik to wtedy para wyniki, raport profilera)
+    """
+    from processing.frame_cache import FrameCache
+    from processing.frame_sources import FFmpegDecoder
+    from processing.objects_detection import DEFAULT_PARAMS
+
+    options = dict(options)
+    process = profile_video if options.pop('profile', False) else process_video
+
+    params = detection_params(options.pop('descriptor', 'hog'), options.pop('zones', None))
+    if params != DEFAULT_PARAMS:
+        options['params'] = params
+
+    if options.get('annotate_dir') is not None:
+        Path(options['annotate_dir']).mkdir(parents=True, exist_ok=True)
+    cache_dir = options.pop('frame_cache', None)
+    cache_size, cache_gray = options.pop('cache_size', None), options.pop('cache_gray', False)
+    if cache_dir is not None:
+        # Klatki zapisywane od razu w rozdzielczości analizy - kolejne uruchomienia nie dekodują ani nie skalują
+        options['frame_source'] = FrameCache(cache_dir, cache_size, color=not cache_gray,
+                                             scale=options.get('analysis_scale', 1.0))
+    decoder, decode_gray = options.pop('decoder', 'opencv'), options.pop('decode_gray', False)
+    if decoder == 'ffmpeg':
+        # ffmpeg dekoduje od razu w rozdzielczości analizy (i w skali szarości) - detection() nie skaluje klatek
+        options['frame_source'] = FFmpegDecoder(gray=decode_gray, scale=options.get('analysis_scale', 1.0))
+    return partial(process, **options)
+
+
+def load_results(results_file: Path) -> dict:
+    """
+    Wczytuje wyniki zapisane przez wcześniejsze (np. przerwane) uruchomienie
+    """
+    if not results_file.exists():
+        return {}
+    with results_file.open() as input_file:
+        return json.load(input_file)
+
+
+def save_results(results: dict, videos_paths: list[Path], results_file: Path):
+    """
+    Zapisuje wyniki w kolejności nagrań (tak jak przebieg sekwencyjny) - zapis przez plik tymczasowy,
+    aby przerwanie programu nie zostawiło uszkodzonego pliku wynikowego
+    """
+    ordered = {video_path.name: results[video_path.name] for video_path in videos_paths if video_path.name in results}
+
+    tmp_file = results_file.with_name(results_file.name + '.tmp')
+    with tmp_file.open('w') as output_file:
+        json.dump(ordered, output_file, indent=4)
+    os.replace(tmp_file, results_file)
 
 
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument('videos_dir', type=str)
-    parser.add_argument('results_file', type=str)
+    parser.add_argument('videos_dir', type=str, nargs='?')
+    parser.add_argument('results_file', type=str, nargs='?')
+    parser.add_argument('--workers', type=int, default=1, help='liczba procesów przetwarzających nagrania równolegle')
+    parser.add_argument('--resume', action='store_true', help='pomija nagrania, które są już w pliku wynikowym')
+    parser.add_argument('--shards', type=int, default=1, help='liczba równoległych fragmentów czasowych jednego nagrania')
+    parser.add_argument('--pipeline-workers', type=int, default=0,
+                        help='liczba wątków segmentacji w potoku dekodowanie/segmentacja/śledzenie (0 - bez potoku)')
+    parser.add_argument('--roi', nargs='?', type=int, const=ROI_MARGIN, default=None, metavar='MARGIN',
+                        help=f'segmentacja tylko w strefach analizy powiększonych o margines (domyślnie {ROI_MARGIN} px)')
+    parser.add_argument('--analysis-scale', type=float, default=1.0,
+                        help='skala klatki do analizy, np. 0.5 (progi i strefy są przeliczane automatycznie)')
+    parser.add_argument('--background', choices=BACKGROUND_MODELS, default='static',
+                        help='model tła: stały obraz, średnia krocząca lub MOG2/KNN')
+    parser.add_argument('--bootstrap-frames', type=int, default=0,
+                        help='wyznacz tło jako medianę tylu pierwszych klatek każdego nagrania (zamiast background.jpg)')
+    parser.add_argument('--descriptor', choices=DESCRIPTORS, default='hog',
+                        help='deskryptor wyglądu w trackerze (hog_small i histogram są wielokrotnie tańsze)')
+    parser.add_argument('--motion-gate', action='store_true',
+                        help='pomijaj segmentację klatek, w których strefy analizy nie różnią się od tła')
+    parser.add_argument('--idle-stride', type=int, default=1,
+                        help='z --motion-gate: przy pustej scenie analizuj tylko co k-tą klatkę (pozostałe bez dekodowania)')
+    parser.add_argument('--annotate', type=str, default=None, metavar='DIR',
+                        help='zapisz nagrania z zaznaczonymi strefami i obiektami do katalogu DIR (w osobnym wątku)')
+    parser.add_argument('--profile', action='store_true',
+                        help='mierz czasy etapów (percentyle), FPS i pamięć; raport zapisywany obok pliku wynikowego')
+    parser.add_argument('--frame-cache', type=str, default=None, metavar='DIR',
+                        help='czytaj klatki z pamięci podręcznej zdekodowanych nagrań w DIR (pierwsze uruchomienie ją tworzy)')
+    parser.add_argument('--cache-size', type=parse_size, default=None, metavar='SIZE',
+                        help='maksymalny rozmiar pamięci podręcznej, np. 20GB (najdawniej używane nagrania są usuwane)')
+    parser.add_argument('--cache-gray', action='store_true',
+                        help='pamięć podręczna tylko w skali szarości (3x mniejsza, deskryptory liczone bez koloru)')
+    parser.add_argument('--decoder', choices=DECODERS, default='opencv',
+                        help='dekoder nagrań: cv2.VideoCapture albo zewnętrzny program ffmpeg (surowe klatki przez potok)')
+    parser.add_argument('--decode-gray', action='store_true',
+                        help='z --decoder ffmpeg: dekoduj od razu do skali szarości (deskryptory liczone bez koloru)')
+    parser.add_argument('--zones', type=str, default=None, metavar='FILE',
+                        help='plik konfiguracji stref kamery (JSON z extra_testing_utils/create_zone.py) zamiast stref domyślnych')
+    parser.add_argument('--live', type=str, default=None, metavar='SOURCE',
+                        help='tryb na żywo: plik (odtwarzany w tempie nagrania), numer kamery lub adres strumienia; '
+                             'argumentem pozycyjnym jest wtedy tylko opcjonalny plik wynikowy')
+    parser.add_argument('--events', type=str, default='-', metavar='FILE',
+                        help='z --live: plik zdarzeń zliczeń w formacie JSON lines ("-" - standardowe wyjście)')
+    parser.add_argument('--events-port', type=int, default=None, metavar='PORT',
+                        help='z --live: wysyłaj zdarzenia także do klientów gniazda TCP 127.0.0.1:PORT')
+    parser.add_argument('--latency-budget', type=float, default=None, metavar='MS',
+                        help='z --live: budżet opóźnienia klatki w ms - klatki, które by go przekroczyły, są pomijane')
+    parser.add_argument('--checkpoint', type=str, default=None, metavar='DIR',
+                        help='zapisuj w tle punkty kontrolne stanu detekcji do DIR; przerwane nagranie jest wznawiane od ostatniego')
+    parser.add_argument('--checkpoint-every', type=float, default=60.0, metavar='SECONDS',
+                        help='z --checkpoint: odstęp między punktami kontrolnymi w sekundach nagrania')
+    parser.add_argument('--serve', type=str, default=None, metavar='SOCKET',
+                        help='uruchom demona przetwarzania (--workers procesów) przyjmującego zlecenia przez gniazdo Unix SOCKET')
+    parser.add_argument('--daemon', type=str, default=None, metavar='SOCKET',
+                        help='zleć przetworzenie nagrań demonowi uruchomionemu z --serve SOCKET (bez kosztu startu)')
     args = parser.parse_args()
+    if args.serve is not None:
+        if args.videos_dir is not None or args.live is not None or args.daemon is not None:
+            parser.error('--serve nie przyjmuje nagrań - zlecenia wysyła klient z --daemon')
+    elif args.live is None and args.results_file is None:
+        parser.error('wymagane argumenty: videos_dir results_file (albo --live SOURCE, --serve SOCKET)')
+    if args.live is not None and args.results_file is not None:
+        parser.error('z --live podaj tylko plik wynikowy (bez katalogu nagrań)')
+    if args.live is not None and (args.shards > 1 or args.pipeline_workers > 0 or args.annotate or args.profile
+                                  or args.frame_cache or args.motion_gate or args.background != 'static'
+                                  or args.bootstrap_frames > 0 or args.resume or args.workers > 1
+                                  or args.daemon is not None or args.checkpoint is not None
+                                  or args.decoder != 'opencv'):
+        parser.error('--live działa tylko z --roi, --analysis-scale, --descriptor i --zones')
+    if args.shards > 1 and args.pipeline_workers > 0:
+        parser.error('--shards nie działa razem z --pipeline-workers (fragmenty przetwarzane są bez potoku)')
+    if args.daemon is not None and args.workers > 1:
+        parser.error('z --daemon liczbę procesów roboczych ustala demon (--serve --workers N)')
+    if args.annotate is not None and (args.shards > 1 or args.pipeline_workers > 0):
+        parser.error('--annotate nie działa razem z --shards ani --pipeline-workers')
+    if args.profile and (args.shards > 1 or args.pipeline_workers > 0):
+        parser.error('--profile nie działa razem z --shards ani --pipeline-workers (potok ma własne statystyki)')
+    if args.checkpoint is not None and (args.shards > 1 or args.pipeline_workers > 0 or args.background != 'static'):
+        parser.error('--checkpoint działa tylko bez --shards i --pipeline-workers, ze stałym tłem (--background static)')
+    if (args.cache_gray or args.decode_gray) and args.descriptor == 'histogram':
+        parser.error('--descriptor histogram wymaga kolorowych klatek (bez --cache-gray i --decode-gray)')
+    if args.decode_gray and args.decoder != 'ffmpeg':
+        parser.error('--decode-gray wymaga --decoder ffmpeg')
+    if args.decoder == 'ffmpeg' and args.daemon is None and shutil.which('ffmpeg') is None:
+        parser.error('--decoder ffmpeg wymaga programu ffmpeg w PATH')
+    if args.decoder == 'ffmpeg' and (args.frame_cache is not None or args.pipeline_workers > 0):
+        parser.error('--decoder ffmpeg nie działa z --frame-cache ani --pipeline-workers (klatki w jednym buforze)')
+
+    if args.serve is not None:
+        from processing.daemon import WorkerDaemon
+
+        WorkerDaemon(args.serve, video_processor, args.workers if args.workers > 1 else None).serve_forever()
+        return
+
+    if args.live is not None:
+        run_live(args.live, Path(args.videos_dir) if args.videos_dir is not None else None, args.events, args.events_port,
+                 latency_budget=args.latency_budget / 1000 if args.latency_budget is not None else None,
+                 roi_margin=args.roi, analysis_scale=args.analysis_scale,
+                 params=detection_params(args.descriptor, args.zones))
+        return
 
     videos_dir = Path(args.videos_dir)
     results_file = Path(args.results_file)
 
     videos_paths = sorted([video_path for video_path in videos_dir.iterdir() if video_path.name.endswith('.mp4')])
-    results = {}
+    results = load_results(results_file) if args.resume else {}
+
+    options = job_options(args)
+    pending = [video_path for video_path in videos_paths if video_path.name not in results]
     for video_path in videos_paths:
-        cap = cv2.VideoCapture(str(video_path))
-        if cap is None:
-            print(f'Error loading video {video_path}')
-            continue
-        else:
+        if video_path.name in results:
+            print(f'Skipping video {video_path} (already in results)')
+
+    profiles = {}
+
+    def store(video_path, outcome):
+        if args.profile:
+            outcome, profiles[video_path.name] = outcome
+        results[video_path.name] = outcome
+
+    if args.daemon is not None:
+        from processing.daemon import submit
+
+        by_path = {str(video_path.resolve()): video_path for video_path in pending}
+        for video_path in pending:
+            print(f'Processing video {video_path}')
+        for response in submit(args.daemon, pending, options):
+            video_path = by_path.get(response.get('video'))
+            if video_path is None or 'error' in response:
+                print(f'Error processing video {video_path or ""}: {response.get("error")}')
+                continue
+            store(video_path, response['result'])
+            print(f'Finished video {video_path} ({response["seconds"]:.2f} s)')
+            save_results(results, videos_paths, results_file)
+    elif args.workers <= 1:
+        process = video_processor(options)
+        for video_path in pending:
             print(f'Processing video {video_path}')
+            store(video_path, process(str(video_path)))
+            save_results(results, videos_paths, results_file)    # Zapis po każdym nagraniu - awaria nie traci gotowych wyników
+    else:
+        process = video_processor(options)
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker) as executor:
+            futures = {executor.submit(process, str(video_path)): video_path for video_path in pending}
+            for video_path in pending:
+                print(f'Processing video {video_path}')
 
-        results[video_path.name] = perform_processing(cap)
+            for future in as_completed(futures):
+                video_path = futures[future]
+                try:
+                    store(video_path, future.result())
+                except Exception as error:
+                    print(f'Error processing video {video_path}: {error}')
+                    continue
+                print(f'Finished video {video_path}')
+                save_results(results, videos_paths, results_file)
 
-    with results_file.open('w') as output_file:
-        json.dump(results, output_file, indent=4)
+    save_results(results, videos_paths, results_file)
+    if args.profile:
+        save_profile(profiles, results_file)
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,75 @@
+import queue
+import threading
+
+import cv2
+
+
+class AnnotatedVideoWriter:
+    """
+    Zapis nagrania z adnotacjami (strefy, bboxy i etykiety obiektów) w osobnym wątku.
+
+    Detekcja przekazuje klatkę i listę wykrytych obiektów do ograniczonej kolejki (`queue_size` klatek), a rysowanie
+    i kodowanie (cv2.VideoWriter) odbywają się w wątku zapisu. Gdy wątek nie nadąża i kolejka jest pełna, klatka
+    nie trafia do kolejki (licznik `dropped`) zamiast wstrzymywać detekcję - w nagraniu zastępuje ją powtórzona
+    poprzednia zapisana klatka, więc liczba klatek i czas nagrania zgadzają się ze źródłem.
+    """
+
+    def __init__(self, path, fps, render, queue_size=32, fourcc="mp4v"):
+        self.path = str(path)
+        self.fps = fps if fps > 0 else 30
+        self.render = render                    # render(frame, frame_objects) -> klatka z adnotacjami
+        self.fourcc = cv2.VideoWriter_fourcc(*fourcc)
+        self.frames = queue.Queue(maxsize=queue_size)
+        self.written = 0                        # Klatki w nagraniu, łącznie z powtórzonymi
+        self.dropped = 0                        # Klatki zastąpione powtórzeniem poprzedniej
+        self.repeats = 0                        # Pominięte klatki, których powtórzenie nie trafiło jeszcze do kolejki
+        self.error = None
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def write(self, frame, frame_objects):
+        """
+        Przekazuje klatkę do zapisu - nie blokuje. Klatka przechodzi na własność wątku zapisu (nie może być już
+        modyfikowana przez wywołującego).
+        """
+        try:
+            self.frames.put_nowait((self.repeats, frame, frame_objects))
+            self.repeats = 0
+        except queue.Full:
+            self.dropped += 1
+            self.repeats += 1       # Powtórzenie zapisywane przed następną klatką, która zmieści się w kolejce
+
+    def run(self):
+        writer, last = None, None
+        try:
+            while True:
+                repeats, frame, frame_objects = self.frames.get()
+                for _ in range(repeats if last is not None else 0):
+                    writer.write(last)
+                    self.written += 1
+                if frame is None:
+                    break
+                if frame.ndim == 2:     # Klatki w skali szarości (pamięć podręczna bez koloru)
+                    frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+                if writer is None:      # Rozmiar nagrania znany dopiero z pierwszej klatki
+                    writer = cv2.VideoWriter(self.path, self.fourcc, self.fps, (frame.shape[1], frame.shape[0]))
+                last = self.render(frame, frame_objects)
+                writer.write(last)
+                self.written += 1
+        except Exception as error:
+            self.error = error
+            while frame is not None:        # Opróżnienie kolejki (do znacznika z close()), aby write() jej nie zapełniał
+                frame = self.frames.get()[1]
+        finally:
+            if writer is not None:
+                writer.release()
+
+    def close(self):
+        """
+        Czeka na zapis klatek z kolejki (i powtórzeń pominiętych ostatnich klatek) i zamyka plik
+        """
+        self.frames.put((self.repeats, None, None))
+        self.repeats = 0
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
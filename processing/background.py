@@ -0,0 +1,154 @@
+import cv2
+import numpy as np
+from processing.choices import BACKGROUND_MODELS
+
+
+class StaticBackground:
+    """
+    Stały model tła - pojedynczy obraz (np. background.jpg albo mediana pierwszych klatek nagrania)
+    """
+
+    adaptive = False    # Model nie zmienia się w trakcie nagrania, więc klatki mogą być przetwarzane w dowolnej kolejności
+
+    def __init__(self, image):
+        self.image = image      # Obraz tła w skali szarości (uint8)
+
+    def foreground(self, gray, roi, threshold):
+        """
+        Maska pierwszoplanowa dla wycinka `gray` klatki, odpowiadającego prostokątowi roi=(x0, y0, x1, y1)
+        """
+        x0, y0, x1, y1 = roi
+        diff = cv2.absdiff(self.image[y0:y1, x0:x1], gray)                  # Obraz różnicowy
+        _, mask = cv2.threshold(diff, threshold, 255, cv2.THRESH_BINARY)    # Progowanie binarne
+        return mask
+
+    def update(self, gray, roi):
+        """
+        Aktualizacja modelu wycinkiem klatki bez wyznaczania maski (klatki pominięte przez bramkę ruchu) -
+        tło stałe się nie zmienia
+        """
+
+    def memory_bytes(self):
+        return self.image.nbytes
+
+
+class RunningAverageBackground(StaticBackground):
+    """
+    Tło jako średnia krocząca klatek (cv2.accumulateWeighted) - powoli wchłania zmiany oświetlenia.
+
+    Średnia aktualizowana jest co `update_interval` klatek (ze współczynnikiem przeliczonym tak, aby stała czasowa
+    nie zależała od interwału), więc koszt na klatkę to absdiff + threshold, jak dla tła stałego, plus niewielki
+    zamortyzowany koszt aktualizacji. Pamięć: jeden obraz float32 i jeden uint8 wielkości klatki.
+    """
+
+    adaptive = True
+
+    def __init__(self, image, alpha=0.002, update_interval=10):
+        super().__init__(image.copy())
+        self.model = image.astype(np.float32)                       # Średnia krocząca (float32)
+        self.alpha = 1 - (1 - alpha) ** update_interval             # Współczynnik uczenia na jedną aktualizację
+        self.update_interval = update_interval
+        self.calls = {}                                             # Licznik klatek osobno dla każdego wycinka
+
+    def foreground(self, gray, roi, threshold):
+        mask = super().foreground(gray, roi, threshold)
+        self.update(gray, roi)
+        return mask
+
+    def update(self, gray, roi):
+        calls = self.calls.get(roi, 0) + 1
+        self.calls[roi] = calls
+        if calls % self.update_interval == 0:
+            x0, y0, x1, y1 = roi
+            model = self.model[y0:y1, x0:x1]                        # Widok - aktualizacja w miejscu
+            cv2.accumulateWeighted(gray, model, self.alpha)
+            self.image[y0:y1, x0:x1] = cv2.convertScaleAbs(model)
+
+    def memory_bytes(self):
+        return self.image.nbytes + self.model.nbytes
+
+
+class SubtractorBackground:
+    """
+    Model tła oparty o cv2.BackgroundSubtractorMOG2 / KNN (mieszanina rozkładów na piksel).
+    Dokładniejszy przy zmiennym oświetleniu, ale wielokrotnie droższy od absdiff + threshold - najlepiej używać
+    razem z analysis_scale i/lub trybem ROI. Cienie (wartość 127 w masce) nie są traktowane jako pierwszy plan.
+    """
+
+    adaptive = True
+
+    def __init__(self, image, kind="mog2", history=500):
+        self.image = image
+        self.kind = kind
+        self.history = history
+        self.subtractors = {}       # Osobny model dla każdego wycinka (modele wymagają stałego rozmiaru obrazu)
+
+    def create_subtractor(self, roi):
+        if self.kind == "knn":
+            subtractor = cv2.createBackgroundSubtractorKNN(history=self.history, detectShadows=True)
+        else:
+            subtractor = cv2.createBackgroundSubtractorMOG2(history=self.history, detectShadows=True)
+
+        x0, y0, x1, y1 = roi
+        subtractor.apply(self.image[y0:y1, x0:x1], learningRate=1)    # Inicjalizacja modelu obrazem tła
+        return subtractor
+
+    def subtractor(self, roi):
+        subtractor = self.subtractors.get(roi)
+        if subtractor is None:
+            subtractor = self.subtractors[roi] = self.create_subtractor(roi)
+        return subtractor
+
+    def foreground(self, gray, roi, threshold):
+        mask = self.subtractor(roi).apply(gray)
+        _, mask = cv2.threshold(mask, 200, 255, cv2.THRESH_BINARY)    # Odrzucenie cieni
+        return mask
+
+    def update(self, gray, roi):
+        self.subtractor(roi).apply(gray)
+
+    def memory_bytes(self):
+        # Szacunek: MOG2 przechowuje do 5 składowych (waga, średnia, wariancja) na piksel, KNN - podobnej wielkości
+        # zbiór próbek historii
+        return self.image.nbytes * (1 + 5 * 3 * 4)
+
+
+def create_background_model(kind, image):
+    """
+    Tworzy model tła wybranego rodzaju na podstawie początkowego obrazu tła w skali szarości
+    """
+    if kind == "static":
+        return StaticBackground(image)
+    if kind == "running_average":
+        return RunningAverageBackground(image)
+    if kind in ("mog2", "knn"):
+        return SubtractorBackground(image, kind)
+    raise ValueError(f"Nieznany model tła: {kind} (dostępne: {', '.join(BACKGROUND_MODELS)})")
+
+
+def bootstrap_background(cap: cv2.VideoCapture, frames=150, samples=25, prepare=None):
+    """
+    Wyznacza obraz tła jako medianę klatek próbkowanych z `frames` kolejnych klatek nagrania (od bieżącej pozycji),
+    bez potrzeby osobnego pliku background.jpg. Przechowywanych jest najwyżej `samples` klatek.
+    Po zakończeniu pozycja nagrania wraca do punktu wyjścia. `prepare` - przekształcenie klatki w skali szarości
+    (np. przeskalowanie do rozdzielczości analizy). Zwraca None, jeśli nie udało się odczytać żadnej klatki.
+    """
+    position = cap.get(cv2.CAP_PROP_POS_FRAMES)
+    step = max(1, frames // samples)
+
+    sampled = []
+    for index in range(frames):
+        if index % step == 0 and len(sampled) < samples:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+            sampled.append(prepare(gray) if prepare is not None else gray)
+        elif not cap.grab():        # Pominięcie klatki bez dekodowania jej do obrazu
+            break
+
+    cap.set(cv2.CAP_PROP_POS_FRAMES, position)
+
+    if not sampled:
+        return None
+    return np.median(np.stack(sampled), axis=0).astype(np.uint8)
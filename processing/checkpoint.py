@@ -0,0 +1,155 @@
+import json
+import os
+import queue
+import threading
+from pathlib import Path
+
+import numpy as np
+
+# Wersja formatu pliku punktu kontrolnego - plik w innej wersji jest pomijany (przetwarzanie od początku)
+CHECKPOINT_VERSION = 1
+
+
+def snapshot(counter, frame_index, gate=None) -> dict[str, np.ndarray]:
+    """
+    Stan detection() po klatce `frame_index` jako słownik tablic: tracker (tylko zajęte sloty magazynu,
+    z numerami slotów i stosem wolnych slotów, aby dopasowania po wznowieniu były identyczne), zbiór zliczonych ID,
+    licznik ID, zliczenia, blokada tramwajów oraz liczniki bramki ruchu. Tablice są kopiami - po powrocie
+    stan można dalej zmieniać, a zapis odbywa się w innym wątku.
+
+    Rozmiar zależy tylko od liczby obiektów śledzonych w danej chwili, nie od długości nagrania.
+    """
+    tracker = counter.tracker
+    store = tracker.store
+    slots = store.active_slots()
+    meta = {
+        "version": CHECKPOINT_VERSION,
+        "frame_index": frame_index,
+        "object_id": tracker.object_id,
+        "tramwaj_block_until": counter.tramwaj_block_until,
+        "counts": counter.counts,
+        "capacity": store.capacity,
+        "gate": None if gate is None else {"idle": gate.idle, "frames": gate.frames, "skipped": gate.skipped,
+                                           "strided": gate.strided},
+    }
+    return {
+        "meta": np.array(json.dumps(meta)),
+        "counted_ids": np.array(sorted(tracker.counted_ids), dtype=np.int64),
+        "free": np.array(store.free, dtype=np.int64),
+        "slots": slots,
+        "ids": store.ids[slots],
+        "centroids": store.centroids[slots],
+        "bboxes": store.bboxes[slots],
+        "first_seen": store.first_seen[slots],
+        "missed": store.missed[slots],
+        "in_pedestrian_zone": store.in_pedestrian_zone[slots],
+        "descriptors": store.descriptors[slots],
+        "norms": store.norms[slots],
+    }
+
+
+def restore(counter, state, gate=None) -> int:
+    """
+    Odtwarza stan zapisany przez snapshot() w świeżo utworzonym ObjectCounter (i bramce ruchu). Zwraca indeks
+    klatki, od której należy kontynuować odczyt.
+    """
+    meta = json.loads(str(state["meta"]))
+    tracker = counter.tracker
+    store = tracker.store
+    if store.descriptors.shape[1] != state["descriptors"].shape[1] or store.descriptors.dtype != state["descriptors"].dtype:
+        raise ValueError("Punkt kontrolny zapisany z innym deskryptorem wyglądu")
+
+    store.grow(meta["capacity"])
+    slots = state["slots"]
+    store.active[:] = False
+    store.missed[:] = 0
+    store.active[slots] = True
+    for name in ("ids", "centroids", "bboxes", "first_seen", "missed", "in_pedestrian_zone", "descriptors", "norms"):
+        getattr(store, name)[slots] = state[name]
+    store.slots = {int(obj_id): int(slot) for obj_id, slot in zip(state["ids"], slots)}
+    store.free = [int(slot) for slot in state["free"]]
+
+    tracker.object_id = meta["object_id"]
+    tracker.counted_ids = {int(obj_id) for obj_id in state["counted_ids"]}
+    counter.tramwaj_block_until = meta["tramwaj_block_until"]
+    counter.counts = dict(meta["counts"])
+
+    if gate is not None and meta["gate"] is not None:
+        for name, value in meta["gate"].items():
+            setattr(gate, name, value)
+    return meta["frame_index"]
+
+
+def load_checkpoint(path, key: str):
+    """
+    Wczytuje punkt kontrolny z pliku `path` albo zwraca None, jeśli go nie ma lub zapisano go dla innego
+    nagrania albo innych parametrów (`key` - opis nagrania i parametrów, z którymi go utworzono)
+    """
+    path = Path(path)
+    if not path.is_file():
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        state = {name: data[name] for name in data.files}
+    meta = json.loads(str(state["meta"]))
+    if meta.get("version") != CHECKPOINT_VERSION or meta.get("key") != key:
+        print(f"Punkt kontrolny {path} dotyczy innego nagrania lub parametrów - przetwarzanie od początku")
+        return None
+    return state
+
+
+class CheckpointWriter:
+    """
+    Zapis punktów kontrolnych w osobnym wątku. save() tylko przekazuje gotową migawkę (snapshot) i nie czeka
+    na dysk; jeśli poprzednia migawka nie została jeszcze zapisana, jest zastępowana nowszą. Plik zapisywany jest
+    przez plik tymczasowy i os.replace, więc przerwanie programu w trakcie zapisu zostawia poprzedni punkt kontrolny.
+    """
+
+    def __init__(self, path, key: str):
+        self.path = Path(path)
+        self.key = key
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.pending = queue.Queue(maxsize=1)
+        self.written = 0
+        self.replaced = 0           # Migawki zastąpione nowszymi przed zapisem
+        self.error = None
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def save(self, state):
+        meta = json.loads(str(state["meta"]))
+        state["meta"] = np.array(json.dumps({**meta, "key": self.key}))
+        while True:
+            try:
+                self.pending.put_nowait(state)
+                return
+            except queue.Full:
+                try:
+                    self.pending.get_nowait()
+                    self.replaced += 1
+                except queue.Empty:
+                    pass
+
+    def run(self):
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        while True:
+            state = self.pending.get()
+            if state is None:
+                break
+            try:
+                with tmp_path.open("wb") as checkpoint_file:
+                    np.savez(checkpoint_file, **state)
+                os.replace(tmp_path, self.path)
+                self.written += 1
+            except Exception as error:      # Błąd zapisu zgłaszany w close() - wątek obsługuje kolejne migawki
+                self.error = error
+
+    def close(self, remove=False):
+        """
+        Czeka na zapis oczekującej migawki. remove=True - przetwarzanie zakończone, punkt kontrolny jest usuwany.
+        """
+        self.pending.put(None)
+        self.thread.join()
+        if remove:
+            self.path.unlink(missing_ok=True)
+        if self.error is not None:
+            raise self.error
@@ -0,0 +1,27 @@
+# Warianty, wartości domyślne i parsowanie opcji wiersza poleceń. Moduł nie importuje OpenCV ani NumPy, aby main.py
+# (w tym klient demona przetwarzania) mógł zbudować parser argumentów bez kosztownych importów.
+
+# Modele tła (processing.background.create_background_model)
+BACKGROUND_MODELS = ("static", "running_average", "mog2", "knn")
+
+# Deskryptory wyglądu trackera (processing.descriptors.create_descriptor_engine)
+DESCRIPTORS = ("hog", "hog_small", "histogram")
+
+# Dekodery nagrań (processing.frame_sources)
+DECODERS = ("opencv", "ffmpeg")
+
+# Domyślny margines wokół stref w trybie ROI - obiekty wystające poza strefę nie mogą zostać przycięte,
+# bo zmieniłoby to ich bbox, a więc centroid i klasyfikację
+ROI_MARGIN = 150
+
+
+def parse_size(text: str) -> int:
+    """
+    Rozmiar w bajtach z tekstu typu "500MB", "20GB" lub liczby bajtów
+    """
+    units = {"KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3, "TB": 1024 ** 4}
+    text = text.strip().upper()
+    for unit, multiplier in units.items():
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * multiplier)
+    return int(text)
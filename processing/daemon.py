@@ -0,0 +1,155 @@
+import json
+import os
+import signal
+import socket
+import socketserver
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+# Moduł nie importuje OpenCV ani NumPy na poziomie modułu - klient (submit) startuje bez kosztownych importów,
+# a serwer importuje moduły detekcji raz, przy starcie (warm_up).
+
+
+def warm_up(background_path="background.jpg"):
+    """
+    Przygotowanie procesu demona: import modułów detekcji, OpenCV i scipy oraz wczytanie obrazu tła do pamięci
+    (processing.objects_detection.load_background). Procesy robocze tworzone przez fork dziedziczą ten stan,
+    a przy innej metodzie startu wykonują warm_up same (initializer puli).
+    """
+    import cv2
+    import scipy.optimize  # noqa: F401 - import na zapas, tracker importuje go przy pierwszym dopasowaniu
+    from processing.objects_detection import load_background
+
+    cv2.setNumThreads(1)
+    load_background(background_path)
+
+
+def start_worker(background_path="background.jpg"):
+    """
+    Initializer procesu roboczego: przywraca domyślną obsługę SIGTERM (proces utworzony przez fork dziedziczy
+    obsługę demona, która tylko ustawia flagę zatrzymania) i wykonuje warm_up
+    """
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    warm_up(background_path)
+
+
+def timed(processor, video_path):
+    """
+    Przetwarza nagranie w procesie roboczym - zwraca wynik i czas przetwarzania
+    """
+    start = time.perf_counter()
+    outcome = processor(video_path)
+    return outcome, time.perf_counter() - start
+
+
+class WorkerDaemon:
+    """
+    Demon przetwarzania nagrań: długo działający proces z pulą `workers` procesów roboczych, przyjmujący zlecenia
+    przez lokalne gniazdo Unix `socket_path`. Importy, obraz tła i skompilowane strefy (processing.zones.zone_map)
+    pozostają w pamięci między zleceniami, więc kolejne nagrania nie płacą kosztu startu programu.
+
+    Protokół - wiersze JSON. Zlecenie: {"videos": [ścieżki], "options": {...}}, gdzie options to opcje
+    przetwarzania zamieniane przez `make_processor(options)` na funkcję ścieżka -> wynik. Odpowiedzi, w kolejności
+    ukończenia: {"video": ścieżka, "result": ..., "seconds": czas} albo {"video": ścieżka, "error": opis}, na końcu
+    {"done": true}. Nagrania z jednego zlecenia, jak i zlecenia różnych klientów, przetwarzane są równolegle.
+    Zlecenie {"command": "ping"} zwraca {"pong": true, "pid": ..., "workers": ...}.
+    """
+
+    def __init__(self, socket_path, make_processor, workers=None, background_path="background.jpg"):
+        self.socket_path = Path(socket_path)
+        self.make_processor = make_processor
+        self.workers = workers or os.cpu_count()
+        self.background_path = background_path
+
+    def serve_forever(self):
+        warm_up(self.background_path)
+        if self.socket_path.exists():
+            self.socket_path.unlink()           # Gniazdo pozostawione przez poprzedni, przerwany proces
+
+        # Sygnał tylko ustawia flagę - zamknięcie gniazda i puli odbywa się w głównym wątku, poza ramką sygnału
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+
+        daemon = self
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=start_worker,
+                                 initargs=(self.background_path,)) as executor:
+
+            class Handler(socketserver.StreamRequestHandler):
+                def handle(self):
+                    for line in self.rfile:
+                        for response in daemon.handle_request(json.loads(line), executor):
+                            self.wfile.write((json.dumps(response) + "\n").encode())
+                            self.wfile.flush()
+
+            with socketserver.ThreadingUnixStreamServer(str(self.socket_path), Handler) as server:
+                server.daemon_threads = True
+                listener = threading.Thread(target=server.serve_forever, daemon=True)
+                listener.start()
+                print(f"Demon przetwarzania: {self.socket_path} ({self.workers} procesów roboczych)", flush=True)
+                try:
+                    stop.wait()
+                except KeyboardInterrupt:
+                    pass
+                finally:
+                    server.shutdown()               # Koniec przyjmowania zleceń, potem zamknięcie gniazda
+                    self.socket_path.unlink(missing_ok=True)
+                    executor.shutdown(wait=False, cancel_futures=True)
+
+    def handle_request(self, request, executor):
+        if request.get("command") == "ping":
+            yield {"pong": True, "pid": os.getpid(), "workers": self.workers}
+            return
+
+        try:
+            processor = self.make_processor(request.get("options", {}))
+        except Exception as error:
+            yield {"error": f"{type(error).__name__}: {error}"}
+            yield {"done": True}
+            return
+
+        futures = {executor.submit(timed, processor, video_path): video_path for video_path in request["videos"]}
+        for future in as_completed(futures):
+            try:
+                outcome, seconds = future.result()
+            except Exception as error:
+                yield {"video": futures[future], "error": f"{type(error).__name__}: {error}"}
+                continue
+            yield {"video": futures[future], "result": outcome, "seconds": seconds}
+        yield {"done": True}
+
+
+def request(socket_path, message: dict):
+    """
+    Wysyła zlecenie do demona i zwraca kolejne odpowiedzi (bez końcowego {"done": true})
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(str(socket_path))
+        client.sendall((json.dumps(message) + "\n").encode())
+        with client.makefile("r", encoding="utf-8") as responses:
+            for line in responses:
+                response = json.loads(line)
+                if response.get("done"):
+                    return
+                yield response
+                if "pong" in response:
+                    return
+
+
+def submit(socket_path, videos, options: dict):
+    """
+    Klient: zleca demonowi przetworzenie nagrań `videos` (ścieżki bezwzględne, bo demon może działać w innym
+    katalogu) i zwraca odpowiedzi w kolejności ukończenia
+    """
+    return request(socket_path, {"videos": [str(Path(video).resolve()) for video in videos], "options": options})
+
+
+def ping(socket_path):
+    """
+    Informacje o działającym demonie albo None, jeśli demon nie odpowiada
+    """
+    try:
+        return next(request(socket_path, {"command": "ping"}), None)
+    except OSError:
+        return None
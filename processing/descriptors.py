@@ -0,0 +1,102 @@
+import cv2
+import numpy as np
+from processing.choices import DESCRIPTORS
+
+
+class HogDescriptorEngine:
+    """
+    Deskryptory HOG (Histogram of Oriented Gradients) dla wszystkich obiektów klatki.
+
+    HOGDescriptor tworzony jest raz. Wycinki obiektów są skalowane do okna HOG i układane jeden pod drugim
+    we wcześniej zaalokowanej mozaice, a deskryptory wszystkich okien liczone jednym wywołaniem hog.compute
+    do wspólnej tablicy. Każdy kafelek mozaiki ma dodatkowy wiersz nad i pod oknem (odbicie jak BORDER_REFLECT_101),
+    dzięki czemu gradienty na krawędziach okna - a więc i deskryptor - są identyczne jak dla pojedynczego obrazu.
+    """
+
+    def __init__(self, win_size=64, block_size=8, block_stride=4, cell_size=4, nbins=9):
+        self.win = win_size                             # Rozmiar okna detekcji HOG – obraz wejściowy (ROI) zostanie przeskalowany do tego rozmiaru
+        self.hog = cv2.HOGDescriptor((win_size, win_size),
+                                     (block_size, block_size),      # Rozmiar bloku, czyli obszaru, z którego będą normalizowane gradienty
+                                     (block_stride, block_stride),  # Krok przesuwania bloku po obrazie
+                                     (cell_size, cell_size),        # Rozmiar pojedynczej komórki, w której liczony jest histogram gradientów
+                                     nbins)                         # Liczba przedziałów histogramu kierunku gradientu (9 - kierunki co 20 stopni)
+        self.size = self.hog.getDescriptorSize()        # Długość wektora cech
+        self.tile = win_size + 2                        # Wysokość kafelka mozaiki (okno + wiersz odbicia nad i pod)
+        self.mosaic = np.empty((0, win_size, 3), dtype=np.uint8)
+
+    def compute(self, frame, bboxes):
+        """
+        Zwraca tablicę (liczba obiektów, size) float32 z deskryptorami wycinków `bboxes` (x, y, w, h) klatki
+        """
+        count = len(bboxes)
+        if count == 0:
+            return np.empty((0, self.size), dtype=np.float32)
+
+        # Mozaika rośnie tylko, gdy w klatce jest więcej obiektów niż dotąd (lub zmienia się liczba kanałów klatki)
+        if len(self.mosaic) < count * self.tile or self.mosaic.shape[2:] != frame.shape[2:]:
+            self.mosaic = np.empty((count * self.tile, self.win) + frame.shape[2:], dtype=np.uint8)
+
+        win, tile, mosaic = self.win, self.tile, self.mosaic
+        for i, (x, y, w, h) in enumerate(bboxes):
+            top = i * tile
+            cv2.resize(frame[y:y+h, x:x+w], (win, win), dst=mosaic[top + 1:top + 1 + win])
+            mosaic[top] = mosaic[top + 2]                           # Odbicie pierwszego i ostatniego wiersza okna
+            mosaic[top + 1 + win] = mosaic[top + win - 1]
+
+        locations = [(0, i * tile + 1) for i in range(count)]
+        descriptors = self.hog.compute(mosaic[:count * tile], (win, tile), (0, 0), locations)
+        return descriptors.reshape(count, self.size)
+
+
+class ColorHistogramEngine:
+    """
+    Tani deskryptor wyglądu: znormalizowany histogram 2D barwy i nasycenia (HSV) wycinka obiektu.
+    Wycinki są skalowane do małego kafelka, konwertowane do HSV jednym wywołaniem dla całej mozaiki,
+    a histogramy wszystkich obiektów liczone jednym np.bincount.
+    """
+
+    def __init__(self, size=32, hue_bins=16, saturation_bins=8):
+        self.win = size
+        self.hue_bins = hue_bins
+        self.saturation_bins = saturation_bins
+        self.size = hue_bins * saturation_bins
+        self.mosaic = np.empty((0, size, 3), dtype=np.uint8)
+
+    def compute(self, frame, bboxes):
+        count = len(bboxes)
+        if count == 0:
+            return np.empty((0, self.size), dtype=np.float32)
+
+        if frame.ndim != 3:
+            raise ValueError("Deskryptor histogram wymaga kolorowych klatek")
+        if len(self.mosaic) < count * self.win:
+            self.mosaic = np.empty((count * self.win, self.win, 3), dtype=np.uint8)
+
+        win = self.win
+        mosaic = self.mosaic[:count * win]
+        for i, (x, y, w, h) in enumerate(bboxes):
+            cv2.resize(frame[y:y+h, x:x+w], (win, win), dst=mosaic[i * win:(i + 1) * win])
+
+        hsv = cv2.cvtColor(mosaic, cv2.COLOR_BGR2HSV).reshape(count, win * win, 3)
+        hue = hsv[..., 0].astype(np.intp) * self.hue_bins // 180
+        saturation = hsv[..., 1].astype(np.intp) * self.saturation_bins // 256
+        bins = (np.arange(count)[:, None] * self.size + hue * self.saturation_bins + saturation).ravel()
+
+        histograms = np.bincount(bins, minlength=count * self.size).reshape(count, self.size).astype(np.float32)
+        histograms /= np.linalg.norm(histograms, axis=1, keepdims=True)
+        return histograms
+
+
+def create_descriptor_engine(kind="hog"):
+    """
+    hog - pierwotny deskryptor (okno 64x64, komórki 4x4, 8100 wartości)
+    hog_small - HOG na oknie 32x32 z komórkami 8x8 (324 wartości, kilkukrotnie szybszy)
+    histogram - histogram barwy i nasycenia (128 wartości)
+    """
+    if kind == "hog":
+        return HogDescriptorEngine()
+    if kind == "hog_small":
+        return HogDescriptorEngine(win_size=32, block_size=16, block_stride=8, cell_size=8)
+    if kind == "histogram":
+        return ColorHistogramEngine()
+    raise ValueError(f"Nieznany deskryptor: {kind} (dostępne: {', '.join(DESCRIPTORS)})")
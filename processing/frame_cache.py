@@ -0,0 +1,242 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import cv2
+import numpy as np
+from processing.objects_detection import resize_for_analysis
+
+# Wpisy użyte lub utworzone w ciągu ostatnich MIN_EVICT_AGE sekund nie są usuwane - inny proces może właśnie
+# kończyć ich budowę albo mapować je do pamięci
+MIN_EVICT_AGE = 60
+
+
+class CachedCapture:
+    """
+    Źródło klatek z pamięci podręcznej FrameCache o interfejsie cv2.VideoCapture (read, grab, retrieve, get, set,
+    release), więc detection() i pozostałe funkcje przyjmujące `cap` działają bez zmian.
+
+    read() zwraca widok tylko do odczytu na klatkę w pliku mapowanym w pamięci (np.memmap) - bez dekodowania
+    i bez kopiowania. Klatki są kolorowe (BGR) albo, dla pamięci bez koloru, w skali szarości (2D); segmentacja
+    pomija wtedy konwersję kolorów. `frame_scale` - skala klatek względem oryginalnego nagrania.
+    """
+
+    def __init__(self, metadata, frames):
+        self.metadata = metadata
+        self.frames = frames
+        self.frame_scale = metadata["scale"]
+        self.position = 0
+        self.count = metadata["frames"]
+
+    def isOpened(self):
+        return self.frames is not None
+
+    def grab(self):
+        if self.frames is None or self.position >= self.count:
+            return False
+        self.position += 1
+        return True
+
+    def retrieve(self):
+        if self.frames is None or self.position == 0:
+            return False, None
+        return True, self.frames[self.position - 1]
+
+    def read(self):
+        if not self.grab():
+            return False, None
+        return self.retrieve()
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return self.metadata["fps"]
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return self.count
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return self.position
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self.metadata["width"]
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self.metadata["height"]
+        return 0.0
+
+    def set(self, prop, value):
+        if prop != cv2.CAP_PROP_POS_FRAMES:
+            return False
+        self.position = int(min(max(value, 0), self.count))     # Przewijanie to tylko zmiana indeksu
+        return True
+
+    def release(self):
+        self.frames = None
+
+
+class FrameCache:
+    """
+    Pamięć podręczna zdekodowanych nagrań w katalogu `directory`: każde nagranie dekodowane jest raz do pliku
+    z surowymi klatkami uint8 (kolor BGR albo tylko skala szarości, opcjonalnie przeskalowanymi o `scale`)
+    i małego pliku JSON z nagłówkiem (liczba klatek, rozmiar, FPS, rozmiar i data modyfikacji źródła).
+
+    Wpisy są odtwarzane, gdy źródło się zmieni. Gdy łączny rozmiar przekracza `max_bytes`, usuwane są wpisy
+    najdawniej używane. Obiekt zawiera tylko konfigurację, więc można go przekazać do procesów roboczych.
+
+    Wpis przechowuje jeden wariant klatek: kolorowy (segmentacja wyznacza z niego skalę szarości tylko w swoich
+    wycinkach) albo sam obraz w skali szarości (4 razy mniej danych, bez deskryptora `histogram`). Oba warianty
+    tego samego nagrania mogą istnieć w katalogu jednocześnie, jako osobne wpisy.
+
+    Z katalogu może korzystać wiele procesów naraz: pliki powstają pod unikalnymi nazwami tymczasowymi
+    i są podmieniane atomowo (os.replace), a wpisy młodsze niż MIN_EVICT_AGE sekund nie są usuwane.
+    """
+
+    def __init__(self, directory, max_bytes=None, color=True, scale=1.0):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.color = color
+        self.scale = scale
+
+    def entry_name(self, video_path):
+        digest = hashlib.sha1(str(Path(video_path).resolve()).encode()).hexdigest()[:8]
+        variant = f"{'color' if self.color else 'gray'}_{self.scale:g}"
+        return f"{Path(video_path).stem}-{digest}-{variant}"
+
+    def paths(self, video_path):
+        name = self.entry_name(video_path)
+        return self.directory / f"{name}.json", self.directory / f"{name}.u8"
+
+    def open(self, video_path) -> CachedCapture:
+        """
+        Zwraca źródło klatek z pamięci podręcznej, w razie potrzeby najpierw dekodując nagranie
+        """
+        metadata_path, data_path = self.paths(video_path)
+        metadata = self.load_metadata(video_path)
+        if metadata is None:
+            metadata = self.build(video_path)
+        else:
+            os.utime(metadata_path)         # Data ostatniego użycia - do usuwania najdawniej używanych wpisów
+        self.evict(keep=(metadata_path,))
+
+        shape = (metadata["frames"], metadata["height"], metadata["width"]) + ((3,) if metadata["color"] else ())
+        frames = np.memmap(data_path, dtype=np.uint8, mode="r", shape=shape) if metadata["frames"] else np.empty(shape, np.uint8)
+        return CachedCapture(metadata, frames)
+
+    def load_metadata(self, video_path):
+        """
+        Nagłówek aktualnego wpisu albo None, jeśli wpisu nie ma lub źródło zmieniło się od jego utworzenia
+        """
+        metadata_path, data_path = self.paths(video_path)
+        if not metadata_path.exists() or not data_path.exists():
+            return None
+        with metadata_path.open() as metadata_file:
+            metadata = json.load(metadata_file)
+
+        stat = Path(video_path).stat()
+        if metadata["source_size"] != stat.st_size or metadata["source_mtime"] != stat.st_mtime:
+            return None
+        return metadata
+
+    def build(self, video_path) -> dict:
+        """
+        Dekoduje nagranie do pamięci podręcznej (zapis sekwencyjny, bez trzymania klatek w pamięci)
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        metadata_path, data_path = self.paths(video_path)
+
+        cap = cv2.VideoCapture(str(video_path))
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        frames, width, height = 0, 0, 0
+        with self.atomic_write(data_path) as data_file:
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                frame = resize_for_analysis(frame, self.scale)
+                if not self.color:
+                    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                height, width = frame.shape[:2]
+                data_file.write(frame.tobytes())
+                frames += 1
+        cap.release()
+
+        stat = Path(video_path).stat()
+        metadata = {
+            "source": str(Path(video_path).resolve()),
+            "source_size": stat.st_size,
+            "source_mtime": stat.st_mtime,
+            "frames": frames,
+            "width": width,
+            "height": height,
+            "fps": fps,
+            "color": self.color,
+            "scale": self.scale,
+            "bytes": data_path.stat().st_size,
+        }
+        # Nagłówek zapisywany na końcu - wpis bez niego jest niepełny
+        with self.atomic_write(metadata_path, mode="w") as metadata_file:
+            json.dump(metadata, metadata_file, indent=4)
+        return metadata
+
+    @contextmanager
+    def atomic_write(self, path, mode="wb"):
+        """
+        Zapis do pliku tymczasowego o unikalnej nazwie (każdy proces budujący wpis pisze do własnego pliku), który
+        po zamknięciu atomowo podmienia `path` - czytelnicy widzą stary albo nowy plik, nigdy niepełny
+        """
+        temporary = tempfile.NamedTemporaryFile(mode, dir=self.directory, prefix=f"{path.name}.", suffix=".tmp",
+                                                delete=False)
+        try:
+            with temporary:
+                yield temporary
+            os.replace(temporary.name, path)
+        except BaseException:
+            Path(temporary.name).unlink(missing_ok=True)
+            raise
+
+    def entries(self) -> list[tuple[float, int, Path, Path]]:
+        """
+        Wpisy pamięci: (ostatnie użycie, rozmiar w bajtach, nagłówek, dane), od najdawniej używanego
+        """
+        entries = []
+        for metadata_path in self.directory.glob("*.json"):
+            data_path = metadata_path.with_suffix(".u8")
+            try:
+                used = metadata_path.stat().st_mtime
+                size = data_path.stat().st_size if data_path.exists() else 0
+            except FileNotFoundError:   # Wpis usunięty w międzyczasie przez inny proces
+                continue
+            entries.append((used, size, metadata_path, data_path))
+        return sorted(entries)
+
+    def size(self) -> int:
+        return sum(size for _, size, _, _ in self.entries())
+
+    def evict(self, max_bytes=None, keep=(), min_age=MIN_EVICT_AGE):
+        """
+        Usuwa najdawniej używane wpisy, aż łączny rozmiar nie przekracza max_bytes (domyślnie self.max_bytes).
+        Wpisy z `keep` (ścieżki nagłówków) oraz użyte lub zbudowane w ciągu ostatnich `min_age` sekund (mogą ich
+        właśnie używać inne procesy) nie są usuwane. Zwraca liczbę zwolnionych bajtów.
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        if max_bytes is None:
+            return 0
+
+        entries = self.entries()
+        total = sum(size for _, size, _, _ in entries)
+        young = time.time() - min_age
+        freed = 0
+        for used, size, metadata_path, data_path in entries:
+            if total - freed <= max_bytes:
+                break
+            if metadata_path in keep or used > young:
+                continue
+            try:
+                if data_path.exists() and data_path.stat().st_mtime > young:
+                    continue        # Dane podmienione przez proces, który przebudowuje wpis
+                metadata_path.unlink()
+                data_path.unlink(missing_ok=True)
+            except OSError:         # Np. Windows nie pozwala usunąć pliku zmapowanego przez inny proces
+                continue
+            freed += size
+        return freed
@@ -0,0 +1,161 @@
+import shutil
+import subprocess
+
+import cv2
+import numpy as np
+
+
+class FFmpegCapture:
+    """
+    Źródło klatek dekodowanych przez zewnętrzny program ffmpeg (surowe klatki przez potok) o interfejsie
+    cv2.VideoCapture (read, grab, retrieve, get, set, release), jak CachedCapture z processing.frame_cache.
+
+    ffmpeg dekoduje od razu do skali szarości (`gray=True` - sama luminancja, bez konwersji do BGR i z 3 razy
+    mniejszym strumieniem danych) i/lub do rozdzielczości analizy (`scale`, atrybut frame_scale - skalowania nie
+    powtarza już detection()). Klatki czytane są do jednego, wcześniej zaalokowanego bufora, a read() zwraca widok
+    tylko do odczytu, ważny do następnego odczytu. Numer klatki liczony jest lokalnie.
+
+    Klatka jest dekodowana w całości w jednym formacie (BGR albo skala szarości) - kolor tylko dla wycinków
+    obiektów śledzonych przez tracker nie jest obsługiwany.
+    """
+
+    def __init__(self, video_path, gray=False, scale=1.0, executable="ffmpeg"):
+        self.video_path = str(video_path)
+        self.gray = gray
+        self.frame_scale = scale
+        self.executable = executable
+
+        # Parametry nagrania z nagłówka (bez dekodowania klatek)
+        probe = cv2.VideoCapture(self.video_path)
+        self.opened = probe.isOpened()
+        self.fps = probe.get(cv2.CAP_PROP_FPS)
+        self.count = int(probe.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.width = int(probe.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(probe.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        probe.release()
+
+        # Rozmiar klatki wyjściowej - jak w resize_for_analysis
+        self.size = (int(round(self.width * scale)), int(round(self.height * scale)))
+        shape = (self.size[1], self.size[0]) if gray else (self.size[1], self.size[0], 3)
+        self.buffer = np.empty(shape, dtype=np.uint8)
+        self.view = self.buffer.view()
+        self.view.flags.writeable = False
+        self.bytes = memoryview(self.buffer).cast("B")
+
+        self.process = None
+        self.position = 0           # Indeks klatki, która zostanie odczytana jako następna
+        self.valid = False          # Czy bufor zawiera ostatnio pobraną klatkę
+
+    def command(self, start_frame):
+        command = [self.executable, "-nostdin", "-v", "error"]
+        if start_frame > 0:
+            # Dokładne przewijanie: ffmpeg dekoduje od klatki kluczowej i odrzuca klatki przed podanym czasem
+            # (pół klatki wcześniej, aby zaokrąglenie znaczników czasu nie pominęło klatki docelowej)
+            command += ["-ss", f"{(start_frame - 0.5) / self.fps:.6f}"]
+        command += ["-i", self.video_path, "-an", "-sn"]
+        if self.frame_scale != 1:
+            interpolation = "area" if self.frame_scale == 0.5 else "bilinear"
+            command += ["-vf", f"scale={self.size[0]}:{self.size[1]}:flags={interpolation}"]
+        return command + ["-f", "rawvideo", "-pix_fmt", "gray" if self.gray else "bgr24", "-"]
+
+    def start(self, start_frame=0):
+        self.stop()
+        self.process = subprocess.Popen(self.command(start_frame), stdout=subprocess.PIPE,
+                                        stderr=subprocess.DEVNULL, bufsize=len(self.bytes))
+        self.position = start_frame
+        self.valid = False
+
+    def stop(self):
+        if self.process is not None:
+            self.process.kill()
+            self.process.stdout.close()
+            self.process.wait()
+            self.process = None
+
+    def isOpened(self):
+        return self.opened
+
+    def grab(self):
+        if not self.opened:
+            return False
+        if self.process is None:
+            self.start(self.position)
+
+        received = 0
+        while received < len(self.bytes):
+            chunk = self.process.stdout.readinto(self.bytes[received:])
+            if not chunk:
+                self.valid = False
+                return False
+            received += chunk
+        self.position += 1
+        self.valid = True
+        return True
+
+    def retrieve(self):
+        if not self.valid:
+            return False, None
+        return True, self.view
+
+    def read(self):
+        if not self.grab():
+            return False, None
+        return self.retrieve()
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return self.count
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return self.position
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self.width
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self.height
+        return 0.0
+
+    def set(self, prop, value):
+        if prop != cv2.CAP_PROP_POS_FRAMES:
+            return False
+        target = int(max(value, 0))
+        if self.process is not None and 0 <= target - self.position <= self.fps:
+            # Niewielki skok do przodu - taniej przeczytać klatki niż uruchamiać ffmpeg od nowa
+            while self.position < target and self.grab():
+                pass
+        else:
+            self.stop()
+            self.position = target
+            self.valid = False
+        return True
+
+    def release(self):
+        self.stop()
+        self.opened = False
+
+
+class FFmpegDecoder:
+    """
+    Fabryka źródeł FFmpegCapture o interfejsie FrameCache.open(video_path) - przekazywana do open_video
+    (i do procesów roboczych) zamiast pamięci podręcznej klatek
+    """
+
+    def __init__(self, gray=False, scale=1.0, executable="ffmpeg"):
+        if shutil.which(executable) is None:
+            raise FileNotFoundError(f"Nie znaleziono programu {executable} (wymagany przez --decoder ffmpeg)")
+        self.gray = gray
+        self.scale = scale
+        self.executable = executable
+
+    def open(self, video_path):
+        return FFmpegCapture(video_path, self.gray, self.scale, self.executable)
+
+
+def open_video(video_path, frame_source=None):
+    """
+    Źródło klatek nagrania: cv2.VideoCapture albo źródło z fabryki `frame_source` - pamięci podręcznej
+    zdekodowanych klatek (processing.frame_cache.FrameCache) lub dekodera ffmpeg (FFmpegDecoder)
+    """
+    if frame_source is None:
+        return cv2.VideoCapture(str(video_path))
+    return frame_source.open(video_path)
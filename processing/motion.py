@@ -0,0 +1,76 @@
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """
+    Tania bramka ruchu: porównuje mocno pomniejszoną klatkę (co `factor`-ty piksel) z tłem wyłącznie w obrębie
+    prostokątów `rois` (stref analizy z marginesem). Gdy żaden piksel nie różni się od tła o więcej niż `threshold`,
+    scena jest pusta i kosztowne etapy (morfologia, kontury, deskryptory) można pominąć - ich wynik i tak byłby pusty.
+
+    Po `idle_frames` kolejnych pustych klatkach bramka zaleca przetwarzanie tylko co `idle_stride`-tej klatki
+    (pozostałe są jedynie pobierane przez cap.grab()), a po wykryciu ruchu wraca do każdej klatki.
+    """
+
+    def __init__(self, background, rois, factor=8, threshold=30, min_pixels=2, idle_frames=15, idle_stride=1):
+        self.background = background                # Model tła (processing.background) w rozdzielczości analizy
+        self.threshold = threshold
+        self.min_pixels = min_pixels                # Minimalna liczba różniących się próbek uznawana za ruch
+        self.idle_frames = idle_frames
+        self.idle_stride = idle_stride
+
+        height, width = background.image.shape[:2]
+        self.size = (max(1, width // factor), max(1, height // factor))
+        self.small_background = self.shrink(background.image)
+
+        # Maska próbek leżących w prostokątach analizy
+        self.mask = np.zeros((self.size[1], self.size[0]), dtype=bool)
+        for x0, y0, x1, y1 in rois:
+            self.mask[y0 * self.size[1] // height:-(-y1 * self.size[1] // height),
+                      x0 * self.size[0] // width:-(-x1 * self.size[0] // width)] = True
+
+        self.idle = 0           # Liczba kolejnych klatek bez ruchu
+        self.frames = 0         # Klatki sprawdzone przez bramkę
+        self.skipped = 0        # Klatki bez ruchu - pominięte kosztowne etapy
+        self.strided = 0        # Klatki nieodczytane do obrazu (cap.grab) w trybie co k-tej klatki
+
+    def shrink(self, image):
+        image = cv2.resize(image, self.size, interpolation=cv2.INTER_NEAREST)
+        if image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        return image
+
+    def has_motion(self, frame):
+        """
+        Sprawdza klatkę (dowolnej rozdzielczości - jest pomniejszana do rozmiaru bramki)
+        """
+        self.frames += 1
+        if self.background.adaptive and self.frames % 300 == 0:    # Odświeżenie pomniejszonego tła zmiennego modelu
+            self.small_background = self.shrink(self.background.image)
+
+        diff = cv2.absdiff(self.shrink(frame), self.small_background)
+        moving = np.count_nonzero((diff > self.threshold) & self.mask) >= self.min_pixels
+
+        if moving:
+            self.idle = 0
+        else:
+            self.idle += 1
+            self.skipped += 1
+        return moving
+
+    @property
+    def stride(self):
+        """
+        Co która klatka powinna być odczytana i sprawdzona
+        """
+        return self.idle_stride if self.idle >= self.idle_frames else 1
+
+    def report(self) -> dict:
+        total = self.frames + self.strided
+        return {
+            "frames": total,
+            "skipped": self.skipped,
+            "strided": self.strided,
+            "processed": self.frames - self.skipped,
+            "skipped_ratio": (self.skipped + self.strided) / total if total else 0.0,
+        }
@@ -1,283 +1,906 @@
+import json
+from dataclasses import dataclass, replace
+from functools import lru_cache, partial
+from pathlib import Path
+
 import cv2
+import numpy as np
+from processing.annotated_output import AnnotatedVideoWriter
+from processing.background import bootstrap_background, create_background_model
+from processing.checkpoint import CheckpointWriter, load_checkpoint, restore, snapshot
+from processing.choices import ROI_MARGIN
 from processing.tracking import ObjectTracker
+from processing.motion import MotionGate
+from processing.profiling import NULL_PROFILER
+from processing.zones import (ZONE_GORA, ZONE_JEZDNIA, ZONE_LEWO, ZONE_PIESI, ZONE_PRAWO, polygon, zone_bounds,
+                              zone_map)
 
-def iou_with_tram_zone(bbox, tram_zone):
-    """
-    Funkcja sprawdza w jakim stopniu obiekt pokrywa się z tramwajową strefą detekcji
-    """
-    x1, y1, w1, h1 = bbox
-    x2, y2 = x1 + w1, y1 + h1  # Obliczenie współrzędnych prawego dolnego rogu obiektu.
-    tx1, ty1 = tram_zone[0]    # Rozpakowanie współrzędnych lewego górnego i prawego dolnego rogu strefy tramwaju.
-    tx2, ty2 = tram_zone[1]
 
-    # Wyznaczenie współrzędnych przecięcia prostokątów (strefy i obiektu)
-    ix1 = max(x1, tx1)
-    iy1 = max(y1, ty1)
-    ix2 = min(x2, tx2)
-    iy2 = min(y2, ty2)
+# Zdefiniowanie stref analizy, okien w których zachodzi zliczanie obiektów - domyślne dla kamery z nagrań testowych.
+# Strefy innej kamery wczytywane są z pliku konfiguracji (processing.zones.load_zones, opcja --zones)
 
-    # Obliczenie obszaru części wspólnej (intersekcji)
-    iw = max(0, ix2 - ix1)
-    ih = max(0, iy2 - iy1)
-    inter_area = iw * ih
+## Strefa jezdni
+STREFA_LEWO = ((300, 110), (600, 342))
+STREFA_PRAWO = ((500, 355), (1000, 611))
 
-    # Obszar strefy tramwaju
-    tram_area = (tx2 - tx1) * (ty2 - ty1)
+## Strefa torów tramwajowych
+STREFA_TRAMWAJU1 = ((0, 225), (280, 390))
+STREFA_TRAMWAJU2 = ((620, 225), (900, 390))
 
-    # Zwraca procent pokrycia obiektu przez strefę tramwaju
-    return inter_area / float(tram_area) if tram_area > 0 else 0.0
+## Strefa pieszych, rowerzystów
+STREFA_PIESI = ((900, 739), (1100, 1020))
 
 
-def detection(cap: cv2.VideoCapture, background_path="background.jpg", show=True, debug=False) -> dict:
+@dataclass(frozen=True)
+class DetectionParams:
     """
-    Główna funkcja detekcji i zliczania obiektów pojawiających się na kolejnych kaltkach przetwarzanego wideo
+    Parametry detekcji i klasyfikacji. Wartości geometryczne podane są w pikselach klatki w pełnej rozdzielczości
+    (1920x1080) - scaled() przelicza je dla klatki przeskalowanej do analizy. Strefy (strefa_*) to wielokąty
+    (krotki punktów) albo prostokąty podane dwoma rogami - processing.zones.ZoneMap kompiluje je do rastra.
     """
+    threshold: int = 30                          # Próg binaryzacji obrazu różnicowego
+    open_iterations: int = 2                     # Liczba iteracji otwarcia morfologicznego (usuwanie szumów)
+    close_iterations: int = 7                    # Liczba iteracji zamknięcia morfologicznego (wypełnianie dziur)
+    min_area: float = 3000                       # Minimalne pole konturu
+    min_height: float = 50                       # Minimalna wysokość bboxa
+    horizon: float = 0.6                         # Linia oddzielająca jezdnię od chodnika (ułamek wysokości klatki)
+    tram_overlap: float = 0.99                   # Wymagane pokrycie strefy tramwaju przez obiekt
+    road_bands: tuple = ((110, 342), (447, 711)) # Zakresy dolnej krawędzi obiektów na jezdni
+    truck_min_area: float = 60000                # Ciężarowy/autobus - minimalne pole
+    truck_min_width: float = 550                 # Ciężarowy/autobus - minimalna szerokość
+    tram_min_height: float = 200                 # Tramwaj - minimalna wysokość
+    tram_min_width: float = 800                  # Tramwaj - minimalna szerokość
+    pedestrian_min_width: float = 60             # Pieszy - minimalna szerokość
+    pedestrian_min_height: float = 110           # Pieszy - minimalna wysokość
+    tracker_max_distance: float = 60             # Maksymalne przesunięcie centroidu między klatkami w trackerze
+    descriptor: str = "hog"                      # Deskryptor wyglądu w trackerze: "hog", "hog_small" lub "histogram"
+    descriptor_dtype: str = "float32"            # Typ przechowywanych deskryptorów ("float16" - połowa pamięci)
+    strefa_lewo: tuple = STREFA_LEWO
+    strefa_prawo: tuple = STREFA_PRAWO
+    strefa_tramwaju1: tuple = STREFA_TRAMWAJU1
+    strefa_tramwaju2: tuple = STREFA_TRAMWAJU2
+    strefa_piesi: tuple = STREFA_PIESI
+
+    @property
+    def zones(self):
+        return (self.strefa_lewo, self.strefa_prawo, self.strefa_tramwaju1, self.strefa_tramwaju2, self.strefa_piesi)
+
+    def scaled(self, scale):
+        """
+        Zwraca parametry dla klatki przeskalowanej o `scale` - długości mnożone przez scale, pola przez scale^2
+        """
+        if scale == 1:
+            return self
+
+        def zone(z):
+            return tuple((int(round(px * scale)), int(round(py * scale))) for px, py in z)
+
+        return replace(
+            self,
+            open_iterations=max(1, round(self.open_iterations * scale)),
+            close_iterations=max(1, round(self.close_iterations * scale)),
+            min_area=self.min_area * scale ** 2,
+            min_height=self.min_height * scale,
+            road_bands=tuple((low * scale, high * scale) for low, high in self.road_bands),
+            truck_min_area=self.truck_min_area * scale ** 2,
+            truck_min_width=self.truck_min_width * scale,
+            tram_min_height=self.tram_min_height * scale,
+            tram_min_width=self.tram_min_width * scale,
+            pedestrian_min_width=self.pedestrian_min_width * scale,
+            pedestrian_min_height=self.pedestrian_min_height * scale,
+            tracker_max_distance=self.tracker_max_distance * scale,
+            strefa_lewo=zone(self.strefa_lewo),
+            strefa_prawo=zone(self.strefa_prawo),
+            strefa_tramwaju1=zone(self.strefa_tramwaju1),
+            strefa_tramwaju2=zone(self.strefa_tramwaju2),
+            strefa_piesi=zone(self.strefa_piesi),
+        )
+
+
+DEFAULT_PARAMS = DetectionParams()
+
+
+def draw_zones(frame, params=DEFAULT_PARAMS):
+    """
+    Rysowanie okien w których zachodzi zliczanie obiektów oraz linii oddzielającej jezdnie od ścieżki pieszej.
+    Tylko do wizualizacji (podgląd, nagranie z adnotacjami) - klatki analizowane nie są modyfikowane.
+    """
+    cv2.polylines(frame, [polygon(params.strefa_lewo)], True, (255, 0, 0), 2)
+    cv2.polylines(frame, [polygon(params.strefa_prawo)], True, (0, 255, 0), 2)
 
-    FPS = cap.get(cv2.CAP_PROP_FPS)
-    if debug: print(f"FPS: {FPS}")
+    cv2.polylines(frame, [polygon(params.strefa_tramwaju1), polygon(params.strefa_tramwaju2)], True, (0, 0, 255), 2)
 
-    # Inicjalizacja trackera i zmiennych pomocniczych
-    tracker = ObjectTracker()
-    tramwaj_block_until = -1  # blokada zliczania tramwajów (dla uniknięcia wielokrotnego zliczania)
-
-    # Słownik wynikowy – ilość zliczonych obiektów każdej klasy
-    counts = {
-        "osobowy_lewo_prawo": 0,
-        "osobowy_prawo_lewo": 0,
-        "ciezarowy_lewo_prawo": 0,
-        "ciezarowy_prawo_lewo": 0,
-        "tramwaj": 0,
-        "pieszy": 0,
-        "rowerzysta": 0
-    }
-
-    # Wczytanie obrazu tła
-    background = cv2.imread(background_path)
-    if background is None:
-        print("Nie można załadować background.jpg")
-        return []
+    cv2.polylines(frame, [polygon(params.strefa_piesi)], True, (180, 75, 120), 2)
 
-    # Zamiana obrazu tła na obraz w skali szarości
-    background_gray = cv2.cvtColor(background, cv2.COLOR_BGR2GRAY)
+    # Rysowanie linii oddzielającej jezdnie od ścieżki pieszej, rowerowej
+    horizon = int(frame.shape[0] * params.horizon)
+    cv2.line(frame, (0, horizon), (frame.shape[1], horizon), (0,255,255), 2)
 
-    # Okno podglądu procesu detekcji i zawartości pliku wideo
-    if show:
-        cv2.namedWindow("Video frames with detection", cv2.WINDOW_NORMAL)
 
-    # Zdefiniowanie stref analizy, okien w których zachodzi zliczanie obiektów
+def zone_rois(frame_shape, margin=ROI_MARGIN, params=DEFAULT_PARAMS):
+    """
+    Wyznacza prostokąty (x0, y0, x1, y1) obejmujące strefy analizy (ich prostokąty otaczające) powiększone o margines.
+    Prostokąty, które na siebie nachodzą, są scalane w jeden, aby obiekt nie został podzielony na dwa wycinki.
+    """
+    height, width = frame_shape[:2]
+    margin = int(round(margin))
+    rois = [(max(0, x0 - margin), max(0, y0 - margin), min(width, x1 + margin), min(height, y1 + margin))
+            for x0, y0, x1, y1 in map(zone_bounds, params.zones)]
+
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(rois)):
+            for j in range(i + 1, len(rois)):
+                a, b = rois[i], rois[j]
+                if overlaps(a, b):
+                    rois[i] = bounding_rect(a, b)
+                    del rois[j]
+                    merged = True
+                    break
+            if merged:
+                break
+
+    return rois
 
-    ## Strefa jezdni
-    strefa_lewo = ((300, 110), (600, 342))
-    strefa_prawo = ((500, 355), (1000, 611))
 
-    ## Strefa torów tramwajowych
-    strefa_tramwaju1 = ((0, 225), (280, 390))
-    strefa_tramwaju2 = ((620, 225), (900, 390))
+def overlaps(a, b) -> bool:
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
 
-    ## Strefa pieszych, rowerzystów
-    strefa_piesi = ((900, 739), (1100, 1020))
 
-    # Główna pętla przetwarzania wideo
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        
-        # Rysowanie okien w których zachodzi zliczanie obiektów
-        cv2.rectangle(frame, strefa_lewo[0], strefa_lewo[1], (255, 0, 0), 2)
-        cv2.rectangle(frame, strefa_prawo[0], strefa_prawo[1], (0, 255, 0), 2)
-        
-        cv2.rectangle(frame, strefa_tramwaju1[0], strefa_tramwaju1[1], (0, 0, 255), 2)
-        cv2.rectangle(frame, strefa_tramwaju2[0], strefa_tramwaju2[1], (0, 0, 255), 2)
+def inside(bbox, rect) -> bool:
+    """
+    Czy bbox (x, y, w, h) leży w całości w prostokącie rect=(x0, y0, x1, y1)
+    """
+    x, y, w, h = bbox
+    return rect[0] <= x and rect[1] <= y and x + w <= rect[2] and y + h <= rect[3]
 
-        cv2.rectangle(frame, strefa_piesi[0], strefa_piesi[1], (180, 75, 120), 2)
 
-        # Rysowanie linii oddzielającej jezdnie od ścieżki pieszej, rowerowej
-        cv2.line(frame, (0, int(frame.shape[0] * 0.6)), (frame.shape[1], int(frame.shape[0] * 0.6)), (0,255,255), 2)
-        
+def bounding_rect(*rects):
+    return (min(r[0] for r in rects), min(r[1] for r in rects), max(r[2] for r in rects), max(r[3] for r in rects))
 
+
+def segment_frame(frame, background, rois=None, params=DEFAULT_PARAMS, profiler=NULL_PROFILER):
+    """
+    Wyznacza obiekty pierwszoplanowe (bloby) na podstawie różnicy klatki z modelem tła (processing.background).
+    Dla podanych `rois` przetwarzane są tylko te wycinki klatki, a kontury są przesuwane do współrzędnych klatki.
+    Zwraca statystyki wszystkich konturów jako jedną tablicę (contour_stats).
+
+    Obiekt może wystawać poza wycinek (np. tramwaj szerszy niż strefy z marginesem) - przycięty miałby inny bbox,
+    a więc centroid i klasę. Dlatego po otwarciu morfologicznym sprawdzany jest pas przy wewnętrznych krawędziach
+    wycinka (clip_band). Jeśli są w nim piksele pierwszego planu, przy tej krawędzi segmentowany jest dodatkowo
+    wycinek obejmujący tylko wiersze (kolumny) dotkniętego fragmentu krawędzi, powiększany aż obiekty zmieszczą się
+    w nim w całości (settle_clips). Jego kontury zastępują kontury wycinka leżące w całości w jego obrębie.
+    Poza pierwotnymi wycinkami maska to różnica z obrazem tła (bez aktualizacji modelu). Kontury obiektów
+    w wycinkach są więc takie same jak w pełnej klatce (dla tła stałego), a dodatkowy koszt zależy od wielkości
+    obiektów na krawędziach, nie od wielkości klatki.
+    """
+    if rois is None:
+        rois = [(0, 0, frame.shape[1], frame.shape[0])]
+
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3,3))
+    masks = {}          # Maski progowe wycinków
+    finals = {}         # Maski wycinków po morfologii
+    clips = []          # Wycinki przy krawędziach, przez które przechodzą obiekty
+
+    for roi in rois:
+        x0, y0, x1, y1 = roi
         # Wykrywanie różnic na podstawie modelu tła (foreground mask)
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)              # Zamiana pobranej klatki wideo na obraz w skali szarości
-        diff = cv2.absdiff(background_gray, gray)                   # Obraz różnicowy
-        _, thresh = cv2.threshold(diff, 30, 255, cv2.THRESH_BINARY) # Progowanie binarne
+        gray = frame[y0:y1, x0:x1]
+        if gray.ndim == 3:
+            gray = cv2.cvtColor(gray, cv2.COLOR_BGR2GRAY)   # Zamiana pobranej klatki wideo na obraz w skali szarości
+        thresh = masks[roi] = background.foreground(gray, roi, params.threshold)  # Obraz różnicowy i progowanie binarne
+        profiler.lap("threshold")
 
         # Czyszczenie binarnej maski operacjami morfologicznymi
-        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3,3))
-        thresh = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel, iterations=2)  # Operacja ma usunąć szumy i zakłócenia (migotanie pojedynczych białych pikseli)
-        thresh = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel, iterations=7) # Operacja ma wypełnić czarne dziury wewnątrz białych obszarów (np. wewnątrz pojazdów)
+        thresh = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel, iterations=params.open_iterations)   # Operacja ma usunąć szumy i zakłócenia (migotanie pojedynczych białych pikseli)
+        clips.extend(clip_seeds(frame, background, masks, thresh, roi, params, kernel))
+        thresh = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel, iterations=params.close_iterations) # Operacja ma wypełnić czarne dziury wewnątrz białych obszarów (np. wewnątrz pojazdów)
+        finals[roi] = thresh
+        profiler.lap("morphology")
+
+    # Obiekty na krawędziach wycinków - maski dodatkowych wycinków zastępują maski wycinków tam, gdzie są dokładne
+    # (poza pasem zasięgu morfologii przy ich wewnętrznych krawędziach), a ich kontury zastępują kontury wycinków
+    settled = settle_clips(frame, background, masks, clips, params, kernel) if clips else {}
+    reach = 2 * (params.open_iterations + params.close_iterations)
+    inner = {clip: inner_rect(clip, frame.shape, reach) for clip in settled}
+    for clip, mask in settled.items():
+        cx0, cy0, _, _ = clip
+        vx0, vy0, vx1, vy1 = inner[clip]
+        for (x0, y0, x1, y1), final in finals.items():
+            ix0, iy0, ix1, iy1 = max(vx0, x0), max(vy0, y0), min(vx1, x1), min(vy1, y1)
+            if ix0 < ix1 and iy0 < iy1:
+                final[iy0 - y0:iy1 - y0, ix0 - x0:ix1 - x0] = mask[iy0 - cy0:iy1 - cy0, ix0 - cx0:ix1 - cx0]
+    if settled:
+        profiler.lap("morphology")
+
+    contours = []
+    for (x0, y0, x1, y1), thresh in finals.items():
+        found, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE, offset=(x0, y0))  # Wydobywa kształty obiektów (kontury)
+                                                                                                            # cv2.RETR_EXTERNAL - uwzględnia tylko zewnętrzne kontury, ignorując np. dziury w obiektach
+                                                                                                            # cv2.CHAIN_APPROX_SIMPLE - upraszcza kontury, zapisując tylko kluczowe punkty
+                                                                                                            # offset - przesunięcie konturów z wycinka do współrzędnych całej klatki
+        if inner:
+            found = [contour for contour in found if not any(inside(cv2.boundingRect(contour), rect) for rect in inner.values())]
+        contours.extend(found)
+    for (x0, y0, x1, y1), thresh in settled.items():
+        found, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE, offset=(x0, y0))
+        contours.extend(found)
+    profiler.lap("contours")
+
+    return contour_stats(contours)
+
+
+def settle_clips(frame, background, masks, clips, params, kernel) -> dict:
+    """
+    Wycinki przy krawędziach (clip_seeds) powiększane po stronach, przy których maska po otwarciu ma piksele
+    pierwszego planu w pasie clip_band, aż obiekty zmieszczą się w nich w całości - otwarcie liczone jest przy tym
+    tylko dla dołączanych pasów (extend_opened). Nachodzące na siebie wycinki są scalane. Zwraca słownik
+    wycinek -> maska po morfologii.
+    """
+    band = clip_band(params)
+    step = grow_step(params)
+    pending = list(clips)
+    opened = {}
+    settled = {}
+    while pending:
+        clip = pending.pop(0)
+        others = [other for other in (*settled, *pending) if overlaps(clip, other)]
+        if others:
+            for other in others:
+                settled.pop(other, None)
+                if other in pending:
+                    pending.remove(other)
+            opened.pop(clip, None)
+            pending.append(bounding_rect(clip, *others))
+            continue
+
+        thresh = opened.pop(clip, None)
+        if thresh is None:
+            thresh = grown_threshold(frame, background, clip, masks, params.threshold)
+            thresh = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel, iterations=params.open_iterations)
+        grown = grow_clipped_roi(thresh, clip, frame.shape, band, step)
+        if grown is not None:
+            opened[grown] = extend_opened(frame, background, masks, clip, thresh, grown, params, kernel)
+            pending.insert(0, grown)
+            continue
+        settled[clip] = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel, iterations=params.close_iterations)
+    return settled
+
+
+def clip_seeds(frame, background, masks, mask, roi, params, kernel) -> list:
+    """
+    Wycinki przy wewnętrznych krawędziach wycinka roi=(x0, y0, x1, y1), przy których maska po otwarciu `mask`
+    ma piksele pierwszego planu w pasie clip_band: obejmują dotknięty fragment krawędzi z zapasem clip_band wzdłuż
+    niej, a w poprzek - obiekty przecinające krawędź, do pierwszej przerwy szerokości clip_band w masce po otwarciu
+    (wewnątrz wycinka `mask`, na zewnątrz - maska pasa za krawędzią). settle_clips sprawdza je i w razie potrzeby
+    powiększa.
+    """
+    x0, y0, x1, y1 = roi
+    height, width = frame.shape[:2]
+    band = clip_band(params)
+    reach = 2 * params.open_iterations
+    seeds = []
+    for side in ("left", "right", "top", "bottom"):
+        vertical = side in ("left", "right")
+        outward = side in ("right", "bottom")
+        edge = {"left": x0, "right": x1, "top": y0, "bottom": y1}[side]
+        if edge == (0 if not outward else width if vertical else height):
+            continue       # Krawędź na brzegu klatki niczego nie przycina
+        strip = mask[:, -band:] if side == "right" else mask[:, :band] if side == "left" else \
+                mask[-band:, :] if side == "bottom" else mask[:band, :]
+        hits = np.flatnonzero(strip.any(axis=1 if vertical else 0))
+        if not len(hits):
+            continue
+
+        # Zakres wzdłuż krawędzi i zasięg obiektów w głąb wycinka
+        low = max(0, (y0 if vertical else x0) + hits[0] - band)
+        high = min(height if vertical else width, (y0 if vertical else x0) + hits[-1] + 1 + band)
+        inner = mask[low - y0:high - y0, :] if vertical else mask[:, low - x0:high - x0]
+        occupied = inner.any(axis=0 if vertical else 1)
+        depth_in = occupied_run(occupied[::-1] if outward else occupied, band) + band
+
+        # Zasięg obiektów na zewnątrz wycinka - maska po otwarciu pasa za krawędzią
+        limit = (width if vertical else height) if outward else 0
+        near, far = (edge - reach, limit) if outward else (limit, edge + reach)
+        outside = (near, low, far, high) if vertical else (low, near, high, far)
+        outer = grown_threshold(frame, background, outside, masks, params.threshold)
+        outer = cv2.morphologyEx(outer, cv2.MORPH_OPEN, kernel, iterations=params.open_iterations)
+        occupied = outer.any(axis=0 if vertical else 1)[reach:] if outward else outer.any(axis=0 if vertical else 1)[:-reach][::-1]
+        depth_out = occupied_run(occupied, band) + band
+
+        if outward:
+            start, stop = max(0, edge - depth_in), min(limit, edge + depth_out)
+        else:
+            start, stop = max(0, edge - depth_out), min(x1 if vertical else y1, edge + depth_in)
+        seeds.append((start, low, stop, high) if vertical else (low, start, high, stop))
+    return seeds
+
+
+def occupied_run(occupied, gap) -> int:
+    """
+    Długość początkowego fragmentu `occupied` (kolumn lub wierszy od krawędzi) kończącego się przed pierwszą
+    przerwą - `gap` kolejnymi pustymi pozycjami
+    """
+    free = np.convolve(~occupied, np.ones(gap, dtype=np.int32), mode="valid")
+    gaps = np.flatnonzero(free == gap)
+    return int(gaps[0]) if len(gaps) else len(occupied)
 
-        contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)      # Wydobywa kształty obiektów (kontury)
-                                                                                                # cv2.RETR_EXTERNAL - uwzględnia tylko zewnętrzne kontury, ignorując np. dziury w obiektach
-                                                                                                # cv2.CHAIN_APPROX_SIMPLE - upraszcza kontury, zapisując tylko kluczowe punkty
 
-        frame_objects = []  # Lista wykrytych obiektów w tej klatce (z etykietą, pozycją, rozmiarem itd.)
-                            # Lista wykorzystywana potem do: śledzenia obiektów przez tracker.update(...), zliczania obiektów
+def inner_rect(rect, frame_shape, reach):
+    """
+    Prostokąt `rect` zmniejszony o `reach` przy krawędziach leżących wewnątrz klatki
+    """
+    x0, y0, x1, y1 = rect
+    height, width = frame_shape[:2]
+    return (x0 + reach if x0 > 0 else x0, y0 + reach if y0 > 0 else y0,
+            x1 - reach if x1 < width else x1, y1 - reach if y1 < height else y1)
 
 
-        centroids = []  # Lista środków geometrycznych (cx, cy) obiektów w danej klatce
-                        # Wykorzystywana jako uproszczony zestaw danych wejściowych do trackera
+def grown_threshold(frame, background, roi, masks, threshold):
+    """
+    Maska progowa powiększonego wycinka roi=(x0, y0, x1, y1): w pierwotnych wycinkach ich maski (`masks`),
+    poza nimi różnica z obrazem tła modelu, bez jego aktualizacji (dla tła stałego - to samo co foreground)
+    """
+    x0, y0, x1, y1 = roi
+    gray = frame[y0:y1, x0:x1]
+    if gray.ndim == 3:
+        gray = cv2.cvtColor(gray, cv2.COLOR_BGR2GRAY)
+    _, thresh = cv2.threshold(cv2.absdiff(background.image[y0:y1, x0:x1], gray), threshold, 255, cv2.THRESH_BINARY)
+    for (mx0, my0, mx1, my1), mask in masks.items():
+        ix0, iy0, ix1, iy1 = max(x0, mx0), max(y0, my0), min(x1, mx1), min(y1, my1)
+        if ix0 < ix1 and iy0 < iy1:
+            thresh[iy0 - y0:iy1 - y0, ix0 - x0:ix1 - x0] = mask[iy0 - my0:iy1 - my0, ix0 - mx0:ix1 - mx0]
+    return thresh
+
+
+def extend_opened(frame, background, masks, roi, opened, grown, params, kernel):
+    """
+    Maska po otwarciu wycinka `grown` zawierającego wycinek `roi`, którego maska po otwarciu to `opened`.
+    Otwarcie jest lokalne (zasięg reach = 2 * open_iterations pikseli), więc maska `roi` jest poprawna poza pasem
+    tej szerokości przy krawędziach, po których wycinek został powiększony - otwierane są tylko pasy przy tych
+    krawędziach (z zapasem reach), a reszta jest kopiowana
+    """
+    x0, y0, x1, y1 = roi
+    gx0, gy0, gx1, gy1 = grown
+    reach = 2 * params.open_iterations
+    result = np.zeros((gy1 - gy0, gx1 - gx0), dtype=np.uint8)
+
+    # Część maski `roi` niezależna od pikseli spoza niego
+    vx0, vy0 = x0 + reach if gx0 < x0 else x0, y0 + reach if gy0 < y0 else y0
+    vx1, vy1 = x1 - reach if gx1 > x1 else x1, y1 - reach if gy1 > y1 else y1
+    result[vy0 - gy0:vy1 - gy0, vx0 - gx0:vx1 - gx0] = opened[vy0 - y0:vy1 - y0, vx0 - x0:vx1 - x0]
+
+    # Pozostałe pasy: lewy i prawy na całą wysokość, górny i dolny pomiędzy nimi
+    strips = [(gx0, gy0, vx0, gy1), (vx1, gy0, gx1, gy1), (vx0, gy0, vx1, vy0), (vx0, vy1, vx1, gy1)]
+    for sx0, sy0, sx1, sy1 in strips:
+        if sx0 >= sx1 or sy0 >= sy1:
+            continue
+        px0, py0, px1, py1 = max(gx0, sx0 - reach), max(gy0, sy0 - reach), min(gx1, sx1 + reach), min(gy1, sy1 + reach)
+        thresh = grown_threshold(frame, background, (px0, py0, px1, py1), masks, params.threshold)
+        thresh = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel, iterations=params.open_iterations)
+        result[sy0 - gy0:sy1 - gy0, sx0 - gx0:sx1 - gx0] = thresh[sy0 - py0:sy1 - py0, sx0 - px0:sx1 - px0]
+    return result
+
+
+def update_background(frame, background, rois=None):
+    """
+    Aktualizacja adaptacyjnego modelu tła klatką pominiętą przez bramkę ruchu - w tych samych wycinkach co
+    segment_frame, ale bez morfologii i konturów, aby model nadążał za sceną także wtedy, gdy nic się nie dzieje
+    """
+    if rois is None:
+        rois = [(0, 0, frame.shape[1], frame.shape[0])]
+    for x0, y0, x1, y1 in rois:
+        gray = frame[y0:y1, x0:x1]
+        if gray.ndim == 3:
+            gray = cv2.cvtColor(gray, cv2.COLOR_BGR2GRAY)
+        background.update(gray, (x0, y0, x1, y1))
 
 
-        # Iterowanie po wykrytych konturach - "obiektach"
-        for contour in contours:
-            area = cv2.contourArea(contour) # Wyliczenie pola powierzchni wykrytego obiektu
-            if area < 3000:                 # Ignorowanie małych szumów, pod względem pola powierzchni
-                continue
+def clip_band(params=DEFAULT_PARAMS):
+    """
+    Szerokość pasa przy krawędzi wycinka sprawdzanego w masce po otwarciu. Wynik morfologii może zależeć od pikseli
+    spoza wycinka w pasie zasięgu obu operacji (każda iteracja erozji lub dylatacji jądrem 3x3 sięga o piksel dalej),
+    a zamknięcie może jeszcze poszerzyć obiekt o close_iterations pikseli. Pusty pas tej szerokości zostawia w wyniku
+    wolny wiersz za zasięgiem morfologii, więc obiekt z wnętrza wycinka nie łączy się z obiektem spoza niego.
+    """
+    return 2 * (params.open_iterations + params.close_iterations) + 1 + params.close_iterations
 
-            x, y, w, h = cv2.boundingRect(contour)    # x, y - współrzędne lewego górnego rogu prostokąta, w, h - szerokość i wysokość prostokąta.
-            cx = x + w // 2                           # cx, cy - współrzędne środka obiektu
-            cy = y + h // 2
-            bottom_y = y + h                          # Oblicza współrzędną dolnej krawędzi prostokąta, przydatną np. do sprawdzenia, na jakiej wysokości kończy się obiekt (czy znajduje się na jezdni, torach itp.).
 
-            if h < 50: # Ignorowanie małych szumów, pod względem wysokości
-                continue
+def grow_step(params=DEFAULT_PARAMS):
+    """
+    Krok powiększania przyciętego wycinka - kilka szerokości pasa clip_band, aby typowy pojazd wystający
+    poza wycinek mieścił się w nim po jednym-dwóch krokach
+    """
+    return 4 * clip_band(params)
 
-            centroids.append((cx, cy))
 
-            #aspect_ratio = max(w, h) / min(w, h)
+def grow_clipped_roi(mask, roi, frame_shape, band, step):
+    """
+    Jeśli maska wycinka roi=(x0, y0, x1, y1) ma piksele pierwszego planu w pasie szerokości `band` przy krawędziach
+    leżących wewnątrz klatki, zwraca wycinek powiększony po tych stronach o `step` (najwyżej do brzegu klatki),
+    a w przeciwnym razie None (krawędzie pokrywające się z brzegiem klatki niczego nie przycinają)
+    """
+    x0, y0, x1, y1 = roi
+    height, width = frame_shape[:2]
+    grown = (max(0, x0 - step) if x0 > 0 and cv2.countNonZero(mask[:, :band]) else x0,
+             max(0, y0 - step) if y0 > 0 and cv2.countNonZero(mask[:band, :]) else y0,
+             min(width, x1 + step) if x1 < width and cv2.countNonZero(mask[:, -band:]) else x1,
+             min(height, y1 + step) if y1 < height and cv2.countNonZero(mask[-band:, :]) else y1)
+    return grown if grown != roi else None
 
-            label = None     # Etykieta klasy obiektu (np. osobowy, pieszy, tramwaj)
-            strefa = None    # Strefa, w której znajduje się obiekt (jezdnia, tory, chodnik)
-            
 
-            #===Identyfikacja obiektu===
+# Kolumny tablicy statystyk blobów
+BLOB_X, BLOB_Y, BLOB_W, BLOB_H, BLOB_AREA = range(5)
 
-            # Określenie strefy i klasy obiektu
 
-            if cy < frame.shape[0] * 0.6:  # Obiekt znajduje się w górnej części obrazu
-                
-                # Sprawdzenie, czy obiekt znajduje się na torach tramwajowych
-                if iou_with_tram_zone((x, y, w, h), strefa_tramwaju1) > 0.99 or iou_with_tram_zone((x, y, w, h), strefa_tramwaju2) > 0.99:
-                    strefa = "tory"
+def contour_stats(contours):
+    """
+    Statystyki konturów jedną operacją na wszystkich punktach: tablica (N, 5) [x, y, w, h, pole], gdzie x, y, w, h
+    to prostokąt otaczający (jak cv2.boundingRect), a pole liczone wzorem Gaussa (jak cv2.contourArea)
+    """
+    if not contours:
+        return np.empty((0, 5))
 
-                # Sprawdzenie położenia dolnej krawędzi - czy w zakresie jezdni
-                elif ((110 < bottom_y < 342) or (447 < bottom_y < 711)):
-                    strefa = "jezdnia"
-            else:
-                # Obiekt znajduje się w dolnej części obrazu 
-                strefa = "chodnik"
+    lengths = np.fromiter((len(contour) for contour in contours), dtype=np.intp, count=len(contours))
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    points = np.concatenate(contours).reshape(-1, 2).astype(np.int64)
+    x, y = points[:, 0], points[:, 1]
 
+    x_min = np.minimum.reduceat(x, starts)
+    y_min = np.minimum.reduceat(y, starts)
+    width = np.maximum.reduceat(x, starts) - x_min + 1
+    height = np.maximum.reduceat(y, starts) - y_min + 1
 
-            if strefa == "jezdnia":
-                if area > 60000 and w > 550:                    
-                    label = "ciezarowy/autobus"
-                    color = (0, 165, 255)
-                else:
-                    label = "osobowy"
-                    color = (0, 255, 0)
-            
-            elif strefa == "tory":
-                if h > 200 and w > 800:
-                    label = "tramwaj"
-                    color = (0, 255, 255)
+    # Wzór Gaussa (shoelace) - następnikiem ostatniego punktu konturu jest jego pierwszy punkt
+    following = np.arange(1, len(points) + 1)
+    following[starts + lengths - 1] = starts
+    area = np.abs(np.add.reduceat(x * y[following] - x[following] * y, starts)) / 2
 
-            elif strefa == "chodnik":
-                if w > 60 and h > 110:
-                    label = "pieszy"
-                    color = (0, 0, 255)
+    return np.column_stack((x_min, y_min, width, height, area)).astype(np.float64)
 
-            if label is None:
-                continue # Obiekt nie został zaklasyfikowany - pominięcie
 
-            # Print debugowy
-            #print(f"Label: {label}, bbox: {(x, y, w, h)}, bottom_y: {bottom_y}, area:{area}")
-            
-            # Dodanie opisu obiektu do listy
-            frame_objects.append({
-                "label": label,
-                "bbox": (x, y, w, h),
-                "area": area,
-                "centroid": (cx, cy)
-            })
+# Klasy obiektów: (etykieta, kolor bboxa) - indeksy zwracane przez classify_blobs
+CLASSES = (
+    ("ciezarowy/autobus", (0, 165, 255)),
+    ("osobowy", (0, 255, 0)),
+    ("tramwaj", (0, 255, 255)),
+    ("pieszy", (0, 0, 255)),
+)
 
-            if show:
-                cv2.rectangle(frame, (x, y), (x + w, y + h), color, 2)                            # Wizualizacja bboxów wykrytych obiektów
-                cv2.putText(frame, label, (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
 
+def classify_blobs(blobs, frame_shape, params=DEFAULT_PARAMS):
+    """
+    Klasyfikacja blobów (tablica z segment_frame) na podstawie położenia i wymiarów - strefy, pokrycie torów
+    i klasy wyznaczane są maskami dla wszystkich blobów naraz, a położenie w strefach odczytywane z rastra
+    stref (processing.zones.ZoneMap) dla klatki o rozmiarze `frame_shape`. Zwraca listę obiektów w kolejności
+    blobów - "zones" obiektu to bity ZONE_* stref, w których leży jego centroid.
+    """
+    # Ignorowanie małych szumów, pod względem pola powierzchni i wysokości
+    blobs = blobs[(blobs[:, BLOB_AREA] >= params.min_area) & (blobs[:, BLOB_H] >= params.min_height)]
+    if not len(blobs):
+        return []
+
+    bboxes = blobs[:, :BLOB_AREA].astype(np.int64)
+    x, y, w, h = bboxes.T                       # x, y - lewy górny róg prostokąta, w, h - szerokość i wysokość
+    area = blobs[:, BLOB_AREA]
+    cx = x + w // 2                             # cx, cy - współrzędne środka obiektu
+    cy = y + h // 2
+    bottom_y = y + h                            # Dolna krawędź - czy obiekt kończy się na jezdni, torach itp.
+
+    #===Identyfikacja obiektu===
+
+    # Określenie strefy: górna część obrazu to tory (obiekt pokrywa strefę tramwaju) albo jezdnia (dolna
+    # krawędź w zakresie pasa), dolna część obrazu to chodnik
+    zones = zone_map(params, frame_shape[:2])
+    centroid_zones = zones.labels[cy, cx]
+    upper = (centroid_zones & ZONE_GORA) > 0
+    tory = upper & (zones.tram_coverage(bboxes) > params.tram_overlap).any(axis=1)
+    jezdnia = upper & ~tory & ((zones.labels[bottom_y, cx] & ZONE_JEZDNIA) > 0)
+    chodnik = ~upper
+
+    # Określenie klasy obiektu (indeks w CLASSES, -1 - obiekt niesklasyfikowany)
+    truck = (area > params.truck_min_area) & (w > params.truck_min_width)
+    classes = np.select(
+        [jezdnia & truck,
+         jezdnia,
+         tory & (h > params.tram_min_height) & (w > params.tram_min_width),
+         chodnik & (w > params.pedestrian_min_width) & (h > params.pedestrian_min_height)],
+        [0, 1, 2, 3], -1)
+
+    # Opis obiektów (z pominięciem niesklasyfikowanych) - listy wartości Pythona, bez odczytu tablic element po elemencie
+    indices = np.flatnonzero(classes >= 0)
+    frame_objects = []
+    for class_index, bbox, obj_area, centroid, obj_zones in zip(
+            classes[indices].tolist(), bboxes[indices].tolist(), area[indices].tolist(),
+            zip(cx[indices].tolist(), cy[indices].tolist()), centroid_zones[indices].tolist()):
+        label, color = CLASSES[class_index]
+        frame_objects.append({
+            "label": label,
+            "bbox": tuple(bbox),
+            "area": obj_area,
+            "centroid": centroid,
+            "color": color,
+            "zones": obj_zones
+        })
+
+    return frame_objects
+
+
+def draw_objects(frame, frame_objects):
+    """
+    Wizualizacja bboxów i etykiet wykrytych obiektów
+    """
+    for obj in frame_objects:
+        x, y, w, h = obj["bbox"]
+        cv2.rectangle(frame, (x, y), (x + w, y + h), obj["color"], 2)
+        cv2.putText(frame, obj["label"], (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, obj["color"], 1)
+
+
+def draw_overlays(frame, frame_objects, params=DEFAULT_PARAMS):
+    """
+    Strefy i wykryte obiekty na klatce (w miejscu)
+    """
+    draw_zones(frame, params)
+    draw_objects(frame, frame_objects)
+    return frame
+
+
+class ObjectCounter:
+    """
+    Śledzenie obiektów między klatkami i zliczanie ich w strefach - jedyny etap zależny od kolejności klatek
+    """
+
+    def __init__(self, fps, debug=False, params=DEFAULT_PARAMS, profiler=NULL_PROFILER, on_count=None):
+        self.fps = fps
+        self.debug = debug
+        self.params = params
+        self.profiler = profiler
+        self.on_count = on_count    # Wywoływana z opisem każdego zliczenia (tryb strumieniowy), jeśli podana
+
+        # Inicjalizacja trackera i zmiennych pomocniczych
+        # Czas śledzenia niewidocznego obiektu liczony w klatkach rzeczywistego FPS nagrania (30, jeśli FPS nieznany)
+        self.tracker = ObjectTracker(fps=fps if fps > 0 else 30, max_distance=params.tracker_max_distance,
+                                     descriptor=params.descriptor, descriptor_dtype=params.descriptor_dtype)
+        self.tramwaj_block_until = -1  # blokada zliczania tramwajów (dla uniknięcia wielokrotnego zliczania)
+
+        # Słownik wynikowy – ilość zliczonych obiektów każdej klasy
+        self.counts = {
+            "osobowy_lewo_prawo": 0,
+            "osobowy_prawo_lewo": 0,
+            "ciezarowy_lewo_prawo": 0,
+            "ciezarowy_prawo_lewo": 0,
+            "tramwaj": 0,
+            "pieszy": 0,
+            "rowerzysta": 0
+        }
+
+    def reset_counts(self):
+        """
+        Zeruje wynik, zachowując stan trackera (counted_ids) i blokadę tramwajów
+        """
+        self.counts = dict.fromkeys(self.counts, 0)
+
+    def record(self, obj_class, direction, obj_id, frame_number):
+        """
+        Zlicza obiekt klasy `obj_class` (i kierunku jazdy `direction` dla pojazdów) i przekazuje zdarzenie do on_count
+        """
+        self.counts[obj_class if direction is None else f"{obj_class}_{direction}"] += 1
+        if self.on_count is not None:
+            self.on_count({"frame": frame_number, "class": obj_class, "direction": direction, "track_id": obj_id})
+
+    def update(self, frame_objects, frame, frame_number):
+        """
+        Aktualizacja śledzenia i zliczanie obiektów dla jednej klatki (frame_number - numer klatki liczony od 1)
+        """
+        tracker = self.tracker
+        counts = self.counts
 
         # Aktualizacja śledzenia obiektów
-        frame_number = int(cap.get(cv2.CAP_PROP_POS_FRAMES))                        # Pobranie numeru aktualnej klatki
-        tracked = tracker.update(centroids, frame_objects, frame, frame_number)
+        tracked = tracker.update(frame_objects, frame, frame_number)
+        self.profiler.lap("track")
                                                                                     # Dla każdej klatki wywoływany jest tracker.update(...), aby:
                                                                                     # przypisać ID obiektom,
                                                                                     # powiązać je z obiektami z poprzednich klatek,
                                                                                     # utworzyć nowe ID dla nowych obiektów.
 
 
-        # Iteracja po aktualnie śledzonych obiektach, z ich ID oraz pozycją (środkiem geometrycznym).
-        for obj_id, cx, cy in tracked:
+        # Iteracja po aktualnie śledzonych obiektach, z ich ID oraz indeksem wykrycia w frame_objects.
+        for obj_id, index in tracked:
             if obj_id in tracker.counted_ids:
                 continue # obiekt już wcześniej zliczony
 
-            obj_data = tracker.tracked[obj_id]
-
-            # Odtworzenie etykiety (label) dla danego obiektu, szukając jej po jego (cx, cy) w danych detekcji
-            label = next((obj["label"] for obj in frame_objects if obj["centroid"] == (cx, cy)), None)  
+            # Etykieta (label) i położenie obiektu z danych detekcji
+            obj = frame_objects[index]
+            label = obj["label"]
+            zones = obj["zones"]      # Strefy, w których leży centroid obiektu (bity ZONE_*)
 
             # Zliczanie tramwajów z blokadą czasową
             if label == "tramwaj":
                 tramwaj_time_ban = 5
-                frame_number = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
-                if frame_number < tramwaj_block_until:
+                if frame_number < self.tramwaj_block_until:
                     continue  # zablokowane zliczanie tramwajów
 
-                counts["tramwaj"] += 1
+                self.record("tramwaj", None, obj_id, frame_number)
                 tracker.counted_ids.add(obj_id)
-                tramwaj_block_until = frame_number + FPS * tramwaj_time_ban
-                #print(f"[TRAMWAJ] Zliczono tramwaj. Kolejny możliwy po klatce {tramwaj_block_until}")
+                self.tramwaj_block_until = frame_number + self.fps * tramwaj_time_ban
+                #print(f"[TRAMWAJ] Zliczono tramwaj. Kolejny możliwy po klatce {self.tramwaj_block_until}")
                 continue
             
             # Zliczanie pieszych 
             if label == "pieszy":
-                in_zone = (
-                    strefa_piesi[0][0] <= cx <= strefa_piesi[1][0]
-                    and strefa_piesi[0][1] <= cy <= strefa_piesi[1][1]
-                )
-                obj_data['in_pedestrian_zone'] = in_zone
+                in_zone = bool(zones & ZONE_PIESI)
+                tracker.set_pedestrian_zone(obj_id, in_zone)
 
                 if obj_id in tracker.counted_ids and in_zone:
                     continue  # pieszy już zliczony i nadal w strefie
 
                 if obj_id not in tracker.counted_ids and in_zone:
-                    counts["pieszy"] += 1
+                    self.record("pieszy", None, obj_id, frame_number)
                     tracker.counted_ids.add(obj_id)
-                    #print(f"[PIESZY] Zliczony. ID={obj_id}, centroid={cx, cy}")
+                    #print(f"[PIESZY] Zliczony. ID={obj_id}, centroid={obj['centroid']}")
                     continue
 
             # Detekcja kierunku jazdy pojazdów na jezdni – z lewej do prawej lub odwrotnie
-            if strefa_lewo[0][0] <= cx <= strefa_lewo[1][0] and strefa_lewo[0][1] <= cy <= strefa_lewo[1][1]:
+            if zones & ZONE_LEWO:
                 direction = "prawo_lewo"
-            elif strefa_prawo[0][0] <= cx <= strefa_prawo[1][0] and strefa_prawo[0][1] <= cy <= strefa_prawo[1][1]:
+            elif zones & ZONE_PRAWO:
                 direction = "lewo_prawo"
             else:
                 continue
             
             # Zliczanie pojazdów według typu i kierunku
             if label == "osobowy":
-                counts[f"osobowy_{direction}"] += 1
+                self.record("osobowy", direction, obj_id, frame_number)
             elif label == "ciezarowy/autobus":
-                counts[f"ciezarowy_{direction}"] += 1
+                self.record("ciezarowy", direction, obj_id, frame_number)
 
             # Oznaczamy obiekt jako zliczony, aby nie był brany pod uwagę w kolejnych klatkach
             tracker.counted_ids.add(obj_id)
             
-            if debug:
+            if self.debug:
                 print(f"[LICZNIK] Osobowe: ← {counts['osobowy_prawo_lewo']} | → {counts['osobowy_lewo_prawo']} | "
                     f"Ciężarowe: ← {counts['ciezarowy_prawo_lewo']} | → {counts['ciezarowy_lewo_prawo']} || "
                     f"Tramwaje: {counts['tramwaj']} || Piesi: {counts['pieszy']}")
 
-        
+        self.profiler.lap("count")
+        return tracked
+
+
+def resize_for_analysis(image, scale):
+    """
+    Przeskalowanie obrazu do rozdzielczości analizy. INTER_AREA (uśrednianie pikseli, bez aliasingu) jest szybkie
+    tylko dla skali 0.5 - dla pozostałych skal bywa wolniejsze od całej segmentacji, więc używane jest INTER_LINEAR.
+    """
+    if scale == 1:
+        return image
+    height, width = image.shape[:2]
+    size = (int(round(width * scale)), int(round(height * scale)))
+    interpolation = cv2.INTER_AREA if scale == 0.5 else cv2.INTER_LINEAR
+    return cv2.resize(image, size, interpolation=interpolation)
+
+
+def source_scale(cap, analysis_scale):
+    """
+    Skala, o jaką trzeba przeskalować klatki odczytane z `cap`, aby uzyskać rozdzielczość analizy
+    (klatki z pamięci podręcznej - processing.frame_cache - mogą być już przeskalowane, atrybut frame_scale)
+    """
+    return analysis_scale / getattr(cap, "frame_scale", 1.0)
+
+
+def load_background(background_path):
+    """
+    Wczytanie obrazu tła i zamiana na obraz w skali szarości (None, jeśli nie udało się go wczytać). Obraz jest
+    dekodowany raz na proces (np. w demonie przetwarzania) i ponownie tylko po zmianie pliku; zwracana jest kopia.
+    """
+    path = Path(background_path)
+    if not path.is_file():
+        return None
+    background = read_background(str(path.resolve()), path.stat().st_mtime_ns)
+    return None if background is None else background.copy()
+
+
+@lru_cache(maxsize=4)
+def read_background(path, mtime_ns):
+    background = cv2.imread(path)
+    if background is None:
+        return None
+    return cv2.cvtColor(background, cv2.COLOR_BGR2GRAY)
+
+
+def prepare_background(cap, background_path, analysis_scale=1.0, background_model="static", bootstrap_frames=0):
+    """
+    Przygotowuje model tła w rozdzielczości analizy: z pliku `background_path` albo (dla bootstrap_frames > 0)
+    jako medianę klatek z początku nagrania, licząc od bieżącej pozycji. Zwraca None, jeśli tła nie udało się wyznaczyć.
+    """
+    if bootstrap_frames > 0:
+        background_gray = bootstrap_background(cap, bootstrap_frames,
+                                               prepare=lambda gray: resize_for_analysis(gray, source_scale(cap, analysis_scale)))
+        if background_gray is None:
+            print("Nie można wyznaczyć tła z klatek nagrania")
+            return None
+    else:
+        background_gray = load_background(background_path)
+        if background_gray is None:
+            print("Nie można załadować background.jpg")
+            return None
+        background_gray = resize_for_analysis(background_gray, analysis_scale)
+
+    return create_background_model(background_model, background_gray)
+
+
+def detection(cap: cv2.VideoCapture, background_path="background.jpg", show=True, debug=False,
+              start_frame=0, end_frame=None, warmup_frames=0, roi_margin=None, analysis_scale=1.0,
+              params=DEFAULT_PARAMS, background_model="static", bootstrap_frames=0,
+              motion_gate=False, idle_stride=1, gate_stats=None, output_path=None, profiler=None,
+              checkpoint_path=None, checkpoint_interval=60.0) -> dict:
+    """
+    Główna funkcja detekcji i zliczania obiektów pojawiających się na kolejnych kaltkach przetwarzanego wideo
+
+    start_frame, end_frame - zakres klatek [start_frame, end_frame) do zliczania (end_frame=None - do końca wideo)
+    warmup_frames - liczba klatek przed start_frame przetwarzanych bez zliczania, aby odtworzyć stan trackera
+                    i blokady tramwajów (obiekty zliczone w tym czasie należą do poprzedniego fragmentu)
+    roi_margin - jeśli podany, segmentacja obejmuje tylko strefy analizy powiększone o ten margines (w pikselach)
+    analysis_scale - skala klatki, na której odbywa się segmentacja i śledzenie (np. 0.5); wszystkie progi,
+                     pola i strefy z `params` są przeliczane automatycznie
+    background_model - model tła: "static", "running_average", "mog2" lub "knn" (processing.background)
+    bootstrap_frames - jeśli > 0, tło wyznaczane jest jako mediana tylu pierwszych klatek zamiast z background.jpg
+    motion_gate - pomijanie segmentacji i klasyfikacji klatek, w których strefy analizy nie różnią się od tła
+                  (processing.motion.MotionGate); adaptacyjny model tła jest w tych klatkach nadal aktualizowany
+    idle_stride - przy włączonej bramce: po dłuższym braku ruchu analizowana jest tylko co idle_stride-ta klatka
+    gate_stats - słownik uzupełniany statystykami bramki (liczba klatek pominiętych), jeśli podany
+    output_path - jeśli podany, klatki z adnotacjami zapisywane są do tego pliku w osobnym wątku
+                  (AnnotatedVideoWriter); przy show=False i bez output_path klatki nie są w ogóle rysowane
+    profiler - StageProfiler (processing.profiling) mierzący czasy etapów każdej klatki, jeśli podany
+    checkpoint_path - plik punktu kontrolnego (processing.checkpoint): stan trackera i zliczeń zapisywany jest
+                      w tle co checkpoint_interval sekund nagrania, a jeśli plik już istnieje, przetwarzanie
+                      wznawiane jest od zapisanej klatki z identycznym wynikiem końcowym; po dojściu do końca
+                      nagrania plik jest usuwany. Wymaga stałego modelu tła.
+    """
+
+    FPS = cap.get(cv2.CAP_PROP_FPS)
+    if debug: print(f"FPS: {FPS}")
+
+    # Parametry w pikselach klatki analizowanej
+    params = params.scaled(analysis_scale)
+
+    # Inicjalizacja trackera, zmiennych pomocniczych i słownika wynikowego
+    profiler = profiler if profiler is not None else NULL_PROFILER
+    counter = ObjectCounter(FPS, debug=debug, params=params, profiler=profiler)
+
+    # Ustawienie pozycji początkowej (z zapasem na rozgrzewkę trackera)
+    frame_index = max(0, start_frame - warmup_frames)   # Indeks klatki, która zostanie wczytana jako następna
+    if frame_index > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+
+    # Skala klatek źródła względem rozdzielczości analizy
+    frame_scale = source_scale(cap, analysis_scale)
+
+    # Model tła w skali szarości, w rozdzielczości analizy
+    background = prepare_background(cap, background_path, analysis_scale, background_model, bootstrap_frames)
+    if background is None:
+        return []
+
+    # Okno podglądu procesu detekcji i zawartości pliku wideo
+    if show:
+        cv2.namedWindow("Video frames with detection", cv2.WINDOW_NORMAL)
+
+    # Wycinki klatki poddawane segmentacji (None - cała klatka)
+    rois = zone_rois(background.image.shape, roi_margin * analysis_scale, params) if roi_margin is not None else None
+
+    # Bramka ruchu sprawdza strefy analizy z marginesem (niezależnie od trybu ROI segmentacji)
+    gate = None
+    if motion_gate:
+        gate_rois = rois if rois is not None else zone_rois(background.image.shape, ROI_MARGIN * analysis_scale, params)
+        gate = MotionGate(background, gate_rois, threshold=params.threshold, idle_stride=idle_stride)
+
+    # Punkty kontrolne - wznowienie od ostatniego zapisanego stanu i okresowy zapis w tle
+    checkpoints = None
+    if checkpoint_path is not None:
+        if background.adaptive:
+            raise ValueError("Punkty kontrolne wymagają stałego modelu tła (background_model='static')")
+        key = json.dumps({"frames": cap.get(cv2.CAP_PROP_FRAME_COUNT), "fps": FPS, "analysis_scale": analysis_scale,
+                          "roi_margin": roi_margin, "params": repr(params), "bootstrap_frames": bootstrap_frames,
+                          "motion_gate": motion_gate, "idle_stride": idle_stride})
+        state = load_checkpoint(checkpoint_path, key)
+        if state is not None:
+            frame_index = restore(counter, state, gate)
+            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+            if debug:
+                print(f"Wznowienie od klatki {frame_index} ({checkpoint_path})")
+        checkpoints = CheckpointWriter(checkpoint_path, key)
+        checkpoint_frames = max(1, round(checkpoint_interval * (FPS if FPS > 0 else 30)))
+        next_checkpoint = frame_index + checkpoint_frames
+
+    # Zapis nagrania z adnotacjami w tle
+    writer = AnnotatedVideoWriter(output_path, FPS, partial(draw_overlays, params=params)) if output_path else None
+
+    warmup = start_frame > 0
+    interrupted = False     # Przerwanie klawiszem ESC - punkt kontrolny pozostaje do wznowienia
+
+    # Główna pętla przetwarzania wideo
+    while True:
+        profiler.start_frame()
+
+        # Pusta scena od dłuższego czasu - kolejne klatki są tylko pobierane (bez dekodowania do obrazu),
+        # a śledzone obiekty traktowane w nich jako niewidoczne
+        if gate is not None and gate.stride > 1:
+            grabbed = 0
+            while grabbed < gate.stride - 1 and (end_frame is None or frame_index < end_frame) and cap.grab():
+                grabbed += 1
+                frame_index += 1
+            gate.strided += grabbed
+            counter.tracker.skip_frames(grabbed)
+
+        if end_frame is not None and frame_index >= end_frame:
+            break
+
+        ret, frame = cap.read()
+        if not ret:
+            break
+        profiler.lap("decode")
+
+        # Koniec rozgrzewki - obiekty zliczone wcześniej pozostają w counted_ids, ale nie wchodzą do wyniku
+        if warmup and frame_index >= start_frame:
+            counter.reset_counts()
+            warmup = False
+        frame_index += 1    # Numer bieżącej klatki liczony od 1 (odpowiada CAP_PROP_POS_FRAMES po odczycie)
+
+        moving = gate is None or gate.has_motion(frame)
+        if gate is not None:
+            profiler.lap("gate")
+
+        frame = resize_for_analysis(frame, frame_scale)
+        if frame_scale != 1:
+            profiler.lap("resize")
+
+        if moving:
+            blobs = segment_frame(frame, background, rois, params, profiler)
+            frame_objects = classify_blobs(blobs, frame.shape, params)
+            profiler.lap("classify")
+        else:
+            blobs, frame_objects = (), []       # Strefy nie różnią się od tła - nie ma czego segmentować
+            if background.adaptive:
+                update_background(frame, background, rois)
+                profiler.lap("threshold")
+
+        counter.update(frame_objects, frame, frame_index)
+        profiler.end_frame(len(blobs), len(counter.tracker.store))
+
+        if checkpoints is not None and frame_index >= next_checkpoint:
+            checkpoints.save(snapshot(counter, frame_index, gate))
+            next_checkpoint = frame_index + checkpoint_frames
+
+        # Adnotacje rysowane dopiero po śledzeniu - deskryptory wyglądu liczone są z niezmienionej klatki
+        if writer is not None:
+            writer.write(frame.copy() if show or not frame.flags.writeable else frame, frame_objects)
+
         # Podgląd na żywo procesu detekcji, zliczania
         if show:
             #cv2.imshow("Thresholding", thresh)
-            cv2.imshow("Video frames with detection", frame)
+            preview = frame if frame.flags.writeable else frame.copy()     # Klatki z pamięci podręcznej są tylko do odczytu
+            cv2.imshow("Video frames with detection", draw_overlays(preview, frame_objects, params))
             key = cv2.waitKey(1)
             if key == 27:
+                interrupted = True
                 break
 
 
     cap.release()
     if show:
         cv2.destroyAllWindows()
-
-    return counts
+    if checkpoints is not None:
+        checkpoints.close(remove=not interrupted)
+    if writer is not None:
+        writer.close()
+        if debug or writer.dropped:
+            print(f"Nagranie z adnotacjami {output_path}: {writer.written} klatek, "
+                  f"w tym {writer.dropped} powtórzonych (zapis nie nadążał za detekcją)")
+
+    if gate is not None:
+        if gate_stats is not None:
+            gate_stats.update(gate.report())
+        if debug:
+            print(f"Bramka ruchu: {gate.report()}")
+
+    return counter.counts
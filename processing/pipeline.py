@@ -0,0 +1,182 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+from processing.motion import MotionGate
+from processing.objects_detection import (DEFAULT_PARAMS, ROI_MARGIN, ObjectCounter, classify_blobs,
+                                         prepare_background, resize_for_analysis, segment_frame, source_scale,
+                                         zone_rois)
+
+
+class PipelineStats:
+    """
+    Statystyki potoku: łączny czas i liczba klatek każdego etapu oraz głębokość kolejki klatek
+    """
+
+    STAGES = ("decode", "segment", "track")
+
+    def __init__(self):
+        self.lock = threading.Lock()                            # Etap segmentacji działa w wielu wątkach jednocześnie
+        self.seconds = dict.fromkeys(self.STAGES, 0.0)          # Łączny czas pracy etapu
+        self.frames = dict.fromkeys(self.STAGES, 0)             # Liczba klatek obsłużonych przez etap
+        self.wait_seconds = 0.0                                 # Czas, przez który etap śledzenia czekał na segmentację
+        self.queue_depth_sum = 0                                # Suma próbek głębokości kolejki (do średniej)
+        self.queue_depth_max = 0
+        self.queue_samples = 0
+        self.wall_seconds = 0.0
+
+    def add(self, stage, seconds):
+        with self.lock:
+            self.seconds[stage] += seconds
+            self.frames[stage] += 1
+
+    def sample_queue(self, depth):
+        self.queue_depth_sum += depth
+        self.queue_depth_max = max(self.queue_depth_max, depth)
+        self.queue_samples += 1
+
+    def report(self) -> dict:
+        """
+        Zwraca statystyki w postaci słownika (czasy w milisekundach na klatkę)
+        """
+        frames = self.frames["track"]
+        return {
+            "frames": frames,
+            "fps": frames / self.wall_seconds if self.wall_seconds > 0 else 0.0,
+            "stage_ms_per_frame": {
+                stage: 1000 * self.seconds[stage] / self.frames[stage] if self.frames[stage] else 0.0
+                for stage in self.STAGES
+            },
+            "track_wait_ms_per_frame": 1000 * self.wait_seconds / frames if frames else 0.0,
+            "queue_depth_mean": self.queue_depth_sum / self.queue_samples if self.queue_samples else 0.0,
+            "queue_depth_max": self.queue_depth_max,
+        }
+
+
+def pipelined_detection(cap: cv2.VideoCapture, background_path="background.jpg", workers=4, queue_size=16,
+                        stats=None, debug=False, roi_margin=None, analysis_scale=1.0, params=DEFAULT_PARAMS,
+                        background_model="static", bootstrap_frames=0, motion_gate=False, idle_stride=1,
+                        gate_stats=None) -> dict:
+    """
+    Odpowiednik detection(show=False) z rozdzieleniem etapów na wątki:
+    dekodowanie (jeden wątek) -> segmentacja i klasyfikacja (pula `workers` wątków) -> śledzenie i zliczanie
+    (wątek wywołujący, w kolejności klatek).
+
+    Wywołania OpenCV zwalniają GIL, więc dekodowanie i morfologia kolejnych klatek wykonują się równolegle - o ile
+    proces ma więcej niż jeden rdzeń; na jednym rdzeniu potok nie jest szybszy od detection()
+    (extra_testing_utils/benchmark_pipeline.py).
+    Kolejka przyjmuje co najwyżej `queue_size` klatek - gdy etap śledzenia nie nadąża, dekoder czeka (backpressure).
+    Statystyki etapów trafiają do przekazanego obiektu PipelineStats. Pozostałe parametry - jak w detection().
+
+    Segmentacja kolejnych klatek odbywa się równolegle i poza kolejnością, dlatego potok wymaga tła stałego
+    (background_model="static", również wyznaczonego przez bootstrap_frames). Bramka ruchu działa w wątku dekodera:
+    klatki bez ruchu nie trafiają do puli segmentacji.
+    """
+    stats = stats if stats is not None else PipelineStats()
+
+    FPS = cap.get(cv2.CAP_PROP_FPS)
+    params = params.scaled(analysis_scale)
+    counter = ObjectCounter(FPS, debug=debug, params=params)
+
+    background = prepare_background(cap, background_path, analysis_scale, background_model, bootstrap_frames)
+    if background is None:
+        return []
+    if background.adaptive:
+        raise ValueError("Potok wymaga stałego modelu tła (background_model='static')")
+
+    rois = zone_rois(background.image.shape, roi_margin * analysis_scale, params) if roi_margin is not None else None
+    frame_scale = source_scale(cap, analysis_scale)
+
+    gate = None
+    if motion_gate:
+        gate_rois = rois if rois is not None else zone_rois(background.image.shape, ROI_MARGIN * analysis_scale, params)
+        gate = MotionGate(background, gate_rois, threshold=params.threshold, idle_stride=idle_stride)
+
+    def analyze(frame):
+        start = time.perf_counter()
+        frame = resize_for_analysis(frame, frame_scale)
+        blobs = segment_frame(frame, background, rois, params)
+        frame_objects = classify_blobs(blobs, frame.shape, params)
+        stats.add("segment", time.perf_counter() - start)
+        return frame, frame_objects
+
+    pending = queue.Queue(maxsize=queue_size)   # Klatki w kolejności dekodowania wraz z wynikiem segmentacji (Future)
+    stop = threading.Event()
+    decoder_error = []
+
+    def decode():
+        frame_number = 0
+        try:
+            while not stop.is_set():
+                start = time.perf_counter()
+                grabbed = 0     # Klatki pominięte bez dekodowania (bramka ruchu w trybie co k-tej klatki)
+                if gate is not None:
+                    while grabbed < gate.stride - 1 and cap.grab():
+                        grabbed += 1
+                    gate.strided += grabbed
+                frame_number += grabbed
+
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                frame_number += 1
+                moving = gate is None or gate.has_motion(frame)
+                stats.add("decode", time.perf_counter() - start)
+
+                # Klatka bez ruchu nie jest segmentowana - etap śledzenia dostaje pusty wynik
+                item = (frame_number, grabbed, executor.submit(analyze, frame) if moving else None)
+                while not stop.is_set():
+                    try:
+                        pending.put(item, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+        except Exception as error:
+            decoder_error.append(error)
+        finally:
+            pending.put(None)
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        decoder = threading.Thread(target=decode, daemon=True)
+        decoder.start()
+        try:
+            while True:
+                stats.sample_queue(pending.qsize())
+                item = pending.get()
+                if item is None:
+                    break
+                frame_number, grabbed, future = item
+
+                start = time.perf_counter()
+                if future is not None:
+                    frame, frame_objects = future.result()
+                else:
+                    frame, frame_objects = None, []     # Bez obiektów obraz klatki nie jest potrzebny
+                stats.wait_seconds += time.perf_counter() - start
+
+                start = time.perf_counter()
+                counter.tracker.skip_frames(grabbed)
+                counter.update(frame_objects, frame, frame_number)
+                stats.add("track", time.perf_counter() - start)
+        finally:
+            stop.set()
+            while decoder.is_alive():       # Odblokowanie dekodera czekającego na miejsce w kolejce
+                try:
+                    pending.get_nowait()
+                except queue.Empty:
+                    decoder.join(timeout=0.1)
+    stats.wall_seconds = time.perf_counter() - wall_start
+
+    cap.release()
+    if decoder_error:
+        raise decoder_error[0]
+
+    if debug:
+        print(f"[POTOK] {stats.report()}")
+    if gate is not None and gate_stats is not None:
+        gate_stats.update(gate.report())
+
+    return counter.counts
@@ -0,0 +1,112 @@
+import sys
+import time
+
+import numpy as np
+
+try:
+    import resource         # Niedostępny w Windows - wtedy szczytowe RSS nie jest raportowane
+except ImportError:
+    resource = None
+
+
+class StageProfiler:
+    """
+    Pomiar czasu etapów przetwarzania klatki. Kod detekcji wywołuje lap(etap) po zakończeniu każdego etapu -
+    czas od poprzedniego lap() (lub start_frame()) jest doliczany do etapu w bieżącej klatce. Etap wykonywany
+    kilka razy w klatce (np. dla każdego wycinka ROI) jest sumowany. end_frame() zamyka klatkę i zapisuje
+    liczbę konturów i śledzonych obiektów.
+    """
+
+    STAGES = ("decode", "gate", "resize", "threshold", "morphology", "contours", "classify", "track", "count")
+
+    def __init__(self):
+        self.samples = {}           # Etap -> lista czasów w kolejnych klatkach (sekundy)
+        self.current = {}           # Czasy etapów bieżącej klatki
+        self.contours = []
+        self.tracks = []
+        self.last = 0.0
+        self.wall_start = None
+        self.wall_seconds = 0.0
+
+    def start_frame(self):
+        self.last = time.perf_counter()
+        if self.wall_start is None:
+            self.wall_start = self.last
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        self.current[stage] = self.current.get(stage, 0.0) + now - self.last
+        self.last = now
+
+    def end_frame(self, contours, tracks):
+        for stage, seconds in self.current.items():
+            self.samples.setdefault(stage, []).append(seconds)
+        self.current = {}
+        self.contours.append(contours)
+        self.tracks.append(tracks)
+        self.wall_seconds = time.perf_counter() - self.wall_start
+
+    def report(self) -> dict:
+        """
+        Percentyle czasów etapów (ms), FPS, liczba konturów i obiektów na klatkę, szczytowe RSS procesu
+        """
+        frames = len(self.contours)
+        stages = [stage for stage in self.STAGES if stage in self.samples]
+        stages += [stage for stage in self.samples if stage not in self.STAGES]
+
+        report = {
+            "frames": frames,
+            "fps": frames / self.wall_seconds if self.wall_seconds > 0 else 0.0,
+            "stages_ms": {},
+            "contours_per_frame": distribution(self.contours),
+            "tracks_per_frame": distribution(self.tracks),
+            "peak_rss_mb": peak_rss_mb(),
+        }
+        for stage in stages:
+            milliseconds = 1000 * np.asarray(self.samples[stage])
+            p50, p95, p99 = np.percentile(milliseconds, (50, 95, 99))
+            report["stages_ms"][stage] = {
+                "frames": len(milliseconds),
+                "mean": float(milliseconds.mean()),
+                "p50": float(p50),
+                "p95": float(p95),
+                "p99": float(p99),
+                "total": float(milliseconds.sum()),
+            }
+        return report
+
+
+class NullProfiler:
+    """
+    Profiler wyłączony - puste metody, aby kod detekcji nie musiał sprawdzać, czy pomiar jest włączony
+    """
+
+    def start_frame(self):
+        pass
+
+    def lap(self, stage):
+        pass
+
+    def end_frame(self, contours, tracks):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
+
+
+def distribution(values) -> dict:
+    if not values:
+        return {"mean": 0.0, "max": 0}
+    return {"mean": float(np.mean(values)), "max": int(np.max(values))}
+
+
+def peak_rss_mb():
+    """
+    Szczytowe zużycie pamięci (RSS) bieżącego procesu w MB albo None, jeśli system go nie udostępnia
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":        # macOS podaje ru_maxrss w bajtach, Linux i BSD - w KB
+        return peak / (1024 * 1024)
+    return peak / 1024
@@ -0,0 +1,81 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+from processing.frame_sources import open_video
+from processing.objects_detection import detection
+
+
+# Domyślna długość rozgrzewki każdego fragmentu (w sekundach). Musi obejmować blokadę tramwajów (5 s),
+# a w praktyce także czas przejazdu obiektu przez strefę zliczania.
+WARMUP_SECONDS = 10
+
+
+def split_frames(total_frames: int, shards: int) -> list[tuple[int, int | None]]:
+    """
+    Dzieli zakres klatek [0, total_frames) na `shards` równych przedziałów [start, end).
+    Ostatni przedział jest otwarty (end=None), bo CAP_PROP_FRAME_COUNT bywa niedokładne.
+    """
+    shards = max(1, min(shards, total_frames)) if total_frames > 0 else 1
+    bounds = [total_frames * i // shards for i in range(shards)]
+    return [(start, end) for start, end in zip(bounds, bounds[1:] + [None])]
+
+
+def detect_shard(video_path: str, start_frame: int, end_frame: int | None, warmup_frames: int,
+                 background_path="background.jpg", options=None, frame_source=None) -> dict:
+    """
+    Przetwarza jeden fragment nagrania - proces roboczy otwiera własny VideoCapture (lub źródło z fabryki
+    frame_source) i przewija go na początek fragmentu
+    """
+    cv2.setNumThreads(1)
+    cap = open_video(video_path, frame_source)
+    return detection(cap, background_path, show=False, debug=False,
+                     start_frame=start_frame, end_frame=end_frame, warmup_frames=warmup_frames, **(options or {}))
+
+
+def merge_counts(shard_counts: list[dict]) -> dict:
+    """
+    Sumuje zliczenia fragmentów. Obiekty przechodzące przez granicę nie są liczone podwójnie, bo fragment
+    zaczynający się po granicy zlicza je już podczas rozgrzewki (czyli poza swoim wynikiem).
+    """
+    merged = {}
+    for counts in shard_counts:
+        for key, value in counts.items():
+            merged[key] = merged.get(key, 0) + value
+    return merged
+
+
+def sharded_detection(video_path: str, shards: int, workers=None, warmup_seconds=WARMUP_SECONDS,
+                      background_path="background.jpg", frame_source=None, **options) -> dict:
+    """
+    Detekcja na jednym długim nagraniu podzielonym na `shards` fragmentów przetwarzanych równolegle.
+
+    Stan trackera nie jest przekazywany między procesami (to wymusiłoby przetwarzanie sekwencyjne) - każdy fragment
+    odtwarza go samodzielnie, przetwarzając `warmup_seconds` sekund przed swoim początkiem bez zliczania.
+    Obiekty zliczone w rozgrzewce trafiają do counted_ids, a blokada tramwajów jest odtwarzana tak jak w przebiegu
+    sekwencyjnym, więc obiekty na granicy nie są liczone podwójnie.
+
+    Tolerancja: wynik różni się od przebiegu sekwencyjnego tylko wtedy, gdy obiekt był śledzony dłużej niż
+    rozgrzewka przed granicą i zostaje zliczony tuż po niej (lub dopasowanie HOG wypada inaczej przy niepełnej
+    historii) - w praktyce co najwyżej ±1 na klasę na każdą granicę fragmentów. tests/test_sharding.py sprawdza
+    tę tolerancję na syntetycznym nagraniu z obiektami przechodzącymi przez granice (dla 2-4 fragmentów wyniki
+    są tam identyczne z przebiegiem sekwencyjnym).
+
+    options - dodatkowe parametry detection() (np. roi_margin), wspólne dla wszystkich fragmentów
+    frame_source - źródło klatek (processing.frame_sources.open_video), np. pamięć podręczna klatek
+                   (processing.frame_cache) - nagranie jest do niej dekodowane raz, przed uruchomieniem fragmentów
+    """
+    cap = open_video(video_path, frame_source)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    cap.release()
+
+    warmup_frames = int(round(fps * warmup_seconds))
+    ranges = split_frames(total_frames, shards)
+
+    with ProcessPoolExecutor(max_workers=workers or len(ranges)) as executor:
+        futures = [executor.submit(detect_shard, video_path, start, end, warmup_frames, background_path, options,
+                                   frame_source)
+                   for start, end in ranges]
+        shard_counts = [future.result() for future in futures]
+
+    return merge_counts(shard_counts)
@@ -0,0 +1,245 @@
+import json
+import socket
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import cv2
+import numpy as np
+from processing.objects_detection import (DEFAULT_PARAMS, ObjectCounter, classify_blobs, prepare_background,
+                                         resize_for_analysis, segment_frame, source_scale, zone_rois)
+
+
+def open_source(source):
+    """
+    Źródło na żywo: numer urządzenia (np. "0" - kamera), adres strumienia albo plik nagrania
+    """
+    return cv2.VideoCapture(int(source) if str(source).isdigit() else str(source))
+
+
+class LiveSource:
+    """
+    Wątek odczytu klatek ze źródła `cap`. Przechowywana jest tylko najnowsza klatka - jeśli przetwarzanie nie
+    nadąża, starsze klatki są nadpisywane (pomijane), więc opóźnienie nie narasta. Nagranie z pliku (`pace=True`)
+    odtwarzane jest w tempie rzeczywistym (natywny FPS), jako lokalny odpowiednik kamery.
+
+    latest() zwraca (numer klatki od 1, klatka, czas przechwycenia perf_counter, czas przechwycenia UTC).
+    """
+
+    def __init__(self, cap, pace=False):
+        self.cap = cap
+        self.fps = cap.get(cv2.CAP_PROP_FPS) or 30
+        self.pace = pace
+        self.item = None
+        self.captured = 0
+        self.overwritten = 0        # Klatki nadpisane przed pobraniem przez przetwarzanie
+        self.finished = False
+        self.stopped = threading.Event()
+        self.ready = threading.Condition()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def run(self):
+        start = time.perf_counter()
+        try:
+            while not self.stopped.is_set():
+                if self.pace:
+                    delay = start + self.captured / self.fps - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+                item = (self.captured + 1, frame, time.perf_counter(), datetime.now(timezone.utc))
+                with self.ready:
+                    if self.item is not None:
+                        self.overwritten += 1
+                    self.item = item
+                    self.captured += 1
+                    self.ready.notify()
+        finally:
+            with self.ready:
+                self.finished = True
+                self.ready.notify()
+
+    def latest(self, timeout=0.5):
+        """
+        Najnowsza nieprzetworzona klatka albo None (brak nowej klatki w czasie `timeout` lub koniec źródła)
+        """
+        with self.ready:
+            if self.item is None and not self.finished:
+                self.ready.wait(timeout)
+            item, self.item = self.item, None
+            return item
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        self.cap.release()
+
+
+class JsonLinesSink:
+    """
+    Zdarzenia zliczeń jako wiersze JSON w strumieniu tekstowym (plik lub stdout)
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def emit(self, event):
+        self.stream.write(json.dumps(event, ensure_ascii=False) + "\n")
+        self.stream.flush()
+
+    def close(self):
+        pass
+
+
+class SocketSink:
+    """
+    Zdarzenia zliczeń jako wiersze JSON wysyłane do wszystkich klientów połączonych z lokalnym gniazdem TCP
+    (np. `nc localhost 8765`). Klient, który nie odbiera danych, jest rozłączany - nie blokuje przetwarzania.
+    """
+
+    def __init__(self, port, host="127.0.0.1"):
+        self.server = socket.create_server((host, port))
+        self.clients = []
+        self.lock = threading.Lock()
+        threading.Thread(target=self.accept, daemon=True).start()
+
+    def accept(self):
+        while True:
+            try:
+                client, _ = self.server.accept()
+            except OSError:         # Gniazdo zamknięte
+                return
+            client.settimeout(0.05)
+            with self.lock:
+                self.clients.append(client)
+
+    def emit(self, event):
+        data = (json.dumps(event, ensure_ascii=False) + "\n").encode()
+        with self.lock:
+            for client in list(self.clients):
+                try:
+                    client.sendall(data)
+                except OSError:
+                    client.close()
+                    self.clients.remove(client)
+
+    def close(self):
+        self.server.close()
+        with self.lock:
+            for client in self.clients:
+                client.close()
+            self.clients = []
+
+
+def latency_summary(seconds) -> dict:
+    """
+    Percentyle opóźnień (ms)
+    """
+    if not seconds:
+        return {"count": 0}
+    milliseconds = 1000 * np.asarray(seconds)
+    p50, p95, p99 = np.percentile(milliseconds, (50, 95, 99))
+    return {"count": len(milliseconds), "mean": float(milliseconds.mean()), "p50": float(p50), "p95": float(p95),
+            "p99": float(p99), "max": float(milliseconds.max())}
+
+
+def live_detection(source, sinks, latency_budget=None, pace=None, background_path="background.jpg",
+                   roi_margin=None, analysis_scale=1.0, params=DEFAULT_PARAMS, stop=None) -> tuple[dict, dict]:
+    """
+    Detekcja na żywo: każde zliczenie jest od razu wysyłane do `sinks` (JsonLinesSink, SocketSink) jako zdarzenie
+    z czasem przechwycenia klatki, klasą, kierunkiem, ID obiektu i opóźnieniem od przechwycenia klatki do wysłania.
+
+    source - źródło dla cv2.VideoCapture (plik, numer urządzenia, adres strumienia)
+    latency_budget - budżet opóźnienia klatki w sekundach: klatka, która czekała tak długo, że razem z typowym
+                     czasem przetwarzania przekroczyłaby budżet, jest pomijana (następna będzie świeższa)
+    pace - odtwarzanie w tempie natywnego FPS (domyślnie tylko dla plików)
+    stop - threading.Event kończący przetwarzanie (np. z innego wątku), jeśli podany; Ctrl+C również kończy sesję
+
+    Zwraca zliczenia i raport: liczba klatek przechwyconych, przetworzonych i pominiętych oraz percentyle
+    opóźnień klatek (przechwycenie -> koniec zliczania) i zdarzeń (przechwycenie -> wysłanie).
+    """
+    cap = open_source(source)
+    if not cap.isOpened():
+        raise OSError(f"Nie można otworzyć źródła {source}")
+    if pace is None:
+        pace = Path(str(source)).is_file()
+
+    params = params.scaled(analysis_scale)
+    frame_scale = source_scale(cap, analysis_scale)
+    background = prepare_background(cap, background_path, analysis_scale)
+    if background is None:
+        raise FileNotFoundError(background_path)
+    rois = zone_rois(background.image.shape, roi_margin * analysis_scale, params) if roi_margin is not None else None
+
+    frame_latencies, event_latencies = [], []
+    pending_events = []
+    live = LiveSource(cap, pace).start()
+    counter = ObjectCounter(live.fps, params=params, on_count=pending_events.append)
+
+    processed, late = 0, 0
+    last_frame = 0
+    processing_estimate = 0.0       # Średnia krocząca czasu przetwarzania klatki
+    stop = stop or threading.Event()
+    try:
+        while not stop.is_set():
+            item = live.latest()
+            if item is None:
+                if live.finished:
+                    break
+                continue
+            frame_number, frame, captured, captured_at = item
+
+            # Pominięcie klatki, która nie zmieści się w budżecie (chyba że budżetu nie spełniłaby żadna klatka)
+            waited = time.perf_counter() - captured
+            if (latency_budget is not None and processing_estimate < latency_budget
+                    and waited + processing_estimate > latency_budget):
+                late += 1
+                continue
+
+            start = time.perf_counter()
+            counter.tracker.skip_frames(frame_number - last_frame - 1)      # Klatki pominięte - bez obiektów
+            last_frame = frame_number
+
+            frame = resize_for_analysis(frame, frame_scale)
+            blobs = segment_frame(frame, background, rois, params)
+            frame_objects = classify_blobs(blobs, frame.shape, params)
+            counter.update(frame_objects, frame, frame_number)
+
+            for event in pending_events:
+                latency = time.perf_counter() - captured
+                event = {"timestamp": captured_at.isoformat(timespec="milliseconds"), **event,
+                         "video_time": round(frame_number / live.fps, 3), "latency_ms": round(1000 * latency, 2)}
+                for sink in sinks:
+                    sink.emit(event)
+                event_latencies.append(latency)
+            pending_events.clear()
+
+            now = time.perf_counter()
+            frame_latencies.append(now - captured)
+            processing_estimate = 0.9 * processing_estimate + 0.1 * (now - start) if processed else now - start
+            processed += 1
+    except KeyboardInterrupt:       # Ctrl+C kończy sesję na żywo - raport obejmuje klatki przetworzone do tej chwili
+        pass
+    finally:
+        live.stop()
+
+    report = {
+        "source": str(source),
+        "fps": live.fps,
+        "captured": live.captured,
+        "processed": processed,
+        "dropped_overwritten": live.overwritten,
+        "dropped_over_budget": late,
+        "latency_budget_ms": None if latency_budget is None else 1000 * latency_budget,
+        "frame_latency_ms": latency_summary(frame_latencies),
+        "event_latency_ms": latency_summary(event_latencies),
+    }
+    return counter.counts, report
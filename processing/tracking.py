@@ -1,117 +1,271 @@
 import cv2
 import numpy as np
-from scipy.spatial.distance import euclidean
+
+from processing.descriptors import create_descriptor_engine
+
+
+def linear_sum_assignment(cost):
+    """
+    scipy.optimize.linear_sum_assignment importowane przy pierwszym dopasowaniu - import scipy.optimize
+    kosztuje ok. 0,2 s, a nie jest potrzebny np. do wyświetlenia pomocy CLI ani nagrań bez obiektów
+    """
+    from scipy.optimize import linear_sum_assignment as solve
+    return solve(cost)
+
+
+class TrackStore:
+    """
+    Magazyn śledzonych obiektów w układzie "struktura tablic": każda cecha obiektu to osobna, wcześniej zaalokowana
+    tablica, a obiekt zajmuje w nich jeden wiersz (slot). Sloty usuniętych obiektów są używane ponownie.
+
+    Pojemność rośnie (podwajanie) tylko do największej liczby obiektów widocznych jednocześnie i nigdy nie przekracza
+    `max_tracks`, więc zajęta pamięć nie zależy od długości nagrania.
+    """
+
+    def __init__(self, descriptor_size, capacity=64, max_tracks=4096, descriptor_dtype=np.float32):
+        self.descriptor_size = descriptor_size
+        self.descriptor_dtype = np.dtype(descriptor_dtype)          # float16 - połowa pamięci na deskryptory
+        self.max_tracks = max_tracks
+        self.capacity = 0
+        self.slots = {}                                             # obj_id -> slot
+        self.free = []                                              # Wolne sloty (stos)
+
+        self.ids = np.empty(0, dtype=np.int64)                      # ID obiektu w slocie
+        self.active = np.empty(0, dtype=bool)                       # Czy slot jest zajęty
+        self.centroids = np.empty((0, 2), dtype=np.float64)         # Środek obiektu (x, y) — używane do śledzenia i kierunku
+        self.bboxes = np.empty((0, 4), dtype=np.int32)              # Bounding box — prostokąt ograniczający obiekt
+        self.first_seen = np.empty(0, dtype=np.int64)               # Numer klatki, w której obiekt został wykryty po raz pierwszy
+        self.missed = np.empty(0, dtype=np.int32)                   # Licznik kolejnych klatek, w których obiekt nie był widoczny
+        self.in_pedestrian_zone = np.empty(0, dtype=bool)           # Czy obiekt znajduje się w strefie pieszych
+        self.descriptors = np.empty((0, descriptor_size), dtype=self.descriptor_dtype)   # Deskryptory wyglądu
+        self.norms = np.empty(0, dtype=np.float32)                  # Kwadraty norm deskryptorów (do szybkiego liczenia odległości)
+
+        self.grow(capacity)
+
+    def grow(self, capacity):
+        """
+        Powiększa wszystkie tablice do `capacity` slotów, zachowując zawartość
+        """
+        capacity = min(capacity, self.max_tracks)
+        old = self.capacity
+
+        def resized(array):
+            grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+            grown[:old] = array[:old]
+            return grown
+
+        self.ids = resized(self.ids)
+        self.active = resized(self.active)
+        self.centroids = resized(self.centroids)
+        self.bboxes = resized(self.bboxes)
+        self.first_seen = resized(self.first_seen)
+        self.missed = resized(self.missed)
+        self.in_pedestrian_zone = resized(self.in_pedestrian_zone)
+        self.descriptors = resized(self.descriptors)
+        self.norms = resized(self.norms)
+
+        self.free.extend(range(capacity - 1, old - 1, -1))
+        self.capacity = capacity
+
+    def __len__(self):
+        return len(self.slots)
+
+    def active_slots(self):
+        return np.flatnonzero(self.active)
+
+    def set(self, slot, centroid, bbox, descriptor):
+        """
+        Aktualizacja położenia i wyglądu obiektu w slocie
+        """
+        self.centroids[slot] = centroid
+        self.bboxes[slot] = bbox
+        self.descriptors[slot] = descriptor
+        stored = self.descriptors[slot].astype(np.float32)           # Norma z wartości po ewentualnym zaokrągleniu do float16
+        self.norms[slot] = stored @ stored
+        self.missed[slot] = 0
+
+    def add(self, obj_id, centroid, bbox, descriptor, frame_number):
+        """
+        Dodaje nowy obiekt i zwraca jego slot. Gdy osiągnięto max_tracks, zwalniany jest slot obiektu
+        niewidocznego najdłużej (spośród nich - wykrytego najwcześniej). Zwraca też ID obiektu usuniętego w ten
+        sposób (albo None).
+        """
+        evicted = None
+        if not self.free:
+            if self.capacity < self.max_tracks:
+                self.grow(self.capacity * 2)
+            else:
+                candidates = np.flatnonzero(self.missed == self.missed.max())
+                slot = int(candidates[np.argmin(self.first_seen[candidates])])
+                evicted = int(self.ids[slot])
+                self.remove(slot)
+
+        slot = self.free.pop()
+        self.slots[obj_id] = slot
+        self.ids[slot] = obj_id
+        self.active[slot] = True
+        self.first_seen[slot] = frame_number
+        self.in_pedestrian_zone[slot] = False
+        self.set(slot, centroid, bbox, descriptor)
+        return slot, evicted
+
+    def remove(self, slot):
+        slot = int(slot)
+        del self.slots[int(self.ids[slot])]
+        self.active[slot] = False
+        self.missed[slot] = 0
+        self.free.append(slot)
+
+    def memory_bytes(self):
+        """
+        Pamięć zajmowana przez tablice magazynu (bez słownika slots, którego rozmiar jest ograniczony jak tablice)
+        """
+        return sum(array.nbytes for array in (self.ids, self.active, self.centroids, self.bboxes, self.first_seen,
+                                              self.missed, self.in_pedestrian_zone, self.descriptors, self.norms))
+
 
 class ObjectTracker:
     """
     Główna klasa do śledzenia obiektów
     """
 
-    def __init__(self, fps=30, max_seconds_missing=15):
+    def __init__(self, fps=30, max_seconds_missing=15, max_distance=60, descriptor="hog",
+                 descriptor_dtype=np.float32, max_tracks=4096):
         """
         Inicjalizacja parametrów obiektu klasy
         """
-        self.tracked = {}                                           # Aktualnie śledzone obiekty: obj_id -> dane
-        self.counted_ids = set()                                    # Zbiór ID obiektów już zliczonych
+        self.counted_ids = set()                                    # Zbiór ID obiektów już zliczonych (tylko obiektów wciąż śledzonych)
         self.object_id = 0                                          # Licznik do przypisywania nowych ID
-        self.prev_tracked = {}                                      # Dane z poprzedniej klatki (do porównania)
         self.max_missed_frames = int(fps * max_seconds_missing)     # Maksymalna liczba kolejnych klatek, w których obiekt może być niewidoczny
                                                                     # zanim zostanie usunięty ze śledzenia
-    def compute_hog_descriptor(self, image):
+        self.max_distance = max_distance                            # Maksymalne przesunięcie centroidu między klatkami (w pikselach)
+        self.descriptor_engine = create_descriptor_engine(descriptor)   # Deskryptor wyglądu (HOG lub tańszy) tworzony raz na tracker
+
+        # Aktualnie śledzone obiekty (struktura tablic)
+        self.store = TrackStore(self.descriptor_engine.size, max_tracks=max_tracks, descriptor_dtype=descriptor_dtype)
+
+    def match(self, centroids, descriptors, slots):
         """
-        Oblicza deskryptor HOG (Histogram of Oriented Gradients) z podanego fragmentu obrazu
+        Optymalne przypisanie wykrytych obiektów do śledzonych w slotach `slots` (jednym wywołaniem dla całej klatki).
+
+        Koszt pary to odległość euklidesowa deskryptorów wyglądu; pary, których centroidy są dalej niż max_distance,
+        są wykluczone. Przypisanie minimalizujące sumaryczny koszt (linear_sum_assignment) sprawia, że dwa wykryte
+        obiekty nie mogą przejąć tego samego śledzonego obiektu. Zwraca listę: slot śledzonego obiektu albo None.
         """
-        winSize = (64, 64)    # Rozmiar okna detekcji HOG – obraz wejściowy (ROI) zostanie przeskalowany do tego rozmiaru
-        blockSize = (8, 8)    # Rozmiar bloku, czyli obszaru, z którego będą normalizowane gradienty
-        blockStride = (4, 4)  # Krok przesuwania bloku po obrazie  
-        cellSize = (4, 4)     # Rozmiar pojedynczej komórki, w której liczony jest histogram gradientów
-        nbins = 9             # Liczba przedziałów histogramu kierunku gradientu, 9 oznacza kierunki co 20 stopni
-        
-        hog = cv2.HOGDescriptor(winSize, blockSize, blockStride, cellSize, nbins)
-        resized = cv2.resize(image, winSize)
-        descriptor = hog.compute(resized)  # Zwraca wektor cech opisujący teksturę i orientację gradientów.
-        return descriptor
+        matches = [None] * len(centroids)
+        if len(centroids) == 0 or len(slots) == 0:
+            return matches
+
+        store = self.store
+        positions = np.asarray(centroids, dtype=np.float64)
+        track_centroids = store.centroids[slots]
+        distances = np.hypot(positions[:, None, 0] - track_centroids[None, :, 0],
+                             positions[:, None, 1] - track_centroids[None, :, 1])
+        gated = distances <= self.max_distance
+        if not gated.any():
+            return matches
 
+        # Odległości deskryptorów liczone jednym iloczynem macierzy, tylko dla wierszy i kolumn, które mają choć jedną
+        # parę w zasięgu bramki: |a - b|^2 = |a|^2 + |b|^2 - 2 a·b (normy śledzonych obiektów są zapamiętane)
+        rows = np.flatnonzero(gated.any(axis=1))
+        cols = np.flatnonzero(gated.any(axis=0))
+        gated = gated[np.ix_(rows, cols)]
+        current = descriptors[rows]
+        tracks = slots[cols]
+        squared = (np.einsum('ij,ij->i', current, current)[:, None] + store.norms[tracks][None, :]
+                   - 2 * (current @ store.descriptors[tracks].astype(np.float32).T))
+        scores = np.sqrt(np.maximum(squared, 0))
 
+        # Koszt par wykluczonych bramką odległości większy od sumy kosztów wszystkich par dozwolonych - przypisanie
+        # z mniejszą liczbą par wykluczonych jest zawsze tańsze, więc solver najpierw maksymalizuje liczbę dopasowań
+        forbidden = scores[gated].sum() + 1
+        cost = np.where(gated, scores, forbidden)
+
+        assigned_rows, assigned_cols = linear_sum_assignment(cost)
+        for row, col in zip(assigned_rows, assigned_cols):
+            if gated[row, col]:
+                matches[rows[row]] = int(tracks[col])
+        return matches
+
+    def set_pedestrian_zone(self, obj_id, in_zone):
+        """
+        Zapamiętuje, czy śledzony obiekt znajduje się w strefie pieszych
+        """
+        self.store.in_pedestrian_zone[self.store.slots[obj_id]] = in_zone
+
+    def memory_bytes(self):
+        """
+        Przybliżona pamięć stanu trackera: tablice magazynu i zbiór zliczonych ID
+        """
+        return self.store.memory_bytes() + len(self.counted_ids) * 64
 
-    def update(self, current_centroids, frame_objects, frame_rgb, frame_number):
+    def update(self, frame_objects, frame_rgb, frame_number):
+        """
+        Przypisuje ID obiektom z frame_objects. Zwraca listę (ID, indeks obiektu w frame_objects) - obiekty
+        o tym samym centroidzie są śledzone raz (pierwszy z nich).
+        """
         updated = []
+        store = self.store
+
+        # Indeksy wykrytych obiektów bieżącej klatki (pierwszy obiekt o danym centroidzie)
+        first = {}
+        for index, obj in enumerate(frame_objects):
+            first.setdefault(obj['centroid'], index)
+        indices = list(first.values())
+
+        # Wykryte obiekty i ich deskryptory wyglądu (liczone razem dla całej klatki)
+        candidates = [frame_objects[index] for index in indices]
+        descriptors = self.descriptor_engine.compute(frame_rgb, [candidate['bbox'] for candidate in candidates])
+
+        matches = self.match([candidate['centroid'] for candidate in candidates], descriptors, store.active_slots())
+
+        seen = np.zeros(store.capacity, dtype=bool)                     # Sloty obiektów widocznych w tej klatce
+        for index, candidate, descriptor, slot in zip(indices, candidates, descriptors, matches):
+            cx, cy = candidate['centroid']
+
+            if slot is not None:
+                # Dopasowano do istniejącego obiektu – aktualizuj dane (i resetuj licznik nieobecności)
+                store.set(slot, (cx, cy), candidate['bbox'], descriptor)
+                obj_id = int(store.ids[slot])
 
-        # Iteracja po wszystkich centroidach wykrytych obiektów
-        for cx, cy in current_centroids:
-
-            # Znajdź obiekt w frame_objects odpowiadający aktualnemu centroidowi
-            candidate = next((obj for obj in frame_objects if obj['centroid'] == (cx, cy)), None)
-            if candidate is None:
-                continue    # pomiń, jeśli nie znaleziono obiektu
-
-            x, y, w, h = candidate['bbox']
-            roi = frame_rgb[y:y+h, x:x+w]
-            descriptor = self.compute_hog_descriptor(roi)       # Oblicz deskryptor HOG dla bieżącego obiektu
-
-            matched_id = None
-            best_score = float('inf')                           # Najniższa znaleziona odległość między deskryptorami
-
-            for obj_id, data in self.tracked.items():           # Przeszukaj aktualnie śledzone obiekty
-                prev_cx, prev_cy = data['centroid']
-                dist = np.hypot(cx - prev_cx, cy - prev_cy)
-                if dist > 60:                                   # Jeśli nowy obiekt jest zbyt daleko od wcześniej śledzonego, następuje pominięcie
-                    continue                                    
-                
-                # Liczymy odległość euklidesową pomiędzy opisem obecnego obiektu a opisem wcześniej śledzonego
-                score = euclidean(data['descriptor'], descriptor)
-                if score < best_score:      # Im mniejsza ta odległość, tym bardziej podobny wygląd                
-                    best_score = score
-                    matched_id = obj_id
-
-            if matched_id is not None:
-                # Dopasowano do istniejącego obiektu – aktualizuj dane
-                self.tracked[matched_id]['centroid'] = (cx, cy)
-                self.tracked[matched_id]['descriptor'] = descriptor
-                self.tracked[matched_id]['bbox'] = candidate['bbox']
-                self.tracked[matched_id]['missed_frames'] = 0  # resetuj licznik
-                updated.append((matched_id, cx, cy))
-            
             else: # Nie pasuje do żadnego aktualnie śledzonego obiektu
 
-                assigned_id = self.object_id
+                obj_id = self.object_id
                 self.object_id += 1     # Nowy obiekt
 
-                self.tracked[assigned_id] = {
-                    'centroid': (cx, cy),               # Środek obiektu (x, y) — używane do śledzenia i kierunku
-                    'descriptor': descriptor,           # Deskryptor HOG — cecha wyglądu (do porównania podobieństwa)
-                    'bbox': (x, y, w, h),               # Bounding box — prostokąt ograniczający obiekt
-                    'first_seen_frame': frame_number,   # Numer klatki, w której obiekt został wykryty po raz pierwszy
-                    'in_pedestrian_zone': False,        # Czy obiekt znajduje się w strefie pieszych
-                    'missed_frames': 0                  # Licznik kolejnych klatek, w których obiekt nie był widoczny
-                }
+                slot, evicted = store.add(obj_id, (cx, cy), candidate['bbox'], descriptor, frame_number)
+                if evicted is not None:
+                    self.counted_ids.discard(evicted)
+                if slot >= len(seen):                                   # Magazyn urósł w trakcie tej klatki
+                    seen = np.concatenate([seen, np.zeros(store.capacity - len(seen), dtype=bool)])
+
+            seen[slot] = True
+            updated.append((obj_id, index))
 
-                updated.append((assigned_id, cx, cy))
 
-        
         # Usuwanie obiektów, które zniknęły na zbyt długo
-        
-        # Zbiera ID wszystkich obiektów, które zostały zaktualizowane (czyli wykryte w tej klatce)
-        updated_ids = set(obj_id for obj_id, _, _ in updated) 	   
-        
-        # Lista ID do późniejszego usunięcia
-        to_remove = []
-
-        for obj_id, data in self.tracked.items():
-            if obj_id in updated_ids:                # Jeśli obiekt był widoczny, pomiń
-                continue
-
-            data['missed_frames'] += 1               # Jeśli obiekt nie był widoczny, zwiększ licznik „nieobecności w kadrze"
-            
-            # Jeśli nie był widziany zbyt długo -> dodaj go do to_remove
-            if data['missed_frames'] > self.max_missed_frames:
-                to_remove.append(obj_id)             # Za długo niewidoczny — oznacz do usunięcia
-
-        for obj_id in to_remove:
-            del self.tracked[obj_id]                 # Każdy obiekt, który zniknie z obrazu i nie pojawi się przez 15 sekund, zostaje usunięty 
 
-        return updated
+        # Obiekty niewidoczne w tej klatce – zwiększ licznik „nieobecności w kadrze"
+        self.expire(store.active & ~seen)
 
+        return updated
 
+    def skip_frames(self, count):
+        """
+        Uwzględnia `count` klatek, w których z założenia nie ma żadnych obiektów (pominiętych przez bramkę ruchu
+        bez dekodowania) - wszystkie śledzone obiekty są w nich niewidoczne
+        """
+        self.expire(self.store.active.copy(), count)
 
+    def expire(self, unseen, frames=1):
+        """
+        Zwiększa licznik nieobecności obiektów `unseen` (maska slotów) o `frames` i usuwa te niewidoczne zbyt długo
+        """
+        store = self.store
+        store.missed[unseen] += frames
 
+        # Każdy obiekt, który zniknie z obrazu i nie pojawi się przez 15 sekund, zostaje usunięty.
+        # Jego ID nie zostanie już nigdy przydzielone, więc można je też usunąć ze zbioru zliczonych.
+        for slot in np.flatnonzero(unseen & (store.missed > self.max_missed_frames)):
+            self.counted_ids.discard(int(store.ids[slot]))
+            store.remove(slot)
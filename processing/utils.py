@@ -1,12 +1,12 @@
 import cv2
 from processing.objects_detection import detection
+from processing.pipeline import pipelined_detection
 
 
-def perform_processing(cap: cv2.VideoCapture) -> dict[str, int]:
-    
-    # TODO: add video processing here
-    detected_obj = detection(cap, show=False, debug=False)
-    
+def to_results(detected_obj: dict) -> dict[str, int]:
+    """
+    Zamienia słownik zliczeń z detection() na format pliku wynikowego
+    """
     return {
         "liczba_samochodow_osobowych_z_prawej_na_lewa": detected_obj.get("osobowy_prawo_lewo", 0),
         "liczba_samochodow_osobowych_z_lewej_na_prawa": detected_obj.get("osobowy_lewo_prawo", 0),
@@ -15,4 +15,16 @@ def perform_processing(cap: cv2.VideoCapture) -> dict[str, int]:
         "liczba_tramwajow": detected_obj.get("tramwaj", 0),
         "liczba_pieszych": detected_obj.get("pieszy", 0),
         "liczba_rowerzystow": detected_obj.get("rowerzysta", 0)
-    }
\ No newline at end of file
+    }
+
+
+def perform_processing(cap: cv2.VideoCapture, pipeline_workers: int = 0, **options) -> dict[str, int]:
+    
+    # TODO: add video processing here
+    # options - dodatkowe parametry detekcji (np. roi_margin) przekazywane do detection()
+    if pipeline_workers > 0:
+        detected_obj = pipelined_detection(cap, workers=pipeline_workers, **options)
+    else:
+        detected_obj = detection(cap, show=False, debug=False, **options)
+    
+    return to_results(detected_obj)
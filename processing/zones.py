@@ -0,0 +1,170 @@
+import json
+from functools import lru_cache
+from pathlib import Path
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+# Pola DetectionParams opisujące geometrię sceny - tylko te można podać w pliku konfiguracji stref kamery
+ZONE_FIELDS = ("strefa_lewo", "strefa_prawo", "strefa_tramwaju1", "strefa_tramwaju2", "strefa_piesi", "horizon", "road_bands")
+POLYGON_FIELDS = ZONE_FIELDS[:5]
+
+# Bity rastra stref (ZoneMap.labels) - piksel może należeć do kilku stref naraz
+ZONE_LEWO = 1           # Strefa zliczania jazdy z prawej na lewą
+ZONE_PRAWO = 2          # Strefa zliczania jazdy z lewej na prawą
+ZONE_PIESI = 4          # Strefa pieszych
+ZONE_GORA = 8           # Górna część obrazu (nad linią horizon) - jezdnia i tory
+ZONE_JEZDNIA = 16       # Wiersze, w których może kończyć się obiekt na jezdni (road_bands)
+
+
+def polygon(zone) -> np.ndarray:
+    """
+    Wierzchołki strefy jako tablica (K, 2) - strefa podana dwoma punktami to prostokąt (lewy górny i prawy dolny róg)
+    """
+    points = np.asarray(zone, dtype=np.int32).reshape(-1, 2)
+    if len(points) == 2:
+        (x0, y0), (x1, y1) = points
+        points = np.array([(x0, y0), (x1, y0), (x1, y1), (x0, y1)], dtype=np.int32)
+    return points
+
+
+def zone_bounds(zone) -> tuple[int, int, int, int]:
+    """
+    Prostokąt otaczający strefę (x0, y0, x1, y1)
+    """
+    points = polygon(zone)
+    (x0, y0), (x1, y1) = points.min(axis=0), points.max(axis=0)
+    return int(x0), int(y0), int(x1), int(y1)
+
+
+def zone_mask(zone, shape) -> np.ndarray:
+    """
+    Maska (uint8, 0/1) pikseli strefy - razem z pikselami leżącymi na jej krawędziach
+    """
+    mask = np.zeros(shape, dtype=np.uint8)
+    cv2.fillPoly(mask, [polygon(zone)], 1)
+    return mask
+
+
+def zone_area_mask(zone, shape) -> np.ndarray:
+    """
+    Maska (uint8, 0/1) pikseli, których środek leży wewnątrz strefy. Piksel (x, y) to kwadrat [x, x+1) x [y, y+1),
+    więc prostokąt (x0, y0)-(x1, y1) obejmuje dokładnie (x1 - x0) * (y1 - y0) pikseli - tak jak bbox [x, x+w) x [y, y+h),
+    i pole części wspólnej z bboxem liczone z maski jest dokładnym polem przecięcia prostokątów
+    """
+    points = polygon(zone).astype(np.float64)
+    height, width = shape[:2]
+    x0, y0, x1, y1 = zone_bounds(zone)
+    x0, y0, x1, y1 = max(x0, 0), max(y0, 0), min(x1, width), min(y1, height)
+    mask = np.zeros(shape, dtype=np.uint8)
+    if x0 >= x1 or y0 >= y1:
+        return mask
+
+    # Test parzystości przecięć poziomej półprostej ze środka piksela z krawędziami wielokąta
+    px, py = np.meshgrid(np.arange(x0, x1) + 0.5, np.arange(y0, y1) + 0.5)
+    inside = np.zeros(px.shape, dtype=bool)
+    for (ax, ay), (bx, by) in zip(points, np.roll(points, -1, axis=0)):
+        if ay == by:
+            continue
+        crosses = (ay > py) != (by > py)
+        inside ^= crosses & (px < ax + (py - ay) * (bx - ax) / (by - ay))
+    mask[y0:y1, x0:x1] = inside
+    return mask
+
+
+class ZoneMap:
+    """
+    Strefy sceny skompilowane dla klatki o rozmiarze `shape`, aby sprawdzanie położenia wszystkich wykryć było
+    indeksowaniem tablic niezależnie od liczby i kształtu stref:
+
+    labels - raster bitów ZONE_* (uint8) o jeden piksel większy od klatki w każdym wymiarze (krawędzie stref
+             i dolne krawędzie bboxów mogą leżeć na granicy klatki); labels[y, x] - strefy punktu (x, y)
+    tram_integrals - obrazy całkowe masek stref tramwaju (zone_area_mask): liczba pikseli strefy wewnątrz bboxa
+                     to 4 odczyty; dla prostokątnej strefy jest to dokładne pole przecięcia ze strefą
+    """
+
+    def __init__(self, params, shape):
+        height, width = shape[:2]
+        size = (height + 1, width + 1)
+
+        labels = np.zeros(size, dtype=np.uint8)
+        for bit, zone in ((ZONE_LEWO, params.strefa_lewo), (ZONE_PRAWO, params.strefa_prawo), (ZONE_PIESI, params.strefa_piesi)):
+            labels[zone_mask(zone, size).astype(bool)] |= bit
+
+        rows = np.arange(size[0])
+        labels[rows < height * params.horizon] |= ZONE_GORA
+        road = np.zeros(size[0], dtype=bool)
+        for low, high in params.road_bands:
+            road |= (low < rows) & (rows < high)
+        labels[road] |= ZONE_JEZDNIA
+        self.labels = labels
+
+        self.tram_integrals = []
+        self.tram_areas = []
+        for zone in (params.strefa_tramwaju1, params.strefa_tramwaju2):
+            mask = zone_area_mask(zone, size)
+            self.tram_integrals.append(cv2.integral(mask, sdepth=cv2.CV_32S))
+            self.tram_areas.append(int(mask.sum()))
+
+    def tram_coverage(self, bboxes) -> np.ndarray:
+        """
+        Pokrycie stref tramwaju przez obiekty: tablica (N, liczba stref) - jaka część pikseli strefy leży
+        wewnątrz bboxa (tablica (N, 4) [x, y, w, h]) każdego obiektu
+        """
+        x0, y0, w, h = bboxes.T
+        x1, y1 = x0 + w, y0 + h
+        coverage = np.zeros((len(bboxes), len(self.tram_integrals)))
+        for index, (integral, area) in enumerate(zip(self.tram_integrals, self.tram_areas)):
+            if area > 0:
+                inside = integral[y1, x1] - integral[y0, x1] - integral[y1, x0] + integral[y0, x0]
+                coverage[:, index] = inside / area
+        return coverage
+
+
+def zone_map(params, shape) -> ZoneMap:
+    """
+    ZoneMap dla parametrów i rozmiaru klatki - kompilowana raz dla geometrii sceny (pola ZONE_FIELDS) i rozmiaru
+    klatki, więc parametry różniące się tylko progami (np. konfiguracje parameter_sweep) korzystają z jednej mapy
+    """
+    return compile_zones(tuple(getattr(params, field) for field in ZONE_FIELDS), tuple(shape[:2]))
+
+
+@lru_cache(maxsize=8)
+def compile_zones(geometry, shape) -> ZoneMap:
+    return ZoneMap(SimpleNamespace(**dict(zip(ZONE_FIELDS, geometry))), shape)
+
+
+def load_zones(path) -> dict:
+    """
+    Wczytuje plik konfiguracji stref kamery (JSON zapisany przez extra_testing_utils/create_zone.py) jako
+    słownik pól DetectionParams do podstawienia przez dataclasses.replace. Strefy to wielokąty (listy punktów
+    [x, y]) lub prostokąty podane dwoma rogami, we współrzędnych klatki nagrania w pełnej rozdzielczości.
+    """
+    with Path(path).open() as config_file:
+        config = json.load(config_file)
+
+    unknown = set(config) - set(ZONE_FIELDS)
+    if unknown:
+        raise ValueError(f"Nieznane pola w {path}: {', '.join(sorted(unknown))} (dozwolone: {', '.join(ZONE_FIELDS)})")
+
+    zones = {}
+    for field, value in config.items():
+        if field in POLYGON_FIELDS:
+            if len(value) < 2 or any(len(point) != 2 for point in value):
+                raise ValueError(f"{path}: strefa {field} musi mieć co najmniej 2 punkty [x, y]")
+            value = tuple((int(x), int(y)) for x, y in value)
+        elif field == "road_bands":
+            value = tuple((low, high) for low, high in value)
+        zones[field] = value
+    return zones
+
+
+def save_zones(path, params):
+    """
+    Zapisuje geometrię sceny z `params` (DetectionParams) jako plik konfiguracji stref kamery - każde pole
+    w osobnym wierszu, aby plik dało się czytać i poprawiać ręcznie
+    """
+    lines = [f'    "{field}": {json.dumps(getattr(params, field))}' for field in ZONE_FIELDS]
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    Path(path).write_text("{\n" + ",\n".join(lines) + "\n}\n")
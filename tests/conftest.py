@@ -0,0 +1,69 @@
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+from extra_testing_utils.synthetic_video import CLIPS, build_scenario, generate
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKGROUND = str(ROOT / "background.jpg")
+CLIP = "synthetic_busy.mp4"
+
+
+@pytest.fixture(scope="session")
+def synthetic_dir(tmp_path_factory):
+    """
+    Katalog z syntetycznym nagraniem o znanych zliczeniach (extra_testing_utils.synthetic_video) - generowanym
+    raz na sesję testów
+    """
+    directory = tmp_path_factory.mktemp("synthetic")
+    generate(directory, clips={CLIP: CLIPS[CLIP]}, background_path=BACKGROUND)
+    return directory
+
+
+@pytest.fixture(scope="session")
+def sample_clip(tmp_path_factory):
+    """
+    Krótkie nagranie: gradient tła i przesuwający się prostokąt (klatki różnią się od siebie)
+    """
+    path = tmp_path_factory.mktemp("clips") / "sample.mp4"
+    width, height = 160, 120
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), 25, (width, height))
+    if not writer.isOpened():
+        pytest.skip("OpenCV nie zapisuje nagrań mp4v")
+    gradient = np.tile(np.linspace(0, 255, width, dtype=np.uint8), (height, 1))
+    for index in range(30):
+        frame = cv2.merge([gradient, gradient[::-1], np.full_like(gradient, 128)])
+        cv2.rectangle(frame, (4 * index, 30), (4 * index + 30, 80), (255, 255, 255), -1)
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def read_all(cap):
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame.copy())
+    cap.release()
+    return frames
+
+
+@pytest.fixture(scope="session")
+def synthetic_clip(synthetic_dir):
+    return synthetic_dir / CLIP
+
+
+def objects_on_screen(frame_number, clip=CLIP, width=1920) -> int:
+    """
+    Liczba obiektów scenariusza nagrania widocznych w klatce `frame_number`
+    """
+    objects, _ = build_scenario(CLIPS[clip])
+    visible = 0
+    for start, x0, _, vx, w, _, _ in objects:
+        x = x0 + vx * (frame_number - start)
+        visible += frame_number >= start and x < width and x + w > 0
+    return visible
@@ -0,0 +1,32 @@
+import threading
+
+import cv2
+import numpy as np
+
+from processing.annotated_output import AnnotatedVideoWriter
+from tests.conftest import read_all
+
+
+def test_dropped_frames_repeat_previous(tmp_path):
+    path = tmp_path / "annotated.mp4"
+    release = threading.Event()
+
+    def render(frame, frame_objects):
+        release.wait()          # Wątek zapisu wstrzymany na pierwszej klatce - kolejka się zapełnia
+        return frame
+
+    writer = AnnotatedVideoWriter(path, 25, render, queue_size=2)
+    levels = [20 * index for index in range(10)]
+    for level in levels:
+        writer.write(np.full((64, 64, 3), level, np.uint8), [])
+    release.set()
+    writer.close()
+
+    frames = read_all(cv2.VideoCapture(str(path)))
+    assert writer.written == len(frames) == len(levels)
+    # Każda klatka nagrania to klatka źródła na swoim miejscu albo powtórzenie ostatniej zapisanej przed nią
+    decoded = [int(round(frame.mean() / 20)) * 20 for frame in frames]
+    assert decoded[0] == levels[0]
+    assert decoded == sorted(decoded)
+    assert all(value <= level for value, level in zip(decoded, levels))
+    assert writer.dropped == sum(value != level for value, level in zip(decoded, levels)) > 0
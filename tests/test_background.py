@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from processing.background import create_background_model
+from processing.objects_detection import update_background
+
+
+def frames(count, shape=(60, 80), seed=0):
+    rng = np.random.default_rng(seed)
+    base = rng.integers(0, 200, size=shape, dtype=np.uint8)
+    return base, [np.clip(base.astype(np.int16) + rng.integers(0, 40, size=shape), 0, 255).astype(np.uint8)
+                  for _ in range(count)]
+
+
+@pytest.mark.parametrize("kind", ["running_average", "mog2"])      # KNN losuje próbki - maski nie są powtarzalne
+def test_update_advances_model_like_foreground(kind):
+    # Klatki pominięte przez bramkę ruchu (update) zmieniają model tak samo jak segmentowane (foreground)
+    base, sequence = frames(40)
+    segmented = create_background_model(kind, base.copy())
+    gated = create_background_model(kind, base.copy())
+    rois = [(0, 0, 40, 60), (40, 0, 80, 60)]
+
+    for frame in sequence:
+        for x0, y0, x1, y1 in rois:
+            segmented.foreground(frame[y0:y1, x0:x1], (x0, y0, x1, y1), 30)
+        update_background(frame, gated, rois)
+
+    probe = sequence[0]
+    for x0, y0, x1, y1 in rois:
+        roi = (x0, y0, x1, y1)
+        np.testing.assert_array_equal(segmented.foreground(probe[y0:y1, x0:x1], roi, 30),
+                                      gated.foreground(probe[y0:y1, x0:x1], roi, 30))
+    if kind == "running_average":
+        assert (gated.image != base).any()
+
+
+def test_static_background_not_updated():
+    base, sequence = frames(5)
+    background = create_background_model("static", base.copy())
+    for frame in sequence:
+        update_background(frame, background)
+    np.testing.assert_array_equal(background.image, base)
@@ -0,0 +1,105 @@
+import json
+import pickle
+
+import cv2
+import numpy as np
+import pytest
+
+import processing.objects_detection as objects_detection
+from processing.checkpoint import CHECKPOINT_VERSION, CheckpointWriter, load_checkpoint
+from processing.objects_detection import detection
+from tests.conftest import BACKGROUND
+
+OPTIONS = {"analysis_scale": 0.5, "checkpoint_interval": 2.0}
+STOP_FRAME = 400        # Przerwanie, gdy w kadrze są śledzone obiekty
+
+
+class Crash(Exception):
+    pass
+
+
+class CrashingCapture:
+    """
+    cv2.VideoCapture, który po `stop_frame` klatkach zgłasza wyjątek - jak awaria procesu w trakcie nagrania
+    """
+
+    def __init__(self, path, stop_frame):
+        self.cap = cv2.VideoCapture(str(path))
+        self.stop_frame = stop_frame
+
+    def read(self):
+        if self.cap.get(cv2.CAP_PROP_POS_FRAMES) >= self.stop_frame:
+            raise Crash
+        return self.cap.read()
+
+    def grab(self):
+        if self.cap.get(cv2.CAP_PROP_POS_FRAMES) >= self.stop_frame:
+            raise Crash
+        return self.cap.grab()
+
+    def __getattr__(self, name):
+        return getattr(self.cap, name)
+
+
+@pytest.fixture
+def recorded(monkeypatch):
+    """
+    Obiekty ObjectCounter i CheckpointWriter tworzone przez detection() - do sprawdzenia stanu po przebiegu
+    """
+    instances = {"counters": [], "writers": []}
+
+    class RecordedCounter(objects_detection.ObjectCounter):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            instances["counters"].append(self)
+
+    class RecordedWriter(CheckpointWriter):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            instances["writers"].append(self)
+
+    monkeypatch.setattr(objects_detection, "ObjectCounter", RecordedCounter)
+    monkeypatch.setattr(objects_detection, "CheckpointWriter", RecordedWriter)
+    return instances
+
+
+@pytest.mark.parametrize("extra", [{}, {"motion_gate": True, "idle_stride": 3}])
+def test_resume_matches_uninterrupted_run(synthetic_clip, tmp_path, recorded, extra):
+    expected = detection(cv2.VideoCapture(str(synthetic_clip)), BACKGROUND, show=False, **OPTIONS, **extra)
+    expected_ids = recorded["counters"][-1].tracker.counted_ids
+
+    checkpoint_path = tmp_path / "clip.checkpoint.npz"
+    with pytest.raises(Crash):
+        detection(CrashingCapture(synthetic_clip, STOP_FRAME), BACKGROUND, show=False,
+                  checkpoint_path=str(checkpoint_path), **OPTIONS, **extra)
+    recorded["writers"][-1].close()     # Oczekująca migawka trafia na dysk, jak w procesie przerwanym później
+    state = load_checkpoint(checkpoint_path, recorded["writers"][-1].key)
+    assert state is not None
+    assert 0 < len(state["counted_ids"]) < len(expected_ids)
+
+    counts = detection(cv2.VideoCapture(str(synthetic_clip)), BACKGROUND, show=False,
+                       checkpoint_path=str(checkpoint_path), **OPTIONS, **extra)
+    assert counts == expected
+    assert recorded["counters"][-1].tracker.counted_ids == expected_ids
+    assert not checkpoint_path.exists()     # Po przetworzeniu całego nagrania punkt kontrolny jest usuwany
+
+
+def test_load_checkpoint_rejects_other_key(tmp_path):
+    path = tmp_path / "clip.checkpoint.npz"
+    writer = CheckpointWriter(path, key="nagranie A")
+    writer.save({"meta": np.array(json.dumps({"version": CHECKPOINT_VERSION})), "counted_ids": np.arange(3)})
+    writer.close()
+
+    assert load_checkpoint(path, "nagranie B") is None
+    state = load_checkpoint(path, "nagranie A")
+    assert state is not None
+    assert list(state["counted_ids"]) == [0, 1, 2]
+
+
+def test_writer_reports_any_error(tmp_path):
+    unpicklable = np.empty(1, dtype=object)
+    unpicklable[0] = lambda: None
+    writer = CheckpointWriter(tmp_path / "clip.checkpoint.npz", key="nagranie")
+    writer.save({"meta": np.array("{}"), "descriptors": unpicklable})
+    with pytest.raises((pickle.PicklingError, AttributeError)):    # Nie OSError - a mimo to zgłaszany w close()
+        writer.close()
@@ -0,0 +1,48 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+import pytest
+
+from processing.frame_cache import FrameCache
+from processing.frame_sources import open_video
+from tests.conftest import read_all
+
+
+def read_cached(directory, video_path):
+    return len(read_all(FrameCache(directory).open(video_path)))
+
+
+@pytest.mark.parametrize("color", [True, False])
+def test_cached_frames_match_capture(sample_clip, tmp_path, color):
+    expected = read_all(open_video(sample_clip))
+    if not color:
+        expected = [cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) for frame in expected]
+    frames = read_all(FrameCache(tmp_path, color=color).open(sample_clip))
+
+    assert len(frames) == len(expected)
+    assert all(np.array_equal(frame, reference) for frame, reference in zip(frames, expected))
+
+
+def test_concurrent_builds(sample_clip, tmp_path):
+    # Procesy budujące ten sam wpis jednocześnie piszą do własnych plików tymczasowych
+    with ProcessPoolExecutor(4) as executor:
+        counts = list(executor.map(read_cached, [tmp_path] * 4, [sample_clip] * 4))
+
+    assert counts == [30] * 4
+    assert sorted(path.suffix for path in tmp_path.iterdir()) == [".json", ".u8"]
+
+
+def test_evict_skips_young_entries(sample_clip, tmp_path):
+    cache = FrameCache(tmp_path, max_bytes=0)
+    cache.open(sample_clip).release()
+    assert cache.evict() == 0
+    assert len(cache.entries()) == 1
+
+    old = time.time() - 3600
+    for path in tmp_path.iterdir():
+        os.utime(path, (old, old))
+    assert cache.evict() > 0
+    assert cache.entries() == []
@@ -0,0 +1,41 @@
+import shutil
+
+import cv2
+import numpy as np
+import pytest
+
+from processing.frame_sources import FFmpegCapture, FFmpegDecoder, open_video
+from tests.conftest import read_all
+
+requires_ffmpeg = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="brak programu ffmpeg w PATH")
+
+
+@requires_ffmpeg
+@pytest.mark.parametrize("gray", [False, True])
+def test_ffmpeg_matches_opencv(sample_clip, gray):
+    expected = read_all(open_video(sample_clip))
+    if gray:
+        expected = [cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) for frame in expected]
+    frames = read_all(open_video(sample_clip, FFmpegDecoder(gray=gray)))
+
+    assert len(frames) == len(expected) == 30
+    for frame, reference in zip(frames, expected):
+        assert frame.shape == reference.shape
+        # Konwersja kolorów w ffmpeg i OpenCV może różnić się zaokrągleniem
+        assert np.abs(frame.astype(np.int16) - reference).mean() < 2
+
+
+@requires_ffmpeg
+def test_ffmpeg_seek(sample_clip):
+    expected = read_all(open_video(sample_clip))
+    cap = FFmpegCapture(sample_clip)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, 17)
+    ret, frame = cap.read()
+    cap.release()
+    assert ret
+    assert np.abs(frame.astype(np.int16) - expected[17]).mean() < 2
+
+
+def test_decoder_requires_ffmpeg():
+    with pytest.raises(FileNotFoundError):
+        FFmpegDecoder(executable="ffmpeg-missing-executable")
@@ -0,0 +1,69 @@
+import json
+import subprocess
+import sys
+
+import cv2
+import pytest
+
+from tests.conftest import ROOT
+
+# Fragmenty syntetycznego nagrania [start, end) - nagrania o różnej długości i różnych zliczeniach
+PARTS = {"a.mp4": (0, 250), "b.mp4": (200, 480), "c.mp4": (400, None)}
+
+
+@pytest.fixture(scope="module")
+def videos_dir(synthetic_clip, tmp_path_factory):
+    directory = tmp_path_factory.mktemp("videos")
+    cap = cv2.VideoCapture(str(synthetic_clip))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    for name, (start, end) in PARTS.items():
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+        writer = cv2.VideoWriter(str(directory / name), cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+        for _ in range(start, end if end is not None else int(cap.get(cv2.CAP_PROP_FRAME_COUNT))):
+            ret, frame = cap.read()
+            if not ret:
+                break
+            writer.write(frame)
+        writer.release()
+    cap.release()
+    return directory
+
+
+def run_main(videos_dir, results_file, *options):
+    completed = subprocess.run([sys.executable, "main.py", str(videos_dir), str(results_file),
+                                "--analysis-scale", "0.5", *options],
+                               cwd=ROOT, capture_output=True, text=True, check=True)
+    return completed.stdout
+
+
+@pytest.fixture(scope="module")
+def serial_results(videos_dir, tmp_path_factory):
+    results_file = tmp_path_factory.mktemp("serial") / "results.json"
+    run_main(videos_dir, results_file)
+    return results_file.read_text()
+
+
+def test_workers_match_serial(videos_dir, serial_results, tmp_path):
+    results_file = tmp_path / "results.json"
+    run_main(videos_dir, results_file, "--workers", "3")
+
+    assert results_file.read_text() == serial_results
+    assert list(json.loads(serial_results)) == list(PARTS)
+    assert len({json.dumps(counts) for counts in json.loads(serial_results).values()}) > 1
+
+
+@pytest.mark.parametrize("workers", ["1", "2"])
+def test_resume_skips_written_videos(videos_dir, serial_results, tmp_path, workers):
+    expected = json.loads(serial_results)
+    # Wynik b.mp4 celowo różny od prawdziwego - nagranie pominięte przy wznowieniu nie może zostać przeliczone
+    written = {"b.mp4": {key: 100 for key in expected["b.mp4"]}}
+    results_file = tmp_path / "results.json"
+    results_file.write_text(json.dumps(written))
+
+    output = run_main(videos_dir, results_file, "--resume", "--workers", workers)
+
+    assert f"Skipping video {videos_dir / 'b.mp4'}" in output
+    assert f"Processing video {videos_dir / 'b.mp4'}" not in output
+    assert json.loads(results_file.read_text()) == {**expected, **written}
+    assert list(json.loads(results_file.read_text())) == list(PARTS)     # Kolejność nagrań jak w przebiegu bez przerwy
@@ -0,0 +1,26 @@
+import cv2
+import pytest
+
+from processing.objects_detection import detection
+from processing.pipeline import PipelineStats, pipelined_detection
+from tests.conftest import BACKGROUND
+
+OPTIONS = {"analysis_scale": 0.5}
+EXTRA = {"static": {}, "roi": {"roi_margin": 150}, "gate": {"motion_gate": True, "idle_stride": 3}}
+
+
+@pytest.fixture(scope="module")
+def serial_counts(synthetic_clip):
+    return {name: detection(cv2.VideoCapture(str(synthetic_clip)), BACKGROUND, show=False, **OPTIONS, **extra)
+            for name, extra in EXTRA.items()}
+
+
+@pytest.mark.parametrize("name", EXTRA)
+@pytest.mark.parametrize("workers", [1, 3])
+def test_pipelined_counts_match_serial(synthetic_clip, serial_counts, workers, name):
+    stats = PipelineStats()
+    counts = pipelined_detection(cv2.VideoCapture(str(synthetic_clip)), BACKGROUND, workers=workers,
+                                 queue_size=4, stats=stats, **OPTIONS, **EXTRA[name])
+
+    assert counts == serial_counts[name]
+    assert stats.frames["track"] == stats.frames["decode"] > 0
@@ -0,0 +1,14 @@
+from types import SimpleNamespace
+
+import pytest
+
+from processing import profiling
+
+
+@pytest.mark.parametrize("platform, maxrss", [("linux", 300 * 1024), ("darwin", 300 * 1024 * 1024)])
+def test_peak_rss_units(monkeypatch, platform, maxrss):
+    # ru_maxrss: Linux - KB, macOS - bajty
+    fake_resource = SimpleNamespace(RUSAGE_SELF=0, getrusage=lambda who: SimpleNamespace(ru_maxrss=maxrss))
+    monkeypatch.setattr(profiling, "resource", fake_resource)
+    monkeypatch.setattr(profiling.sys, "platform", platform)
+    assert profiling.peak_rss_mb() == 300
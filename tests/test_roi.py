@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from processing.background import StaticBackground
+from processing.objects_detection import DEFAULT_PARAMS, classify_blobs, segment_frame, zone_rois
+
+FRAME_SHAPE = (1080, 1920)
+
+
+def scene(rectangles, scale=1.0):
+    """
+    Tło i klatka z białymi prostokątami (x0, y0, x1, y1) w rozdzielczości 1920x1080 przeskalowanej o `scale`
+    """
+    height, width = (int(round(size * scale)) for size in FRAME_SHAPE)
+    background = np.zeros((height, width), dtype=np.uint8)
+    frame = background.copy()
+    for x0, y0, x1, y1 in rectangles:
+        frame[int(y0 * scale):int(y1 * scale), int(x0 * scale):int(x1 * scale)] = 255
+    return StaticBackground(background), frame
+
+
+def classify(frame, background, params, rois):
+    # Kolejność obiektów zależy od kolejności wycinków - porównywane są zbiory obiektów
+    objects = classify_blobs(segment_frame(frame, background, rois, params), frame.shape, params)
+    return sorted(objects, key=lambda obj: obj["bbox"])
+
+
+@pytest.mark.parametrize("scale", [1.0, 0.5])
+@pytest.mark.parametrize("rectangles", [
+    [(500, 205, 1500, 415)],                            # Tramwaj pokrywający strefa_tramwaju2, wystający poza ROI
+    [(0, 205, 1900, 415)],                              # Tramwaj przez całą szerokość klatki
+    [(1100, 450, 1700, 700)],                           # Ciężarowy wjeżdżający w strefa_prawo spoza ROI
+    [(1240, 300, 1400, 520), (300, 120, 560, 330)],     # Obiekt na krawędzi ROI i obiekt wewnątrz ROI
+])
+def test_roi_matches_full_frame(rectangles, scale):
+    params = DEFAULT_PARAMS.scaled(scale)
+    background, frame = scene(rectangles, scale)
+    rois = zone_rois(frame.shape, round(150 * scale), params)
+    assert rois != [(0, 0, frame.shape[1], frame.shape[0])]
+
+    full = classify(frame, background, params, None)
+    assert classify(frame, background, params, rois) == full
+    assert full
+
+
+def test_clipped_tram_is_counted():
+    background, frame = scene([(500, 205, 1500, 415)])
+    objects = classify(frame, background, DEFAULT_PARAMS, zone_rois(frame.shape, params=DEFAULT_PARAMS))
+    assert [obj["label"] for obj in objects] == ["tramwaj"]
+    assert objects[0]["bbox"] == (500, 205, 1000, 210)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_blobs_in_rois_match_full_frame(seed):
+    # Bloby pełnej klatki nachodzące na wycinki są w trybie ROI wyznaczane bez zmian (także te wystające poza wycinek)
+    rng = np.random.default_rng(seed)
+    rectangles = []
+    for _ in range(rng.integers(1, 6)):
+        x0, y0 = rng.integers(0, 1800), rng.integers(0, 1000)
+        rectangles.append((x0, y0, x0 + rng.integers(20, 900), y0 + rng.integers(20, 400)))
+    background, frame = scene(rectangles)
+    rois = zone_rois(frame.shape, params=DEFAULT_PARAMS)
+
+    def stats(rois):
+        return {tuple(row) for row in segment_frame(frame, background, rois, DEFAULT_PARAMS).tolist()}
+
+    def in_rois(row):
+        x, y, w, h = row[:4]
+        return any(x < x1 and x0 < x + w and y < y1 and y0 < y + h for x0, y0, x1, y1 in rois)
+
+    full = {row for row in stats(None) if in_rois(row)}
+    assert full <= stats(rois)
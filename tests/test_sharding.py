@@ -0,0 +1,27 @@
+import cv2
+import pytest
+
+from processing.objects_detection import detection
+from processing.sharding import WARMUP_SECONDS, sharded_detection, split_frames
+from tests.conftest import BACKGROUND, objects_on_screen
+
+OPTIONS = {"analysis_scale": 0.5}
+
+
+@pytest.fixture(scope="module")
+def serial_counts(synthetic_clip):
+    return detection(cv2.VideoCapture(str(synthetic_clip)), BACKGROUND, show=False, **OPTIONS)
+
+
+@pytest.mark.parametrize("shards", [2, 3])
+def test_sharded_counts_within_tolerance(synthetic_clip, serial_counts, shards):
+    frames = int(cv2.VideoCapture(str(synthetic_clip)).get(cv2.CAP_PROP_FRAME_COUNT))
+    boundaries = [start for start, _ in split_frames(frames, shards)[1:]]
+    # Granice fragmentów wypadają, gdy w kadrze są obiekty, a rozgrzewka nie sięga początku nagrania
+    assert all(objects_on_screen(boundary) > 0 for boundary in boundaries)
+    assert boundaries[-1] > WARMUP_SECONDS * 30
+
+    counts = sharded_detection(str(synthetic_clip), shards, background_path=BACKGROUND, **OPTIONS)
+    assert counts.keys() == serial_counts.keys()
+    for key, value in counts.items():
+        assert abs(value - serial_counts[key]) <= len(boundaries), key
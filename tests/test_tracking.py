@@ -0,0 +1,44 @@
+import numpy as np
+
+from processing.tracking import ObjectTracker, TrackStore
+
+
+def test_match_prefers_more_gated_pairs():
+    # Detekcja 0 wygląda jak obiekt t1, ale oddanie go jej zostawiłoby detekcję 1 tylko z parą wykluczoną bramką
+    # (t0 jest za daleko) - optymalne przypisanie dopasowuje obie detekcje
+    tracker = ObjectTracker(max_distance=60, descriptor="histogram")
+    size = tracker.store.descriptor_size
+    basis = np.eye(size, dtype=np.float32)
+    base = basis[0]
+
+    t0, _ = tracker.store.add(0, (0, 0), (0, 0, 10, 10), base + 10 * basis[1], 1)
+    t1, _ = tracker.store.add(1, (50, 0), (50, 0, 10, 10), base, 1)
+
+    centroids = [(25, 0), (100, 0)]
+    descriptors = np.stack([base, base + 10 * basis[2]])
+    assert tracker.match(centroids, descriptors, np.array([t0, t1])) == [t0, t1]
+
+
+def test_store_memory_bounded_by_max_tracks():
+    store = TrackStore(descriptor_size=8, capacity=4, max_tracks=16)
+    descriptor = np.ones(8, dtype=np.float32)
+    for obj_id in range(16):
+        assert store.add(obj_id, (obj_id, 0), (obj_id, 0, 1, 1), descriptor, obj_id) == (store.slots[obj_id], None)
+    capacity, memory = store.capacity, store.memory_bytes()
+    assert capacity == 16
+
+    # Sloty wypełnione kolejno i zwolnione w innej kolejności - numer slotu nie odpowiada wiekowi obiektu
+    for obj_id in (0, 3):
+        store.remove(store.slots[obj_id])
+    for obj_id in (16, 17):
+        store.add(obj_id, (0, 0), (0, 0, 1, 1), descriptor, obj_id)
+    for obj_id, missed in ((5, 3), (9, 3), (7, 1)):
+        store.missed[store.slots[obj_id]] = missed
+
+    evicted = [store.add(obj_id, (0, 0), (0, 0, 1, 1), descriptor, obj_id)[1] for obj_id in range(18, 24)]
+
+    # Najpierw najdłużej niewidoczne (przy remisie - starsze), potem najwcześniej wykryte
+    assert evicted == [5, 9, 7, 1, 2, 4]
+    assert store.capacity == capacity and store.memory_bytes() == memory
+    assert len(store) == 16
+    assert sorted(store.slots) == [6, 8] + list(range(10, 24))
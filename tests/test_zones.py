@@ -0,0 +1,66 @@
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from processing.objects_detection import DEFAULT_PARAMS
+from processing.zones import ZoneMap, zone_area_mask, zone_map
+
+FRAME_SHAPE = (1080, 1920)
+
+
+def zone_coverage(bbox, zone):
+    """
+    Dawne pokrycie strefy tramwaju: pole przecięcia bboxa z prostokątem strefy / pole strefy
+    """
+    x, y, w, h = bbox
+    (tx1, ty1), (tx2, ty2) = zone
+    inter = max(0, min(x + w, tx2) - max(x, tx1)) * max(0, min(y + h, ty2) - max(y, ty1))
+    return inter / float((tx2 - tx1) * (ty2 - ty1))
+
+
+def frame_shape(scale):
+    return tuple(int(round(size * scale)) for size in FRAME_SHAPE)
+
+
+@pytest.mark.parametrize("scale", [1.0, 0.5, 0.33])
+def test_tram_coverage_matches_rectangle_intersection(scale):
+    params = DEFAULT_PARAMS.scaled(scale)
+    shape = frame_shape(scale)
+    zones = (params.strefa_tramwaju1, params.strefa_tramwaju2)
+
+    rng = np.random.default_rng(0)
+    bboxes = []
+    for (tx1, ty1), (tx2, ty2) in zones:
+        # Bboxy dokładnie pokrywające strefę, nieco mniejsze, nieco większe i losowe wokół strefy
+        bboxes.append((tx1, ty1, tx2 - tx1, ty2 - ty1))
+        bboxes.append((tx1 + 1, ty1, tx2 - tx1 - 1, ty2 - ty1))
+        bboxes.append((max(tx1 - 1, 0), ty1 - 1, tx2 - tx1 + 2, ty2 - ty1 + 2))
+        for _ in range(200):
+            x0, x1 = sorted(rng.integers(max(tx1 - 50, 0), tx2 + 50, size=2))
+            y0, y1 = sorted(rng.integers(ty1 - 50, ty2 + 50, size=2))
+            bboxes.append((x0, y0, x1 - x0 + 1, y1 - y0 + 1))
+    bboxes = np.array(bboxes, dtype=np.int64)
+
+    coverage = ZoneMap(params, shape).tram_coverage(bboxes)
+    expected = np.array([[zone_coverage(bbox, zone) for zone in zones] for bbox in bboxes.tolist()])
+    np.testing.assert_allclose(coverage, expected, rtol=0, atol=1e-12)
+
+    # Bbox równy strefie pokrywa ją w całości (próg tram_overlap=0.99)
+    assert (coverage[[0, 203], [0, 1]] > params.tram_overlap).all()
+
+
+def test_zone_area_mask_polygon():
+    # Trójkąt prostokątny o przyprostokątnych 100 px - pole maski równe polu trójkąta z dokładnością do krawędzi
+    mask = zone_area_mask(((0, 0), (100, 0), (0, 100)), (120, 120))
+    assert abs(int(mask.sum()) - 100 * 100 / 2) <= 100
+    assert mask[:, 100:].sum() == 0 and mask[100:, :].sum() == 0
+
+
+def test_zone_map_shared_by_parameters_with_same_geometry():
+    # Konfiguracje różniące się tylko progami (parameter_sweep) korzystają z jednej skompilowanej mapy
+    zones = zone_map(DEFAULT_PARAMS, FRAME_SHAPE)
+    for threshold in (20, 40, 60):
+        params = replace(DEFAULT_PARAMS, threshold=threshold, tram_overlap=0.95, min_area=2000)
+        assert zone_map(params, FRAME_SHAPE) is zones
+    assert zone_map(replace(DEFAULT_PARAMS, horizon=0.5), FRAME_SHAPE) is not zones